@@ -1,26 +1,66 @@
-# app/core/clients.py
-import firebase_admin
-from firebase_admin import credentials
-from google.cloud import vision
+# ===============================================================
+# ARCHIVO: app/core/clients.py
+# PROPÓSITO: Clientes externos (Firebase Admin y Google Cloud Vision).
+#            Ya no se inicializan al importar: se registran en el
+#            registro perezoso y se construyen en el primer uso.
+# ===============================================================
 import os
 
-# --- Inicialización de Firebase Admin (Movido desde security.py) ---
-try:
-    CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "firebase-credentials.json")
-    if not firebase_admin._apps:
-        cred = credentials.Certificate(CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred)
-        print("Firebase Admin SDK inicializado correctamente.")
-except Exception as e:
-    print(f"ERROR: No se pudo inicializar Firebase Admin SDK: {e}")
-
-# --- Inicialización de Google Cloud Vision ---
-try:
-    # Google Cloud Vision usará las mismas credenciales si están configuradas
-    # a través de la variable de entorno GOOGLE_APPLICATION_CREDENTIALS.
-    # Opcionalmente, puedes pasarle el mismo archivo de credenciales.
-    vision_client = vision.ImageAnnotatorClient()
+from app.core.config import VISION_FAKE
+from app.core.registry import registry
+
+# La ruta histórica era app/firebase-credentials.json; security.py usaba la
+# raíz del proyecto. Se respeta FIREBASE_CREDENTIALS y luego ambas rutas.
+_APP_DIR = os.path.dirname(os.path.dirname(__file__))
+CREDENTIALS_PATHS = [
+    os.getenv("FIREBASE_CREDENTIALS", ""),
+    os.path.join(_APP_DIR, "firebase-credentials.json"),
+    os.path.join(os.path.dirname(_APP_DIR), "firebase-credentials.json"),
+]
+
+
+def _init_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    path = next((p for p in CREDENTIALS_PATHS if p and os.path.exists(p)), CREDENTIALS_PATHS[1])
+    try:
+        app = firebase_admin.initialize_app(credentials.Certificate(path))
+    except Exception as e:
+        print(f"ERROR: No se pudo inicializar Firebase Admin SDK. Revisa la ruta de tus credenciales: {e}")
+        raise
+    print("Firebase Admin SDK inicializado correctamente.")
+    return app
+
+
+def _init_vision():
+    if VISION_FAKE:
+        from app.services.vision_fake import FakeVisionClient
+        print("Usando el cliente FALSO de Google Cloud Vision (VISION_FAKE).")
+        return FakeVisionClient()
+
+    # Google Cloud Vision usará las credenciales de la variable de entorno
+    # GOOGLE_APPLICATION_CREDENTIALS.
+    from google.cloud import vision
+
+    try:
+        client = vision.ImageAnnotatorClient()
+    except Exception as e:
+        print(f"ERROR: No se pudo inicializar el cliente de Vision: {e}")
+        raise
     print("Cliente de Google Cloud Vision inicializado correctamente.")
-except Exception as e:
-    vision_client = None
-    print(f"ERROR: No se pudo inicializar el cliente de Vision: {e}")
\ No newline at end of file
+    return client
+
+
+registry.register("firebase", _init_firebase)
+registry.register("vision", _init_vision)
+
+
+def get_firebase_app():
+    return registry.get("firebase")
+
+
+def get_vision_client():
+    return registry.get("vision")
@@ -0,0 +1,141 @@
+# ===============================================================
+# ARCHIVO: app/core/config.py
+# PROPÓSITO: Parámetros de configuración leídos de variables de
+#            entorno, con valores por defecto para desarrollo.
+# ===============================================================
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "si", "sí")
+
+
+# --- Arranque ---
+# Subsistemas a inicializar al arrancar, separados por coma: firebase, vision,
+# face_model. El resto se inicializa en su primer uso (ver app/core/registry.py).
+# face_model es el único interruptor del modelo facial al arrancar: con
+# FACE_WORKERS > 0 levanta los procesos de inferencia (cada uno carga y calienta
+# su modelo); con FACE_WORKERS=0 calienta el modelo en segundo plano en este
+# proceso. Va por omisión para que las primeras checadas del día no paguen la
+# carga del modelo; los workers que solo atienden reportes usan EAGER_INIT="".
+EAGER_INIT = os.getenv("EAGER_INIT", "face_model")
+
+# --- Reconocimiento facial ---
+FACE_MODEL_NAME = os.getenv("FACE_MODEL_NAME", "VGG-Face")
+# Métrica para la verificación 1:1: 'cosine', 'euclidean' o 'euclidean_l2'.
+FACE_DISTANCE_METRIC = os.getenv("FACE_DISTANCE_METRIC", "cosine")
+# Umbrales que sustituyen a los de fábrica, en JSON. Ejemplo:
+#   FACE_THRESHOLDS='{"VGG-Face": {"cosine": 0.60}}'
+FACE_THRESHOLDS = os.getenv("FACE_THRESHOLDS", "")
+
+# --- Procesos de inferencia facial ---
+# Número de procesos que ejecutan el modelo. 0 = inferencia dentro del
+# proceso de la API (comportamiento anterior, útil en desarrollo).
+FACE_WORKERS = int(os.getenv("FACE_WORKERS", "2"))
+# Trabajos (lotes) que pueden esperar turno en el pool además de los que ya
+# se procesan. El límite de hilos de la API lo pone FACE_MAX_ADMITTED_IMAGES.
+FACE_QUEUE_DEPTH = int(os.getenv("FACE_QUEUE_DEPTH", "8"))
+FACE_RETRY_AFTER_SECONDS = int(os.getenv("FACE_RETRY_AFTER_SECONDS", "2"))
+
+# --- Micro-lotes de inferencia facial ---
+# Tamaño máximo de lote y ventana de espera para juntar peticiones concurrentes.
+# FACE_BATCH_MAX_SIZE=1 desactiva el agrupamiento.
+FACE_BATCH_MAX_SIZE = int(os.getenv("FACE_BATCH_MAX_SIZE", "8"))
+FACE_BATCH_WINDOW_MS = float(os.getenv("FACE_BATCH_WINDOW_MS", "10"))
+# Imágenes admitidas a la vez (esperando lote + en inferencia); cada una ocupa
+# un hilo de la ruta síncrona mientras espera. Pasado el límite se responde 503.
+# Debe quedar por debajo del threadpool de FastAPI (40).
+FACE_MAX_ADMITTED_IMAGES = int(os.getenv("FACE_MAX_ADMITTED_IMAGES", "24"))
+
+# --- Pre-procesamiento de imágenes faciales ---
+# Lado máximo (px) con el que se detecta el rostro; las fotos más grandes se
+# decodifican a resolución reducida y se reescalan. 0 = sin límite.
+FACE_MAX_IMAGE_SIDE = int(os.getenv("FACE_MAX_IMAGE_SIDE", "640"))
+
+# --- Backend de embeddings ---
+# 'deepface' (TensorFlow), 'onnx' (ONNX Runtime en CPU, requiere onnxruntime
+# y un modelo exportado con app/scripts/export_onnx_model.py) o 'fake'
+# (determinista, sin modelo ni detector: solo para benchmarks y pruebas).
+FACE_EMBEDDING_BACKEND = os.getenv("FACE_EMBEDDING_BACKEND", "deepface")
+FACE_ONNX_MODEL_PATH = os.getenv(
+    "FACE_ONNX_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "vgg_face.onnx")
+)
+FACE_ONNX_THREADS = int(os.getenv("FACE_ONNX_THREADS", "0")) # 0 = lo decide ONNX Runtime
+# Milisegundos por imagen que simula el backend 'fake'.
+FACE_FAKE_EMBED_MS = float(os.getenv("FACE_FAKE_EMBED_MS", "0"))
+
+# --- Índice facial 1:N ---
+# Guarda en memoria una copia int8 (con escala por vector) en lugar de float32:
+# ~4 veces menos memoria. Los mejores candidatos se reordenan con los vectores exactos.
+FACE_INDEX_INT8 = _env_bool("FACE_INDEX_INT8", False)
+# Cuántos candidatos por cada resultado pedido se reordenan con la distancia exacta.
+FACE_INDEX_RERANK = int(os.getenv("FACE_INDEX_RERANK", "10"))
+# Índice aproximado IVF para galerías grandes (decenas de miles de rostros).
+# Se carga de FACE_IVF_PATH (app/scripts/train_face_ivf.py) o, si no existe, se
+# entrena en segundo plano; mientras tanto la búsqueda es exacta. Con
+# FACE_SHARED_STORE_DIR las listas siguen la versión del almacén compartido.
+FACE_IVF_ENABLED = _env_bool("FACE_IVF_ENABLED", False)
+FACE_IVF_PATH = os.getenv(
+    "FACE_IVF_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "face_ivf.npz")
+)
+FACE_IVF_NLIST = int(os.getenv("FACE_IVF_NLIST", "0")) # 0 = ~sqrt(N) listas
+FACE_IVF_NPROBE = int(os.getenv("FACE_IVF_NPROBE", "8"))
+# Directorio de la matriz de embeddings compartida (np.memmap) entre workers
+# de uvicorn. Vacío = cada worker carga su propia copia desde la base de datos.
+# No aplica con FACE_INDEX_INT8.
+FACE_SHARED_STORE_DIR = os.getenv("FACE_SHARED_STORE_DIR", "")
+# Cada cuántos segundos un worker compara el número de plantillas del almacén
+# con el de la base de datos y, si difieren (bajas, altas por otra vía), lo
+# vuelve a publicar desde la base de datos.
+FACE_SHARED_STORE_RECONCILE_SECONDS = float(os.getenv("FACE_SHARED_STORE_RECONCILE_SECONDS", "60"))
+
+# --- Google Cloud Vision ---
+# Detección en lotes (batch_annotate_images). La API acepta hasta 16 imágenes por llamada.
+VISION_BATCH_SIZE = min(16, int(os.getenv("VISION_BATCH_SIZE", "16")))
+VISION_FLUSH_MS = float(os.getenv("VISION_FLUSH_MS", "20"))
+# Tiempo máximo por llamada a la API y reintentos (con espera exponencial) si falla.
+VISION_TIMEOUT_SECONDS = float(os.getenv("VISION_TIMEOUT_SECONDS", "10"))
+VISION_MAX_RETRIES = int(os.getenv("VISION_MAX_RETRIES", "2"))
+VISION_RETRY_BACKOFF_SECONDS = float(os.getenv("VISION_RETRY_BACKOFF_SECONDS", "0.5"))
+# Lotes en vuelo a la vez e imágenes que pueden esperar turno (con la cola llena: 503).
+VISION_MAX_INFLIGHT = int(os.getenv("VISION_MAX_INFLIGHT", "4"))
+VISION_QUEUE_DEPTH = int(os.getenv("VISION_QUEUE_DEPTH", "64"))
+# Usa el cliente falso local (app/services/vision_fake.py) en lugar de Google.
+VISION_FAKE = _env_bool("VISION_FAKE", False)
+
+# --- Filtro previo de calidad facial ---
+# Revisión local y barata (detector Haar de OpenCV + nitidez + brillo) antes de
+# mandar la imagen a inferencia; las capturas inservibles se rechazan en ms.
+FACE_GATE_ENABLED = _env_bool("FACE_GATE_ENABLED", True)
+FACE_GATE_MAX_SIDE = int(os.getenv("FACE_GATE_MAX_SIDE", "320"))
+# Varianza del Laplaciano mínima (a FACE_GATE_MAX_SIDE px); menos = borrosa.
+FACE_GATE_MIN_SHARPNESS = float(os.getenv("FACE_GATE_MIN_SHARPNESS", "30"))
+# Brillo medio permitido (0-255).
+FACE_GATE_MIN_BRIGHTNESS = float(os.getenv("FACE_GATE_MIN_BRIGHTNESS", "40"))
+FACE_GATE_MAX_BRIGHTNESS = float(os.getenv("FACE_GATE_MAX_BRIGHTNESS", "220"))
+# Si es falso solo se revisan nitidez y brillo (sin detector de rostros).
+FACE_GATE_DETECTOR = _env_bool("FACE_GATE_DETECTOR", True)
+# Segundos en los que se rechaza un cuadro casi idéntico a otro ya recibido. 0 = apagado.
+FACE_GATE_DUPLICATE_SECONDS = float(os.getenv("FACE_GATE_DUPLICATE_SECONDS", "0"))
+
+# --- Caché de embeddings por contenido ---
+# Reintentos del kiosco con la misma imagen reutilizan el embedding ya calculado.
+# Llave: hash de los bytes de la imagen + modelo. Tamaño 0 = sin caché.
+FACE_EMBEDDING_CACHE_SIZE = int(os.getenv("FACE_EMBEDDING_CACHE_SIZE", "256"))
+FACE_EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("FACE_EMBEDDING_CACHE_TTL_SECONDS", "120"))
+
+# --- Comparación de huellas por minucias ---
+# Puntaje = pares² / (minucias capturadas · minucias guardadas); se pide además
+# un mínimo de pares emparejados para aceptar la huella.
+FINGERPRINT_MATCH_THRESHOLD = float(os.getenv("FINGERPRINT_MATCH_THRESHOLD", "0.16"))
+FINGERPRINT_MIN_PAIRS = int(os.getenv("FINGERPRINT_MIN_PAIRS", "10"))
+# Tolerancias al emparejar dos minucias ya alineadas (px a ~500 dpi, grados).
+FINGERPRINT_DISTANCE_TOLERANCE = float(os.getenv("FINGERPRINT_DISTANCE_TOLERANCE", "12"))
+FINGERPRINT_ANGLE_TOLERANCE = float(os.getenv("FINGERPRINT_ANGLE_TOLERANCE", "20"))
+# En 1:N solo se comparan a fondo los N candidatos más parecidos por rasgos globales.
+FINGERPRINT_PREFILTER_TOP = int(os.getenv("FINGERPRINT_PREFILTER_TOP", "64"))
@@ -0,0 +1,75 @@
+# ===============================================================
+# ARCHIVO: app/core/registry.py
+# PROPÓSITO: Registro de clientes pesados (Firebase, Google Vision...).
+#            Cada uno se importa e inicializa la primera vez que se usa,
+#            una sola vez por proceso, y se guarda cuánto tardó. Un worker
+#            que solo atiende reportes nunca paga el costo de los clientes
+#            de Google. El modelo facial tiene su propio ciclo de vida
+#            (face_model_service / face_worker_pool).
+# ===============================================================
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+class LazyRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._factories: Dict[str, Callable] = {}
+        self._instances: Dict[str, object] = {}
+        self._seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+
+    def register(self, name: str, factory: Callable):
+        """Registra cómo construir un subsistema; no lo construye todavía."""
+        self._factories[name] = factory
+
+    def get(self, name: str):
+        """
+        Devuelve la instancia del subsistema, construyéndola en el primer
+        uso. Si la construcción falla, la excepción se propaga y se vuelve
+        a intentar en la siguiente llamada.
+        """
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._instances:
+                inicio = time.perf_counter()
+                try:
+                    self._instances[name] = self._factories[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._seconds[name] = time.perf_counter() - inicio
+                self._errors.pop(name, None)
+                print(f"--- LOG (registry): '{name}' inicializado en {self._seconds[name]:.2f} s. ---")
+        return self._instances[name]
+
+    def warm(self, names: Iterable[str]):
+        """Inicializa de antemano solo los subsistemas indicados."""
+        for name in names:
+            if name not in self._factories:
+                print(f"--- ERROR (registry): Subsistema desconocido '{name}'. Opciones: {sorted(self._factories)}")
+                continue
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"--- ERROR (registry): No se pudo inicializar '{name}': {e}")
+
+    def status(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "initialized": name in self._instances,
+                "init_seconds": round(self._seconds[name], 3) if name in self._seconds else None,
+                "error": self._errors.get(name)
+            }
+            for name in self._factories
+        }
+
+
+registry = LazyRegistry()
+
+
+def parse_names(value: Optional[str]) -> list:
+    """'firebase, vision' -> ['firebase', 'vision']"""
+    return [n.strip() for n in (value or "").split(",") if n.strip()]
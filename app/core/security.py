@@ -10,9 +10,8 @@ from pydantic import BaseModel
 from typing import Optional
 import os
 
-# --- Importaciones para Firebase ---
-import firebase_admin
-from firebase_admin import credentials, auth
+# --- Firebase se inicializa en el primer uso (ver app/core/clients.py) ---
+from app.core.clients import get_firebase_app
 
 # --- CONFIGURACIÓN DE NUESTRO PROPIO TOKEN (JWT para la sesión) ---
 # Esto no cambia. Sigue siendo el token para la sesión DENTRO de nuestra app.
@@ -20,20 +19,6 @@ SECRET_KEY = "Mayco250625developerrls"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 8 # 8 horas
 
-# --- INICIALIZACIÓN DE FIREBASE ADMIN ---
-# La ruta al archivo de credenciales que descargaste.
-# Se asume que está en la raíz del proyecto.
-CREDENTIALS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "firebase-credentials.json")
-
-# Se inicializa la app de Firebase. El 'if' previene que se inicialice múltiples veces.
-if not firebase_admin._apps:
-    try:
-        cred = credentials.Certificate(CREDENTIALS_PATH)
-        firebase_admin.initialize_app(cred)
-        print("Firebase Admin SDK inicializado correctamente.")
-    except Exception as e:
-        print(f"ERROR: No se pudo inicializar Firebase Admin SDK. Revisa la ruta de tus credenciales: {e}")
-        # En un entorno de producción, podrías querer que la app no inicie si esto falla.
 
 def verify_firebase_token(token: str) -> dict:
     """
@@ -41,7 +26,10 @@ def verify_firebase_token(token: str) -> dict:
     Si el token es válido, devuelve los datos decodificados del usuario.
     Si no, lanza una excepción HTTPException.
     """
+    from firebase_admin import auth
+
     try:
+        get_firebase_app()
         # La función verify_id_token se encarga de todo:
         # - Verifica la firma y la expiración.
         # - Se comunica de forma segura con los servidores de Google.
@@ -4,6 +4,12 @@ from fastapi.middleware.cors import CORSMiddleware
 
 # --- Importaciones de nuestra arquitectura ---
 from app.database.database import Base, engine
+from app.core.config import EAGER_INIT
+from app.core.registry import registry, parse_names
+from app.core import clients # Registra firebase y vision (sin inicializarlos)
+from app.services.face_model_service import face_model
+from app.services.face_worker_pool import face_pool
+from app.services import face_index_service
 # Importamos solo los routers que necesitamos y que ahora están limpios
 from app.routers import admin, auth, gestion, vision, fingerprint, asistencia,reports,department,sheets # Asumo que tienes asistencia.py
 
@@ -40,9 +46,60 @@ app.include_router(sheets.router,prefix="/sheets", tags=["Departamentos"])
 app.include_router(fingerprint.router) # El prefijo ya está definido en el propio router
 
 
+@app.on_event("startup")
+def inicializar_subsistemas():
+    """
+    Inicializa de antemano solo los subsistemas listados en EAGER_INIT;
+    los demás se cargan la primera vez que se usan. El modelo facial no
+    está en el registro: lo atiende precargar_modelo_facial (sin bloquear
+    el arranque) y su estado se consulta en /vision/model-status.
+    """
+    registry.warm([n for n in parse_names(EAGER_INIT) if n != "face_model"])
+
+
+@app.on_event("startup")
+def precargar_modelo_facial():
+    """
+    Solo con "face_model" en EAGER_INIT: levanta los procesos de inferencia
+    (cada uno construye y calienta su modelo) o, sin pool, calienta el
+    modelo en segundo plano, para que las primeras checadas del día no
+    paguen el tiempo de carga. Sin él, el arranque no carga TensorFlow.
+    """
+    if "face_model" not in parse_names(EAGER_INIT):
+        return
+    if face_pool.enabled:
+        face_pool.start()
+    else:
+        face_model.warmup_in_background()
+
+
+@app.on_event("startup")
+def montar_embeddings_compartidos():
+    """
+    Con FACE_SHARED_STORE_DIR, monta la matriz de embeddings que ya
+    publicó otro worker (memmap) en lugar de leerla de la base de datos.
+    """
+    if face_index_service.shared_store.enabled:
+        face_index_service.attach_shared()
+
+
+@app.on_event("shutdown")
+def detener_pool_facial():
+    face_pool.shutdown()
+
+
 @app.get("/", tags=["Health Check"])
 def health_check():
     """
     Endpoint raíz para verificar que la API está funcionando.
     """
-    return {"status": "ok", "message": "¡Bienvenido a la API del Checador!"}
\ No newline at end of file
+    return {"status": "ok", "message": "¡Bienvenido a la API del Checador!"}
+
+
+@app.get("/startup-status", tags=["Health Check"])
+def estado_subsistemas():
+    """
+    Qué clientes del registro ya se inicializaron en este worker y cuánto
+    tardaron (el modelo facial se reporta en /vision/model-status).
+    """
+    return registry.status()
\ No newline at end of file
@@ -5,7 +5,7 @@
 #            estructura de datos.
 # ===============================================================
 from sqlalchemy import (Column, Integer, String, ForeignKey, BLOB, TEXT,
-                        UniqueConstraint, TIME, DATE, DATETIME, DECIMAL)
+                        UniqueConstraint, Index, TIME, DATE, DATETIME, DECIMAL, text)
 from sqlalchemy.orm import relationship
 from ..database.database import Base
 
@@ -43,8 +43,13 @@ class Usuario(Base):
     nombre_completo = Column(String(150), nullable=False)
     email = Column(String(255), unique=True, nullable=False, index=True)
     google_id = Column(String(255), unique=True, nullable=True) # Reutilizado para el UID de Firebase
-    plantilla_huella = Column(BLOB, nullable=True)
-    plantilla_facial = Column(TEXT, nullable=True)
+    plantilla_huella = Column(BLOB, nullable=True) # Formato compacto (ver fingerprint_storage); filas viejas: texto UTF-8
+    huella_digest = Column(String(64), nullable=True, index=True) # SHA-256 de la plantilla de huella normalizada
+    huella_version = Column(Integer, nullable=True, index=True) # Versión de la galería en que cambió la plantilla (sync de terminales)
+    plantilla_facial = Column(TEXT, nullable=True) # Heredado: JSON del embedding (ver embedding_facial)
+    embedding_facial = Column(BLOB, nullable=True) # float32 little-endian crudo
+    embedding_modelo = Column(String(50), nullable=True) # Modelo que generó el embedding (ej. 'VGG-Face')
+    embedding_dim = Column(Integer, nullable=True) # Número de valores float32 en embedding_facial
     costCenter = Column(String(4), nullable=True)
     # Llaves Foráneas
     id_rol = Column(Integer, ForeignKey("Roles.id_rol"), nullable=True)
@@ -56,6 +61,7 @@ class Usuario(Base):
     asignaciones = relationship("AsignacionHorario", back_populates="usuario", cascade="all, delete-orphan")
     registros_asistencia = relationship("RegistroAsistencia", back_populates="usuario", cascade="all, delete-orphan")
     eventos_adicionales = relationship("EventoAdicional", back_populates="usuario", cascade="all, delete-orphan")
+    resumenes_asistencia = relationship("ResumenAsistenciaDiaria", back_populates="usuario", cascade="all, delete-orphan")
     
 # --- Tabla 5: Asignación de Horarios ---
 class AsignacionHorario(Base):
@@ -83,6 +89,15 @@ class RegistroAsistencia(Base):
     id_usuario = Column(Integer, ForeignKey("Usuarios.id_usuario"), nullable=False)
     # Relación Directa
     usuario = relationship("Usuario", back_populates="registros_asistencia")
+    # A lo más un registro abierto (sin salida) por usuario y día: índice
+    # único parcial. Solo SQLite/PostgreSQL lo soportan; en MySQL se emula
+    # con una columna generada (ver tablas.sql).
+    __table_args__ = (
+        Index(
+            "ux_registro_abierto", "id_usuario", "fecha", unique=True,
+            sqlite_where=text("hora_salida IS NULL"), postgresql_where=text("hora_salida IS NULL")
+        ).ddl_if(dialect=("sqlite", "postgresql")),
+    )
 
 # --- Tabla 7: Eventos Adicionales ---
 class EventoAdicional(Base):
@@ -98,3 +113,41 @@ class EventoAdicional(Base):
     id_usuario = Column(Integer, ForeignKey("Usuarios.id_usuario"), nullable=False)
     # Relación Directa
     usuario = relationship("Usuario", back_populates="eventos_adicionales")
+
+# --- Tabla 8: Resumen Diario de Asistencia ---
+# Estatus y retardo ya calculados por usuario y día. Se mantiene al escribir
+# (checador y asignaciones) para que el reporte de un día cerrado sea un
+# simple escaneo por índice. Se repara con app/scripts/rebuild_attendance_summary.py
+class ResumenAsistenciaDiaria(Base):
+    __tablename__ = "ResumenesAsistencia"
+    id_resumen = Column(Integer, primary_key=True)
+    fecha = Column(DATE, nullable=False, index=True)
+    hora_programada = Column(TIME, nullable=True) # Entrada del turno asignado
+    hora_entrada = Column(DATETIME, nullable=True) # Primera entrada del día
+    hora_salida = Column(DATETIME, nullable=True)
+    estado = Column(String(20), nullable=False) # 'Asistencia', 'Retardo', 'Ausencia', 'Sin Asignación'
+    minutos_retardo = Column(Integer, nullable=False, default=0)
+    # Llave Foránea
+    id_usuario = Column(Integer, ForeignKey("Usuarios.id_usuario"), nullable=False)
+    # Relación Directa
+    usuario = relationship("Usuario", back_populates="resumenes_asistencia")
+    # Restricción Única
+    __table_args__ = (UniqueConstraint('id_usuario', 'fecha', name='_resumen_usuario_fecha_uc'),)
+
+# --- Tabla 9: Contadores de Versión ---
+# Un renglón por secuencia (p. ej. 'huellas': versión de la galería de huellas
+# que usan las terminales como cursor). Se incrementa con un UPDATE que deja
+# la fila bloqueada hasta el commit, así que las versiones se confirman en orden.
+class ContadorVersion(Base):
+    __tablename__ = "ContadoresVersion"
+    nombre = Column(String(50), primary_key=True)
+    valor = Column(Integer, nullable=False, default=0)
+
+# --- Tabla 10: Huellas Eliminadas ---
+# Marca (tombstone) de una plantilla de huella borrada, con su versión de la
+# galería, para que la sincronización incremental la quite de las terminales.
+class HuellaEliminada(Base):
+    __tablename__ = "HuellasEliminadas"
+    id_eliminacion = Column(Integer, primary_key=True)
+    numero_empleado = Column(String(20), nullable=False)
+    huella_version = Column(Integer, nullable=False, index=True)
@@ -4,6 +4,7 @@
 #            salidas de los empleados (el checador).
 # ===============================================================
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, datetime, timezone
@@ -13,6 +14,7 @@ from ..models import tablas as models
 from ..schemas import esquemas as schemas
 from ..database.database import get_db
 from ..core.auth_utils import get_current_active_user
+from ..services import attendance_summary_service
 
 # Creamos un nuevo router para organizar estos endpoints
 router = APIRouter(
@@ -27,7 +29,9 @@ def registrar_check_in(
 ):
     """
     Registra la hora de entrada (check-in) para el usuario autenticado.
-    Valida que no exista ya un registro abierto para el día de hoy.
+    Valida que no exista ya un registro abierto para el día de hoy; si dos
+    check-in llegan a la vez, el índice ux_registro_abierto rechaza el
+    segundo y también recibe 409.
     """
     hoy = datetime.now(timezone.utc).date()
     
@@ -48,11 +52,22 @@ def registrar_check_in(
     ahora_utc = datetime.now(timezone.utc)
     nuevo_registro = models.RegistroAsistencia(
         id_usuario=current_user.id_usuario,
+        numero_empleado=current_user.numero_empleado,
         fecha=hoy,
         hora_entrada=ahora_utc
     )
     
-    db.add(nuevo_registro)
+    try:
+        db.add(nuevo_registro)
+        db.flush()
+    except IntegrityError:
+        # Otro check-in simultáneo abrió el registro de hoy entre la consulta y el INSERT.
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Ya tienes un registro de entrada abierto para hoy. Debes hacer check-out primero."
+        )
+    attendance_summary_service.refresh_daily_summary(db, current_user.id_usuario, hoy)
     db.commit()
     db.refresh(nuevo_registro)
     
@@ -93,6 +108,7 @@ def registrar_check_out(
         )
 
     registro_a_cerrar.hora_salida = ahora_utc
+    attendance_summary_service.refresh_daily_summary(db, current_user.id_usuario, hoy)
     db.commit()
     db.refresh(registro_a_cerrar)
     
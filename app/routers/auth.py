@@ -1,11 +1,12 @@
 # app/routers/auth.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 
 from app.database.database import get_db
 from app.core.security import verify_firebase_token
-from app.services import user_service, face_service # Asumimos que el alta facial crea el usuario
+from app.services import user_service, face_service, face_index_service, embedding_storage # Asumimos que el alta facial crea el usuario
+from app.services.face_model_service import face_model
 from app.models import tablas as models
 from app.schemas import esquemas as schemas
 
@@ -19,36 +20,73 @@ class EnrollFacePayload(BaseModel):
     nombre_completo: str
     email: EmailStr
 
-# --- Endpoint de Alta Facial ---
-@router.post("/enroll-face", response_model=schemas.Usuario, status_code=status.HTTP_201_CREATED)
-def alta_facial(payload: EnrollFacePayload, db: Session = Depends(get_db)):
-    """
-    Crea un nuevo usuario en el sistema y le asigna su plantilla facial.
-    La operación es validada por el token de un administrador/operador.
-    """
+def _alta_facial(
+    db: Session,
+    firebase_token: str,
+    image_bytes: bytes,
+    numero_empleado: str,
+    nombre_completo: str,
+    email: str,
+    detalle_invalida: str = face_service.DETALLE_IMAGEN_INVALIDA
+) -> models.Usuario:
     # 1. Verificamos que quien hace la petición esté autenticado vía Firebase.
-    verify_firebase_token(payload.firebase_token)
+    token_data = verify_firebase_token(firebase_token)
 
     # 2. Generamos el embedding facial a partir de la imagen
-    embedding_facial_json = face_service.generate_embedding(payload.image_base64)
+    embedding_facial = face_service.generate_embedding_from_bytes(image_bytes, detalle_invalida, token_data.get("uid"))
 
     # 3. Verificamos si el usuario ya existe
     usuario_existente = db.query(models.Usuario).filter(
-        (models.Usuario.numero_empleado == payload.numero_empleado) | (models.Usuario.email == payload.email)
+        (models.Usuario.numero_empleado == numero_empleado) | (models.Usuario.email == email)
     ).first()
     if usuario_existente:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Ya existe un empleado con ese número o email.")
 
     # 4. Creamos el nuevo usuario con su plantilla facial
     nuevo_usuario = models.Usuario(
-        numero_empleado=payload.numero_empleado,
-        nombre_completo=payload.nombre_completo,
-        email=payload.email,
-        plantilla_facial=embedding_facial_json
+        numero_empleado=numero_empleado,
+        nombre_completo=nombre_completo,
+        email=email
     )
+    embedding_storage.set_user_embedding(nuevo_usuario, embedding_facial, face_model.model_name)
     
     db.add(nuevo_usuario)
     db.commit()
     db.refresh(nuevo_usuario)
-    
-    return nuevo_usuario
\ No newline at end of file
+
+    # 5. Lo agregamos al índice 1:N sin recargar todas las plantillas.
+    face_index_service.add_template(db, nuevo_usuario.id_usuario, embedding_facial)
+
+    return nuevo_usuario
+
+# --- Endpoint de Alta Facial ---
+@router.post("/enroll-face", response_model=schemas.Usuario, status_code=status.HTTP_201_CREATED)
+def alta_facial(payload: EnrollFacePayload, db: Session = Depends(get_db)):
+    """
+    Crea un nuevo usuario en el sistema y le asigna su plantilla facial.
+    La operación es validada por el token de un administrador/operador.
+    """
+    return _alta_facial(
+        db,
+        payload.firebase_token,
+        face_service.decode_base64_image(payload.image_base64),
+        payload.numero_empleado,
+        payload.nombre_completo,
+        payload.email,
+        face_service.DETALLE_BASE64_INVALIDO
+    )
+
+@router.post("/enroll-face/upload", response_model=schemas.Usuario, status_code=status.HTTP_201_CREATED)
+def alta_facial_multipart(
+    image: UploadFile = File(...),
+    firebase_token: str = Form(...),
+    numero_empleado: str = Form(...),
+    nombre_completo: str = Form(...),
+    email: EmailStr = Form(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Igual que /enroll-face, pero con la foto como archivo multipart/form-data
+    en lugar de Base64 dentro del JSON.
+    """
+    return _alta_facial(db, firebase_token, image.file.read(), numero_empleado, nombre_completo, email)
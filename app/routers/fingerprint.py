@@ -1,5 +1,8 @@
 # app/routers/fingerprint.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 
@@ -7,7 +10,8 @@ from app.database.database import get_db
 from app.core.security import verify_firebase_token
 from app.models import tablas as models
 from app.schemas import esquemas as schemas
-from app.services import attendance_service, user_service
+from app.services import attendance_service, user_service, fingerprint_service, fingerprint_sync_service
+from app.services.fingerprint_storage import COMPACT_MEDIA_TYPE, compact_template, decode_template
 
 # --- Router Principal para Huellas ---
 router = APIRouter(
@@ -32,6 +36,9 @@ class AddFingerprintPayload(BaseModel):
 class AttendancePayload(BaseModel):
     numero_empleado: str
 
+class IdentifyFingerprintPayload(BaseModel):
+    huella_datos: str # Plantilla capturada por el lector
+
 # --- Endpoints Consolidados ---
 
 @router.post("/enroll", response_model=schemas.Usuario, status_code=status.HTTP_201_CREATED)
@@ -53,10 +60,13 @@ def enroll_user_with_fingerprint(payload: EnrollFingerprintPayload, db: Session
     return nuevo_usuario
 
 @router.get("/template/{numero_empleado}", response_model=dict)
-def get_fingerprint_template(numero_empleado: str, db: Session = Depends(get_db)):
+def get_fingerprint_template(numero_empleado: str, accept: Optional[str] = Header(None), db: Session = Depends(get_db)):
     """
     Busca un empleado por su número y devuelve su plantilla de huella guardada.
     ¡ESTA ES LA RUTA QUE DEBES USAR AHORA PARA TU GET!
+    Los clientes que mandan `Accept: application/x-fingerprint-template`
+    reciben la plantilla compacta tal como está guardada (sin JSON ni
+    descompresión); los demás, el JSON de siempre con el texto original.
     """
     print(f"Buscando plantilla para el empleado: {numero_empleado}")
     usuario = db.query(models.Usuario).filter(models.Usuario.numero_empleado == numero_empleado).first()
@@ -73,12 +83,45 @@ def get_fingerprint_template(numero_empleado: str, db: Session = Depends(get_db)
             detail=f"El empleado {numero_empleado} no tiene una huella registrada."
         )
 
-    # El tipo BLOB de la BD se devuelve como bytes, lo decodificamos a string
-    # para que sea un JSON válido y el cliente lo pueda usar.
     print(f"--> Plantilla encontrada para {numero_empleado}. Enviando al cliente.")
-    return {"huella_template": usuario.plantilla_huella.decode('utf-8')}
+    if COMPACT_MEDIA_TYPE in (accept or ""):
+        return Response(content=compact_template(usuario.plantilla_huella), media_type=COMPACT_MEDIA_TYPE)
+
+    # El BLOB de la BD (compacto o heredado) se convierte al texto original
+    # para que sea un JSON válido y el cliente lo pueda usar.
+    return {"huella_template": decode_template(usuario.plantilla_huella)}
 
 
+@router.get("/sync")
+def sync_fingerprint_templates(
+    desde: int = Query(0, ge=0, description="Versión de la galería que ya tiene la terminal (0 = descarga completa)"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Sincronización de la galería de huellas para las terminales: devuelve
+    en un solo lote (NDJSON, gzip si el cliente lo acepta) las plantillas
+    que cambiaron o se eliminaron después de la versión `desde`. El encabezado del lote trae la
+    nueva versión, que la terminal manda como `desde` la próxima vez junto
+    con el ETag en If-None-Match: si la galería no cambió, responde 304.
+    """
+    version, total = fingerprint_sync_service.gallery_state(db)
+    etag = fingerprint_sync_service.gallery_etag(version, total)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+    if fingerprint_sync_service.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    comprimir = "gzip" in (accept_encoding or "").lower()
+    if comprimir:
+        headers["Content-Encoding"] = "gzip"
+    print(f"--- Sync de huellas: versión {desde} -> {version} ({total} plantillas en la galería) ---")
+    return StreamingResponse(
+        fingerprint_sync_service.stream_changes(desde, version, comprimir),
+        media_type=fingerprint_sync_service.MEDIA_TYPE,
+        headers=headers
+    )
 
 @router.post("/record-attendance")
 def record_attendance_after_verification(payload: AttendancePayload, db: Session = Depends(get_db)):
@@ -97,3 +140,21 @@ def record_attendance_after_verification(payload: AttendancePayload, db: Session
         "mensaje": registro["mensaje"],
         "registro": registro["data"]
     }
+
+@router.post("/identify")
+def identify_and_record_attendance(payload: IdentifyFingerprintPayload, db: Session = Depends(get_db)):
+    """
+    Identifica al empleado por su huella (una búsqueda indexada por el
+    digest de la plantilla) y registra su entrada o salida en la misma
+    petición, sin el viaje previo a /template/{numero_empleado}.
+    """
+    usuario = fingerprint_service.identify_by_template(db, payload.huella_datos)
+    registro = attendance_service.register_attendance(db=db, usuario=usuario)
+
+    return {
+        "verificado": True,
+        "numero_empleado": usuario.numero_empleado,
+        "nombre_completo": usuario.nombre_completo,
+        "mensaje": registro["mensaje"],
+        "registro": registro["data"]
+    }
@@ -16,6 +16,7 @@ from ..schemas import esquemas as schemas
 from ..database.database import get_db
 # Asumimos que tienes un archivo con esta función para proteger rutas
 from ..core.auth_utils import get_current_active_user
+from ..services import attendance_summary_service
 
 # Creamos un nuevo router para organizar estos endpoints
 router = APIRouter(
@@ -68,6 +69,9 @@ def crear_asignacion_horario(
     db_asignacion = models.AsignacionHorario(**asignacion.model_dump())
     try:
         db.add(db_asignacion)
+        db.flush()
+        # Mantenemos al día el resumen de asistencia de esa fecha.
+        attendance_summary_service.refresh_daily_summary(db, db_asignacion.id_usuario, db_asignacion.fecha)
         db.commit()
         db.refresh(db_asignacion)
         return db_asignacion
@@ -2,48 +2,205 @@
 # ARCHIVO: app/routers/vision.py
 # PROPÓSITO: Endpoint para el checador con reconocimiento facial.
 # ===============================================================
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, File, Form, Header, HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import Optional
 from sqlalchemy.orm import Session
 # --- Importaciones de nuestra arquitectura ---
 from ..database.database import get_db
 from ..core.security import verify_firebase_token
-from ..services import vision_service, attendance_service,face_service
+from ..services import vision_service, attendance_service,face_service, face_index_service, embedding_storage
+from ..services.face_model_service import face_model
+from ..services.face_worker_pool import face_pool
+from ..services.face_batcher import face_batcher
+from ..services.face_metrics import face_metrics
+from ..services.vision_batcher import vision_batcher
+from ..services.embedding_cache import embedding_cache
 from ..models import tablas as models
 from ..schemas import esquemas as schemas
 router = APIRouter()
+# Candidatos que se piden al índice en 1:N (por si los primeros ya no existen en la BD).
+_CANDIDATOS_IDENTIFICACION = 5
 # --- Modelo Pydantic para la Petición ---
 class FaceCheckPayload(BaseModel):
     image_base64: str
     firebase_token: str
 
-@router.post("/face-check", tags=["Checador Facial"])
-def checador_facial(
-    payload: FaceCheckPayload,
-    db: Session = Depends(get_db)
-):
+class FaceIdentifyPayload(BaseModel):
+    image_base64: str
+    firebase_token: str # Token del operador/kiosco, no del empleado
+
+@router.get("/model-status", tags=["Checador Facial"])
+def estado_modelo_facial():
+    """
+    Indica si el modelo facial ya está cargado y caliente (en los procesos
+    de inferencia o, si el pool está deshabilitado, en este proceso).
+    Útil como readiness check del balanceador: 503 mientras carga o si
+    falló. Si nadie lo ha pedido ("not_started", sin face_model en
+    EAGER_INIT) responde 200: la primera petición facial lo carga.
+    """
+    if face_pool.enabled:
+        estado = {"model": face_model.model_name, **face_pool.status()}
+    else:
+        estado = face_model.status()
+    estado["batching"] = face_batcher.status()
+    if estado["state"] in ("loading", "failed"):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=estado)
+    return estado
+
+def _bearer_token(authorization: Optional[str]) -> str:
+    """Extrae el token de Firebase del header 'Authorization: Bearer <token>'."""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header no válido")
+    return authorization.split("Bearer ")[1]
+
+def _checar_rostro(db: Session, firebase_token: str, image_bytes: bytes,
+                   detalle_invalida: str = face_service.DETALLE_IMAGEN_INVALIDA) -> dict:
+    """Verificación 1:1 del usuario del token y registro de su asistencia."""
     # 1. Autenticar al usuario (sin cambios)
-    token_data = verify_firebase_token(payload.firebase_token)
+    token_data = verify_firebase_token(firebase_token)
     email = token_data.get("email")
     usuario = db.query(models.Usuario).filter(models.Usuario.email == email).first()
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuario no encontrado.")
     # --- INICIO DE LA LÓGICA DE VERIFICACIÓN ---
     # 2. Comparamos el rostro de la foto actual con la plantilla guardada.
-    coinciden = face_service.verify_faces_match(
-        image_base64_check=payload.image_base64,
-        stored_embedding_json=usuario.plantilla_facial
+    resultado = face_service.verify_faces_match(
+        image_bytes_check=image_bytes,
+        stored_embedding=embedding_storage.load_user_embedding(usuario),
+        detalle_invalida=detalle_invalida,
+        origen=token_data.get("uid") or email
     )
-    if not coinciden:
+    if not resultado["verified"]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Verificación facial fallida. El rostro no coincide."
+            detail={
+                "mensaje": "Verificación facial fallida. El rostro no coincide.",
+                "distancia": resultado["distance"],
+                "umbral": resultado["threshold"]
+            }
         )
     # --- FIN DE LA LÓGICA DE VERIFICACIÓN ---
     # 3. Si coinciden, registramos la asistencia (sin cambios)
-    registro = attendance_service.register_attendance(db=db, user_id=usuario.id_usuario)    
+    registro = attendance_service.register_attendance(db=db, usuario=usuario)
+    return {
+        "verificado": True,
+        "distancia": resultado["distance"],
+        "umbral": resultado["threshold"],
+        "mensaje": registro["mensaje"],
+        "registro": registro["data"]
+    }
+
+def _identificar_rostro(db: Session, firebase_token: str, image_bytes: bytes,
+                        detalle_invalida: str = face_service.DETALLE_IMAGEN_INVALIDA) -> dict:
+    """Identificación 1:N contra todas las plantillas y registro de asistencia."""
+    token_data = verify_firebase_token(firebase_token)
+
+    # El filtro de cuadros repetidos va por kiosco (uid del token del operador).
+    embedding = face_service.generate_embedding_from_bytes(image_bytes, detalle_invalida, token_data.get("uid"))
+    candidatos = face_index_service.identify(db, embedding, k=_CANDIDATOS_IDENTIFICACION)
+    umbral = face_index_service.umbral_identificacion()
+    usuario = None
+    for id_usuario, distancia in candidatos:
+        if distancia > umbral:
+            break
+        # El índice de este proceso puede conservar a un usuario ya borrado: se pasa al siguiente.
+        usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == id_usuario).first()
+        if usuario:
+            break
+    if not usuario:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Identificación facial fallida. El rostro no coincide con ningún empleado."
+        )
+
+    registro = attendance_service.register_attendance(db=db, usuario=usuario)
     return {
         "verificado": True,
+        "numero_empleado": usuario.numero_empleado,
+        "nombre_completo": usuario.nombre_completo,
+        "distancia": distancia,
         "mensaje": registro["mensaje"],
         "registro": registro["data"]
     }
+
+@router.get("/metrics", tags=["Checador Facial"])
+def metricas_faciales():
+    """
+    Tiempos promedio y máximos por etapa del pipeline facial (decode,
+    resize, detect, embed), agrupados por tamaño de la imagen de entrada,
+    más el tamaño y la memoria del índice de identificación.
+    """
+    return {
+        **face_metrics.snapshot(),
+        "index": face_index_service.face_index.stats(),
+        "ivf_index": face_index_service.ivf_index.stats(),
+        "vision_batching": vision_batcher.status(),
+        "embedding_cache": embedding_cache.status()
+    }
+
+@router.post("/face-detect", tags=["Checador Facial"])
+async def detectar_rostro(payload: FaceCheckPayload):
+    """
+    Detecta un rostro con Google Vision. Es asíncrono: las peticiones
+    concurrentes se agrupan en una sola llamada batch_annotate_images.
+    """
+    await run_in_threadpool(verify_firebase_token, payload.firebase_token)
+    rostro = await vision_service.detect_face_from_base64_async(payload.image_base64)
+    return {"face_detected": True, "confidence": rostro.detection_confidence}
+
+@router.post("/face-check", tags=["Checador Facial"])
+def checador_facial(
+    payload: FaceCheckPayload,
+    db: Session = Depends(get_db)
+):
+    """Checador facial con la imagen en Base64 dentro del JSON."""
+    image_bytes = face_service.decode_base64_image(payload.image_base64)
+    return _checar_rostro(db, payload.firebase_token, image_bytes, face_service.DETALLE_BASE64_INVALIDO)
+
+@router.post("/face-check/upload", tags=["Checador Facial"])
+def checador_facial_multipart(
+    image: UploadFile = File(...),
+    firebase_token: str = Form(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Checador facial con la imagen como archivo multipart/form-data.
+    Evita el ~33% extra del Base64 y el parseo del JSON.
+    """
+    return _checar_rostro(db, firebase_token, image.file.read())
+
+@router.post("/face-check/raw", tags=["Checador Facial"])
+def checador_facial_binario(
+    image: bytes = Body(..., media_type="application/octet-stream"),
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Checador facial con los bytes de la imagen como cuerpo
+    (application/octet-stream) y el token en 'Authorization: Bearer'.
+    """
+    return _checar_rostro(db, _bearer_token(authorization), image)
+
+@router.post("/face-identify", tags=["Checador Facial"])
+def identificacion_facial(
+    payload: FaceIdentifyPayload,
+    db: Session = Depends(get_db)
+):
+    """
+    Checador de kiosco compartido: identifica al empleado (1:N) contra
+    todas las plantillas enroladas y registra su asistencia si la mejor
+    coincidencia está por debajo del umbral de distancia.
+    """
+    image_bytes = face_service.decode_base64_image(payload.image_base64)
+    return _identificar_rostro(db, payload.firebase_token, image_bytes, face_service.DETALLE_BASE64_INVALIDO)
+
+@router.post("/face-identify/raw", tags=["Checador Facial"])
+def identificacion_facial_binaria(
+    image: bytes = Body(..., media_type="application/octet-stream"),
+    authorization: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Igual que /face-identify, con la imagen en binario y el token del kiosco en el header."""
+    return _identificar_rostro(db, _bearer_token(authorization), image)
@@ -0,0 +1,117 @@
+# ===============================================================
+# ARCHIVO: app/scripts/bench_embedding_backends.py
+# PROPÓSITO: Compara los backends de embeddings (DeepFace/TensorFlow vs
+#            ONNX Runtime):
+#            - Paridad: misma entrada, distancia coseno máxima entre las
+#              salidas; termina con código 1 si pasa la tolerancia.
+#            - Latencia (p50/p95 por lote) y memoria residente (RSS),
+#              cada backend en su propio proceso para no mezclar memoria.
+#
+# Uso:
+#   python -m app.scripts.bench_embedding_backends [--iteraciones 50] [--tolerancia 1e-4]
+# ===============================================================
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from app.core.config import FACE_MODEL_NAME
+from app.services.embedding_backends import BACKENDS, create_backend
+
+
+def _rss_mb() -> float:
+    """Memoria residente actual del proceso (Linux), en MB."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _entradas(backend, batch: int, seed: int = 0) -> np.ndarray:
+    width, height = backend.input_shape
+    return np.random.default_rng(seed).random((batch, height, width, 3), dtype=np.float32)
+
+
+def medir_backend(nombre: str, iteraciones: int, lotes) -> dict:
+    """Se ejecuta en un subproceso: carga un backend y mide latencia y RSS."""
+    rss_inicio = _rss_mb()
+    inicio = time.perf_counter()
+    backend = create_backend(FACE_MODEL_NAME, nombre)
+    backend.forward(_entradas(backend, 1))
+    carga_s = time.perf_counter() - inicio
+
+    resultados = {"backend": nombre, "load_seconds": round(carga_s, 3), "rss_load_mb": round(_rss_mb() - rss_inicio, 1)}
+    for lote in lotes:
+        entrada = _entradas(backend, lote)
+        tiempos = []
+        for _ in range(iteraciones):
+            t0 = time.perf_counter()
+            backend.forward(entrada)
+            tiempos.append((time.perf_counter() - t0) * 1000)
+        resultados[f"batch_{lote}"] = {
+            "p50_ms": round(float(np.percentile(tiempos, 50)), 3),
+            "p95_ms": round(float(np.percentile(tiempos, 95)), 3),
+            "per_image_ms": round(float(np.median(tiempos)) / lote, 3)
+        }
+    resultados["rss_total_mb"] = round(_rss_mb(), 1)
+    return resultados
+
+
+def paridad(tolerancia: float, muestras: int = 16) -> dict:
+    """Misma entrada en ambos backends; reporta las diferencias máximas."""
+    referencia = create_backend(FACE_MODEL_NAME, "deepface")
+    candidato = create_backend(FACE_MODEL_NAME, "onnx")
+    entrada = _entradas(referencia, muestras, seed=123)
+
+    a = referencia.forward(entrada)
+    b = candidato.forward(entrada)
+    a_n = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b_n = b / np.linalg.norm(b, axis=1, keepdims=True)
+    coseno = 1.0 - np.sum(a_n * b_n, axis=1)
+
+    return {
+        "max_abs_diff": float(np.max(np.abs(a - b))),
+        "max_cosine_distance": float(np.max(coseno)),
+        "tolerance": tolerancia,
+        "ok": bool(np.max(coseno) <= tolerancia)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark y paridad de backends de embeddings.")
+    parser.add_argument("--iteraciones", type=int, default=50)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--tolerancia", type=float, default=1e-4, help="Distancia coseno máxima aceptada entre backends")
+    parser.add_argument("--solo", choices=list(BACKENDS), help=argparse.SUPPRESS) # uso interno (subproceso)
+    args = parser.parse_args()
+
+    if args.solo:
+        print(json.dumps(medir_backend(args.solo, args.iteraciones, args.lotes)))
+        return
+
+    reporte = {"model": FACE_MODEL_NAME, "backends": []}
+    for nombre in BACKENDS:
+        comando = [sys.executable, "-m", "app.scripts.bench_embedding_backends", "--solo", nombre,
+                   "--iteraciones", str(args.iteraciones), "--lotes", *map(str, args.lotes)]
+        proceso = subprocess.run(comando, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            reporte["backends"].append({"backend": nombre, "error": proceso.stderr.strip().splitlines()[-1:]})
+            continue
+        reporte["backends"].append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+    reporte["parity"] = paridad(args.tolerancia)
+    print(json.dumps(reporte, indent=2))
+    if not reporte["parity"]["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# ===============================================================
+# ARCHIVO: app/scripts/bench_face_index.py
+# PROPÓSITO: Compara los índices faciales contra la búsqueda exacta
+#            float32 con una galería sintética:
+#            - int8 (con y sin reordenamiento exacto): recall, latencia
+#              y memoria.
+#            - IVF con varios nprobe: recall y latencia.
+#
+# Uso:
+#   python -m app.scripts.bench_face_index [--tamanos 1000 10000 100000] [--dim 2622] [--nprobe 1 8 32]
+# ===============================================================
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.services.face_index_service import FaceIndex
+from app.services.face_ivf_index import IVFIndex
+
+
+def _galeria(n: int, dim: int, consultas: int, ruido: float, seed: int):
+    """Plantillas aleatorias y consultas = plantilla + ruido (misma persona, otra foto)."""
+    rng = np.random.default_rng(seed)
+    galeria = rng.standard_normal((n, dim), dtype=np.float32)
+    objetivos = rng.choice(n, size=consultas, replace=False)
+    ruido_mat = rng.standard_normal((consultas, dim), dtype=np.float32)
+    ruido_mat *= ruido * np.linalg.norm(galeria[objetivos], axis=1, keepdims=True) / np.sqrt(dim)
+    return galeria, galeria[objetivos] + ruido_mat
+
+
+def _medir(buscar, consultas: np.ndarray, verdad: list, k: int) -> dict:
+    aciertos_1 = aciertos_k = 0
+    tiempos = []
+    for q, esperado in zip(consultas, verdad):
+        t0 = time.perf_counter()
+        resultado = buscar(q, k)
+        tiempos.append((time.perf_counter() - t0) * 1000)
+        ids = [i for i, _ in resultado]
+        aciertos_1 += ids[:1] == esperado[:1]
+        aciertos_k += len(set(ids) & set(esperado)) / len(esperado)
+    return {
+        "recall_at_1": round(aciertos_1 / len(consultas), 4),
+        f"recall_at_{k}": round(aciertos_k / len(consultas), 4),
+        "p50_ms": round(float(np.percentile(tiempos, 50)), 3),
+        "p95_ms": round(float(np.percentile(tiempos, 95)), 3)
+    }
+
+
+def comparar(n: int, dim: int, consultas: int, k: int, rerank: int, ruido: float,
+             nprobes: list, nlist: int = 0, seed: int = 0) -> dict:
+    galeria, queries = _galeria(n, dim, consultas, ruido, seed)
+    ids = np.arange(n, dtype=np.int64)
+
+    base = FaceIndex()
+    base.build(ids, galeria)
+    cuantizado = FaceIndex(quantized=True, rerank=rerank)
+    cuantizado.build(ids, galeria)
+
+    # La verdad es el top-k exacto de la línea base float32.
+    verdad = [[i for i, _ in base.search(q, k=k)] for q in queries]
+    loader = lambda candidatos: (candidatos, galeria[candidatos])
+
+    t0 = time.perf_counter()
+    ivf = IVFIndex()
+    ivf.train(ids, galeria, "sintetico", nlist=nlist, seed=seed)
+    entrenamiento_s = time.perf_counter() - t0
+
+    return {
+        "size": n,
+        "dim": dim,
+        "float32": {"memory_bytes": base.memory_bytes(), **_medir(base.search, queries, verdad, k)},
+        "int8": {"memory_bytes": cuantizado.memory_bytes(), **_medir(cuantizado.search, queries, verdad, k)},
+        "int8_rerank": {
+            "memory_bytes": cuantizado.memory_bytes(),
+            **_medir(lambda q, k: cuantizado.search(q, k=k, exact_loader=loader), queries, verdad, k)
+        },
+        "memory_ratio": round(cuantizado.memory_bytes() / base.memory_bytes(), 3),
+        "ivf": {
+            "nlist": ivf.stats()["nlist"],
+            "train_seconds": round(entrenamiento_s, 2),
+            **{
+                f"nprobe_{p}": _medir(lambda q, k, p=p: ivf.search(q, k=k, nprobe=p), queries, verdad, k)
+                for p in nprobes
+            }
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall, latencia y memoria de los índices faciales vs búsqueda exacta.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[1000, 10000, 100000], help="Tamaños de galería a probar.")
+    parser.add_argument("--dim", type=int, default=2622, help="Dimensión de los embeddings (VGG-Face = 2622).")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rerank", type=int, default=10, help="Candidatos por resultado a reordenar con el vector exacto.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32], help="Listas IVF a revisar por consulta.")
+    parser.add_argument("--nlist", type=int, default=0, help="Listas IVF; 0 = ~sqrt(N).")
+    parser.add_argument("--ruido", type=float, default=0.5, help="Ruido relativo de las consultas respecto a su plantilla.")
+    args = parser.parse_args()
+
+    resultados = [
+        comparar(n, args.dim, min(args.consultas, n), args.k, args.rerank, args.ruido, args.nprobe, args.nlist)
+        for n in args.tamanos
+    ]
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# ===============================================================
+# ARCHIVO: app/scripts/bench_face_pipeline.py
+# PROPÓSITO: Suite de benchmarks del pipeline facial, sin red:
+#            - decode:   decodificación (reducida) + reescalado, por tamaño de imagen.
+#            - detect:   detección y recorte del rostro, por tamaño de imagen.
+#            - embed:    pasada del modelo, por tamaño de lote.
+#            - verify:   comparación 1:1 (distancia + umbral).
+#            - search:   identificación 1:N (float32 e int8), por tamaño de galería.
+#            - pipeline: extremo a extremo (batcher + procesos), por número de workers.
+#            Por defecto usa el backend 'fake' (determinista, sin TensorFlow
+#            ni DeepFace) para que corra en cualquier Linux; con --real usa
+#            el backend y detector configurados. El resultado es JSON para
+#            comparar corridas en el tiempo.
+#
+# Uso:
+#   python -m app.scripts.bench_face_pipeline [--salida bench.json] [--real]
+#       [--imagenes 640x480 1920x1080] [--galerias 1000 10000] [--workers 0 2]
+# ===============================================================
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def _stats(tiempos_ms: list) -> dict:
+    return {
+        "n": len(tiempos_ms),
+        "p50_ms": round(float(np.percentile(tiempos_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(tiempos_ms, 95)), 3),
+        "mean_ms": round(float(np.mean(tiempos_ms)), 3)
+    }
+
+
+def _medir(fn, iteraciones: int) -> dict:
+    fn() # Calentamiento (cachés, asignaciones perezosas)
+    tiempos = []
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    return _stats(tiempos)
+
+
+def imagen_sintetica(width: int, height: int, seed: int = 0) -> bytes:
+    """JPEG determinista: fondo con gradiente y ruido más un óvalo claro al centro."""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    ys, xs = np.mgrid[0:height, 0:width]
+    fondo = ((xs / width) * 120 + (ys / height) * 60).astype(np.uint8)
+    image = np.stack([fondo, fondo // 2 + 40, 200 - fondo // 2], axis=-1)
+    image = np.clip(image + rng.integers(-20, 20, image.shape), 0, 255).astype(np.uint8)
+    centro, ejes = (width // 2, height // 2), (width // 7, height // 4)
+    cv2.ellipse(image, centro, ejes, 0, 0, 360, (150, 170, 210), -1)
+    cv2.circle(image, (centro[0] - ejes[0] // 2, centro[1] - ejes[1] // 4), max(2, ejes[0] // 8), (40, 40, 40), -1)
+    cv2.circle(image, (centro[0] + ejes[0] // 2, centro[1] - ejes[1] // 4), max(2, ejes[0] // 8), (40, 40, 40), -1)
+    ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return jpeg.tobytes()
+
+
+def bench_decode_detect(tamanos: list, iteraciones: int) -> tuple:
+    from app.services import face_service
+    from app.services.face_model_service import face_model
+
+    model = face_model.get_model()
+    decode, detect = {}, {}
+    for width, height in tamanos:
+        etiqueta = f"{width}x{height}"
+        jpeg = imagen_sintetica(width, height)
+        decode[etiqueta] = _medir(lambda: face_service._downscale(face_service._decode_image(jpeg)[0]), iteraciones)
+        image = face_service._downscale(face_service._decode_image(jpeg)[0])
+        try:
+            detect[etiqueta] = _medir(lambda: face_service._extract_face(image, model.input_shape), iteraciones)
+        except ValueError as e:
+            detect[etiqueta] = {"error": str(e)}
+    return decode, detect
+
+
+def bench_embed(lotes: list, iteraciones: int) -> dict:
+    from app.services.face_model_service import face_model
+
+    model = face_model.get_model()
+    width, height = model.input_shape
+    rng = np.random.default_rng(0)
+    resultados = {}
+    for lote in lotes:
+        faces = rng.random((lote, height, width, 3), dtype=np.float32)
+        stats = _medir(lambda: model.forward(faces), iteraciones)
+        stats["per_image_ms"] = round(stats["mean_ms"] / lote, 3)
+        resultados[f"batch_{lote}"] = stats
+    return resultados
+
+
+def bench_verify(iteraciones: int) -> dict:
+    from app.core.config import FACE_DISTANCE_METRIC
+    from app.services import face_distance
+    from app.services.face_model_service import face_model
+
+    model = face_model.get_model()
+    width, height = model.input_shape
+    dim = model.forward(np.zeros((1, height, width, 3), dtype=np.float32)).shape[1]
+    rng = np.random.default_rng(0)
+    a, b = rng.standard_normal(dim).astype(np.float32), rng.standard_normal(dim).astype(np.float32)
+    umbral = face_distance.get_threshold(face_model.model_name, FACE_DISTANCE_METRIC)
+    stats = _medir(lambda: face_distance.distance(a, b, FACE_DISTANCE_METRIC) <= umbral, iteraciones * 10)
+    return {"metric": FACE_DISTANCE_METRIC, "dim": dim, **stats}
+
+
+def bench_search(galerias: list, dim: int, iteraciones: int) -> dict:
+    from app.services.face_index_service import FaceIndex
+
+    resultados = {}
+    for n in galerias:
+        rng = np.random.default_rng(n)
+        galeria = rng.standard_normal((n, dim), dtype=np.float32)
+        consultas = galeria[rng.integers(0, n, iteraciones)] + 0.1 * rng.standard_normal((iteraciones, dim), dtype=np.float32)
+        por_modo = {}
+        for modo, index in (("float32", FaceIndex()), ("int8", FaceIndex(quantized=True))):
+            index.build(np.arange(n, dtype=np.int64), galeria)
+            i = iter(range(10 ** 9))
+            por_modo[modo] = {
+                "memory_bytes": index.memory_bytes(),
+                **_medir(lambda: index.search(consultas[next(i) % iteraciones], k=1), iteraciones)
+            }
+        resultados[str(n)] = por_modo
+    return resultados
+
+
+def bench_pipeline(workers_list: list, peticiones: int, concurrencia: int, jpeg: bytes,
+                   batch_size: int, window_ms: float) -> dict:
+    from app.services.face_batcher import FaceBatcher, _embed_batch
+    from app.services.face_worker_pool import FaceWorkerPool
+
+    resultados = {}
+    for workers in workers_list:
+        pool = FaceWorkerPool(workers, queue_depth=peticiones, retry_after=1)
+        batcher = FaceBatcher(pool, _embed_batch, batch_size, window_ms, max_admitted=peticiones, retry_after=1)
+        inicio_arranque = time.perf_counter()
+        pool.start()
+        if workers:
+            for warm in pool._warmups:
+                warm.result()
+        arranque_s = time.perf_counter() - inicio_arranque
+
+        latencias, errores, candado = [], [], threading.Lock()
+        pendientes = iter(range(peticiones))
+
+        def cliente():
+            while True:
+                with candado:
+                    if next(pendientes, None) is None:
+                        return
+                t0 = time.perf_counter()
+                try:
+                    batcher.embed(jpeg)
+                except Exception as e:
+                    with candado:
+                        errores.append(str(e))
+                with candado:
+                    latencias.append((time.perf_counter() - t0) * 1000)
+
+        inicio = time.perf_counter()
+        hilos = [threading.Thread(target=cliente) for _ in range(concurrencia)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        total = time.perf_counter() - inicio
+        pool.shutdown()
+
+        resultados[f"workers_{workers}"] = {
+            "startup_seconds": round(arranque_s, 3),
+            "images_per_second": round(peticiones / total, 1),
+            "errors": len(errores),
+            "avg_batch_size": round(batcher.status()["avg_batch_size"], 2),
+            **_stats(latencias)
+        }
+    return resultados
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline facial (salida JSON).")
+    parser.add_argument("--real", action="store_true", help="Usa el backend/detector configurados en lugar del falso")
+    parser.add_argument("--imagenes", nargs="+", default=["640x480", "1280x720", "1920x1080", "4000x3000"])
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--galerias", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--iteraciones", type=int, default=30)
+    parser.add_argument("--peticiones", type=int, default=64, help="Imágenes por corrida extremo a extremo")
+    parser.add_argument("--concurrencia", type=int, default=16, help="Clientes simultáneos extremo a extremo")
+    parser.add_argument("--fake-embed-ms", type=float, default=20.0, help="Costo simulado por imagen del backend falso")
+    parser.add_argument("--salida", default="", help="Archivo JSON de salida (por defecto, a la consola)")
+    args = parser.parse_args()
+
+    # La configuración se lee de variables de entorno al importar: se fija
+    # antes de importar los servicios (y la heredan los procesos de inferencia).
+    if not args.real:
+        os.environ["FACE_EMBEDDING_BACKEND"] = "fake"
+        os.environ["FACE_FAKE_EMBED_MS"] = str(args.fake_embed_ms)
+
+    from app.core.config import FACE_EMBEDDING_BACKEND, FACE_MODEL_NAME, FACE_BATCH_MAX_SIZE, FACE_BATCH_WINDOW_MS
+
+    tamanos = [tuple(int(v) for v in t.lower().split("x")) for t in args.imagenes]
+    print(f"--- Benchmark del pipeline facial (backend '{FACE_EMBEDDING_BACKEND}', modelo {FACE_MODEL_NAME}) ---", file=sys.stderr)
+
+    decode, detect = bench_decode_detect(tamanos, args.iteraciones)
+    verify = bench_verify(args.iteraciones)
+    resultado = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_rev": _git_rev(),
+            "backend": FACE_EMBEDDING_BACKEND,
+            "model": FACE_MODEL_NAME,
+            "fake_embed_ms": None if args.real else args.fake_embed_ms,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "machine": platform.machine()
+        },
+        "decode": decode,
+        "detect": detect,
+        "embed": bench_embed(args.lotes, args.iteraciones),
+        "verify": verify,
+        "search": bench_search(args.galerias, verify["dim"], args.iteraciones),
+        "pipeline": bench_pipeline(
+            args.workers, args.peticiones, args.concurrencia, imagen_sintetica(*tamanos[0]),
+            FACE_BATCH_MAX_SIZE, FACE_BATCH_WINDOW_MS
+        )
+    }
+
+    salida = json.dumps(resultado, indent=2)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(salida)
+        print(f"Resultados escritos en {args.salida}", file=sys.stderr)
+    else:
+        print(salida)
+
+
+if __name__ == "__main__":
+    main()
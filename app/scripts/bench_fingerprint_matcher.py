@@ -0,0 +1,119 @@
+# ===============================================================
+# ARCHIVO: app/scripts/bench_fingerprint_matcher.py
+# PROPÓSITO: Mide el comparador de minucias con huellas sintéticas:
+#            - parse:  plantillas ISO 19794-2 (Base64) leídas por segundo.
+#            - verify: comparaciones 1:1 por segundo.
+#            - 1:N:    para cada tamaño de galería, comparaciones por
+#                      segundo recorriendo toda la galería y latencia con
+#                      y sin el prefiltro de llaves, más el acierto rank-1.
+#            Cada consulta es la huella enrolada girada, desplazada, con
+#            ruido, minucias perdidas y minucias espurias.
+#
+# Uso:
+#   python -m app.scripts.bench_fingerprint_matcher [--galerias 1000 10000] [--consultas 50]
+# ===============================================================
+import argparse
+import base64
+import time
+
+import numpy as np
+
+from app.services.fingerprint_matcher import (
+    FingerprintIndex, TIPO, THETA, X, Y, is_match, match_templates, parse_template
+)
+
+
+def huella_sintetica(rng: np.random.Generator) -> np.ndarray:
+    """Entre 30 y 60 minucias en un área de 400x500 px."""
+    n = int(rng.integers(30, 61))
+    minucias = np.empty((n, 4), dtype=np.float32)
+    minucias[:, X] = rng.uniform(40, 440, n)
+    minucias[:, Y] = rng.uniform(40, 540, n)
+    minucias[:, THETA] = rng.uniform(0, 2 * np.pi, n)
+    minucias[:, TIPO] = rng.integers(1, 3, n)
+    return minucias
+
+
+def otra_lectura(minucias: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """La misma huella leída otra vez: rotación ±20°, traslación ±40 px, ruido, pérdidas y espurias."""
+    rot = np.deg2rad(rng.uniform(-20, 20))
+    t = rng.uniform(-40, 40, 2)
+    conservadas = minucias[rng.random(len(minucias)) < 0.8]
+    c, s = np.cos(rot), np.sin(rot)
+    lectura = conservadas.copy()
+    lectura[:, X] = c * conservadas[:, X] - s * conservadas[:, Y] + t[0] + rng.normal(0, 3, len(conservadas))
+    lectura[:, Y] = s * conservadas[:, X] + c * conservadas[:, Y] + t[1] + rng.normal(0, 3, len(conservadas))
+    lectura[:, THETA] = (conservadas[:, THETA] + rot + rng.normal(0, np.deg2rad(6), len(conservadas))) % (2 * np.pi)
+    return np.vstack([lectura, huella_sintetica(rng)[:5]]).astype(np.float32)
+
+
+def iso_fmr(minucias: np.ndarray) -> str:
+    """Codifica las minucias como registro ISO/IEC 19794-2:2005 en Base64."""
+    n = len(minucias)
+    cuerpo = bytearray([0, 0, 60, n])
+    for x, y, theta, tipo in minucias:
+        x, y = int(np.clip(x, 0, 0x3FFF)), int(np.clip(y, 0, 0x3FFF))
+        cuerpo += bytes([(int(tipo) << 6) | (x >> 8), x & 0xFF, y >> 8, y & 0xFF,
+                         int(round(np.rad2deg(theta) / (360 / 256))) % 256, 60])
+    cuerpo += b"\x00\x00" # Sin datos extendidos
+    total = 24 + len(cuerpo)
+    cabecera = (b"FMR\x00" + b" 20\x00" + total.to_bytes(4, "big") + b"\x00\x00"
+                + (512).to_bytes(2, "big") + (640).to_bytes(2, "big")
+                + (197).to_bytes(2, "big") * 2 + bytes([1, 0]))
+    return base64.b64encode(cabecera + bytes(cuerpo)).decode("ascii")
+
+
+def _por_segundo(fn, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return repeticiones / (time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del comparador de huellas por minucias.")
+    parser.add_argument("--galerias", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--consultas", type=int, default=50, help="Consultas 1:N por tamaño de galería")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    muestra = [huella_sintetica(rng) for _ in range(200)]
+    plantillas = [iso_fmr(m) for m in muestra]
+    i = iter(range(10 ** 9))
+    print(f"parse:  {_por_segundo(lambda: parse_template(plantillas[next(i) % 200]), 2000):,.0f} plantillas/s")
+
+    lecturas = [otra_lectura(m, rng) for m in muestra]
+    i = iter(range(10 ** 9))
+    print(f"verify: {_por_segundo(lambda: match_templates(lecturas[next(i) % 200], muestra[next(i) % 200]), 1000):,.0f} comparaciones 1:1/s")
+    aciertos = sum(is_match(*match_templates(lecturas[j], muestra[j])) for j in range(200))
+    falsos = sum(is_match(*match_templates(lecturas[j], muestra[(j + 1) % 200])) for j in range(200))
+    print(f"        misma huella aceptada {aciertos}/200, huella ajena aceptada {falsos}/200")
+
+    for n in args.galerias:
+        galeria = muestra + [huella_sintetica(rng) for _ in range(n - len(muestra))]
+        index = FingerprintIndex()
+        index.build(list(range(1, n + 1)), galeria)
+        objetivos = rng.integers(0, n, args.consultas)
+        consultas = [otra_lectura(galeria[j], rng) for j in objetivos]
+
+        inicio = time.perf_counter()
+        for consulta in consultas[:5]:
+            index.search(consulta, k=1, prefilter=False)
+        completo_s = (time.perf_counter() - inicio) / 5
+
+        inicio = time.perf_counter()
+        rank1 = 0
+        for j, consulta in zip(objetivos, consultas):
+            resultado = index.search(consulta, k=1)
+            rank1 += bool(resultado) and resultado[0][0] == j + 1 and is_match(resultado[0][1], resultado[0][2])
+        prefiltro_s = (time.perf_counter() - inicio) / len(consultas)
+
+        stats = index.stats()
+        print(f"\n1:N con {n:,} empleados ({stats['memory_bytes'] / 1e6:.1f} MB de minucias y llaves)")
+        print(f"  sin prefiltro: {n / completo_s:,.0f} comparaciones/s, {completo_s * 1000:.1f} ms por identificación")
+        print(f"  con prefiltro (top {index.prefilter_top}): {prefiltro_s * 1000:.1f} ms por identificación, "
+              f"equivalente a {n / prefiltro_s:,.0f} empleados revisados/s, rank-1 {rank1}/{len(consultas)}")
+
+
+if __name__ == "__main__":
+    main()
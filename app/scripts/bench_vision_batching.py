@@ -0,0 +1,80 @@
+# ===============================================================
+# ARCHIVO: app/scripts/bench_vision_batching.py
+# PROPÓSITO: Mide sin red (con el cliente falso de Vision) el efecto de
+#            agrupar detecciones en batch_annotate_images: rendimiento
+#            (imágenes/s), llamadas a la API y latencia p50/p95 por
+#            petición, con y sin lotes, y con fallas simuladas para
+#            comprobar los reintentos.
+#
+# Uso:
+#   python -m app.scripts.bench_vision_batching [--peticiones 256] [--concurrencia 64]
+# ===============================================================
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from app.services.vision_batcher import VisionBatchClient
+from app.services.vision_fake import FakeVisionClient, SIN_ROSTRO
+
+
+async def _correr(client: VisionBatchClient, peticiones: int, concurrencia: int) -> dict:
+    limite = asyncio.Semaphore(concurrencia)
+    latencias, errores = [], 0
+
+    async def una(i: int):
+        nonlocal errores
+        contenido = (SIN_ROSTRO if i % 10 == 0 else b"IMG") + i.to_bytes(4, "big")
+        async with limite:
+            t0 = time.perf_counter()
+            try:
+                await client.annotate(contenido)
+            except Exception:
+                errores += 1
+            latencias.append((time.perf_counter() - t0) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una(i) for i in range(peticiones)))
+    total = time.perf_counter() - inicio
+    return {
+        "images_per_second": round(peticiones / total, 1),
+        "p50_ms": round(float(np.percentile(latencias, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "errors": errores
+    }
+
+
+def escenario(nombre: str, fake: FakeVisionClient, peticiones: int, concurrencia: int, **kwargs) -> dict:
+    client = VisionBatchClient(lambda: fake, max_pending=peticiones, **kwargs)
+    resultado = asyncio.run(_correr(client, peticiones, concurrencia))
+    return {"scenario": nombre, **resultado, "api_calls": fake.calls, **client.status()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de detección de rostros en lotes con Vision falso.")
+    parser.add_argument("--peticiones", type=int, default=256)
+    parser.add_argument("--concurrencia", type=int, default=64)
+    parser.add_argument("--latencia-ms", type=float, default=80, help="Latencia simulada por llamada a la API")
+    parser.add_argument("--por-imagen-ms", type=float, default=2, help="Costo simulado por imagen dentro de una llamada")
+    parser.add_argument("--lote", type=int, default=16)
+    parser.add_argument("--flush-ms", type=float, default=20)
+    parser.add_argument("--en-vuelo", type=int, default=4, help="Llamadas simultáneas a la API")
+    args = parser.parse_args()
+
+    def fake(**kw):
+        return FakeVisionClient(latency_s=args.latencia_ms / 1000, per_image_s=args.por_imagen_ms / 1000, **kw)
+
+    comunes = dict(flush_ms=args.flush_ms, max_inflight=args.en_vuelo, backoff_s=0.05)
+    resultados = [
+        escenario("sin_lotes", fake(), args.peticiones, args.concurrencia, max_batch_size=1, **comunes),
+        escenario("con_lotes", fake(), args.peticiones, args.concurrencia, max_batch_size=args.lote, **comunes),
+        escenario("con_lotes_y_fallas", fake(fail_every=3), args.peticiones, args.concurrencia,
+                  max_batch_size=args.lote, max_retries=2, **comunes),
+    ]
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# ===============================================================
+# ARCHIVO: app/scripts/export_onnx_model.py
+# PROPÓSITO: Exporta el modelo de DeepFace (Keras) a ONNX para usarlo
+#            con FACE_EMBEDDING_BACKEND=onnx. Junto al .onnx escribe un
+#            .json con el modelo, el tamaño de entrada y si DeepFace
+#            normaliza la salida, para producir vectores compatibles.
+#
+# Uso (requiere tensorflow, deepface y tf2onnx):
+#   python -m app.scripts.export_onnx_model [--salida app/models/vgg_face.onnx]
+# ===============================================================
+import argparse
+import json
+import os
+
+import numpy as np
+
+from app.core.config import FACE_MODEL_NAME, FACE_ONNX_MODEL_PATH
+from app.services.embedding_backends import DeepFaceBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el modelo facial a ONNX.")
+    parser.add_argument("--salida", default=FACE_ONNX_MODEL_PATH, help="Ruta del archivo .onnx")
+    parser.add_argument("--opset", type=int, default=13)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    import tf2onnx
+
+    backend = DeepFaceBackend(FACE_MODEL_NAME)
+    keras_model = backend.client.model
+    width, height = backend.input_shape
+
+    # ¿DeepFace normaliza la salida del modelo? Se compara con la salida cruda de Keras.
+    muestra = np.random.default_rng(0).random((1, height, width, 3), dtype=np.float32)
+    crudo = np.asarray(keras_model(muestra, training=False)).reshape(-1)
+    deepface = backend.forward(muestra).reshape(-1)
+    l2_normalize = not np.allclose(crudo, deepface, atol=1e-5)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    spec = (tf.TensorSpec((None, height, width, 3), tf.float32, name="input"),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, opset=args.opset, output_path=args.salida)
+
+    metadata = {
+        "model_name": FACE_MODEL_NAME,
+        "input_shape": [width, height],
+        "l2_normalize": bool(l2_normalize),
+        "opset": args.opset
+    }
+    with open(os.path.splitext(args.salida)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Modelo exportado a {args.salida} ({metadata})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# ===============================================================
+# ARCHIVO: app/scripts/migrate_face_embeddings.py
+# PROPÓSITO: Migración de plantillas faciales de JSON (plantilla_facial)
+#            al formato binario float32 (embedding_facial).
+#            1. Agrega las columnas nuevas a Usuarios si no existen.
+#            2. Convierte cada plantilla JSON pendiente.
+#
+# Uso:
+#   python -m app.scripts.migrate_face_embeddings [--borrar-json] [--lote 500]
+# ===============================================================
+import argparse
+import json
+from typing import Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.database.database import engine
+from app.models import tablas as models
+from app.services import embedding_storage
+
+COLUMNAS_NUEVAS = ("embedding_facial", "embedding_modelo", "embedding_dim")
+
+
+def agregar_columnas():
+    """ALTER TABLE para las columnas que falten (create_all no altera tablas existentes)."""
+    tabla = models.Usuario.__table__
+    existentes = {c["name"] for c in inspect(engine).get_columns(tabla.name)}
+    # Nombres entre comillas y tipos según el dialecto (MySQL: `...`, SQLite: "...").
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for nombre in COLUMNAS_NUEVAS:
+            if nombre not in existentes:
+                tipo = tabla.c[nombre].type.compile(dialect=engine.dialect)
+                print(f"--- Agregando columna {tabla.name}.{nombre} ({tipo}) ---")
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(tabla)} ADD COLUMN {preparer.quote(nombre)} {tipo}"
+                ))
+
+
+def _leer_vector(plantilla: str):
+    """Vector de la plantilla JSON o None si no es una lista de números."""
+    try:
+        vector = json.loads(plantilla)
+    except ValueError:
+        return None
+    if not isinstance(vector, list) or not vector or not all(isinstance(v, (int, float)) for v in vector):
+        return None
+    return vector
+
+
+def convertir_plantillas(borrar_json: bool, lote: int) -> Tuple[int, int]:
+    """
+    Convierte las plantillas JSON que aún no tienen versión binaria.
+    Las vacías ("" o espacios) se dejan en NULL y las ilegibles se dejan
+    como están; ambas se cuentan como omitidas y la migración sigue.
+    Devuelve (convertidas, omitidas).
+    """
+    convertidas, omitidas, ultimo_id = 0, 0, 0
+    with Session(engine) as db:
+        while True:
+            # Por id: las omitidas siguen cumpliendo el filtro y no deben volver a leerse.
+            usuarios = db.query(models.Usuario).filter(
+                models.Usuario.plantilla_facial.isnot(None),
+                models.Usuario.embedding_facial.is_(None),
+                models.Usuario.id_usuario > ultimo_id
+            ).order_by(models.Usuario.id_usuario).limit(lote).all()
+            if not usuarios:
+                break
+
+            for usuario in usuarios:
+                if not usuario.plantilla_facial.strip():
+                    usuario.plantilla_facial = None
+                    omitidas += 1
+                    continue
+                vector = _leer_vector(usuario.plantilla_facial)
+                if vector is None:
+                    print(f"--- Plantilla ilegible del usuario {usuario.id_usuario}; se omite. ---")
+                    omitidas += 1
+                    continue
+                embedding_storage.set_user_embedding(usuario, vector, embedding_storage.LEGACY_MODEL_NAME)
+                if borrar_json:
+                    usuario.plantilla_facial = None
+                convertidas += 1
+            ultimo_id = usuarios[-1].id_usuario
+            db.commit()
+            print(f"--- {convertidas} plantillas convertidas, {omitidas} omitidas... ---")
+    return convertidas, omitidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra las plantillas faciales JSON a float32 binario.")
+    parser.add_argument("--borrar-json", action="store_true", help="Vacía plantilla_facial después de convertirla")
+    parser.add_argument("--lote", type=int, default=500, help="Usuarios por transacción")
+    args = parser.parse_args()
+
+    agregar_columnas()
+    total, omitidas = convertir_plantillas(args.borrar_json, args.lote)
+    print(f"Migración terminada. Plantillas convertidas: {total}. Omitidas (vacías o ilegibles): {omitidas}")
+
+
+if __name__ == "__main__":
+    main()
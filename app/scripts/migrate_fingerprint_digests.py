@@ -0,0 +1,103 @@
+# ===============================================================
+# ARCHIVO: app/scripts/migrate_fingerprint_digests.py
+# PROPÓSITO: Prepara la identificación de huella por digest y la
+#            sincronización de terminales:
+#            1. Agrega las columnas Usuarios.huella_digest y huella_version
+#               y sus índices si no existen, y las tablas ContadoresVersion
+#               y HuellasEliminadas.
+#            2. Calcula el digest de cada plantilla de huella que no lo tenga.
+#            3. Asigna versión a las plantillas que no la tengan.
+#
+# Uso:
+#   python -m app.scripts.migrate_fingerprint_digests [--lote 500]
+# ===============================================================
+import argparse
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.database.database import engine
+from app.models import tablas as models
+from app.services import fingerprint_service
+from app.services.fingerprint_storage import decode_template
+
+COLUMNAS = ("huella_digest", "huella_version")
+
+
+def agregar_columnas():
+    """ALTER TABLE + índices de las columnas (create_all no altera tablas existentes)."""
+    tabla = models.Usuario.__table__
+    inspector = inspect(engine)
+    existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+    indices = {i["name"] for i in inspector.get_indexes(tabla.name)}
+    # Nombres entre comillas y tipos según el dialecto (MySQL: `...`, SQLite: "...").
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for columna in COLUMNAS:
+            if columna not in existentes:
+                tipo = tabla.c[columna].type.compile(dialect=engine.dialect)
+                print(f"--- Agregando columna {tabla.name}.{columna} ---")
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.format_table(tabla)} ADD COLUMN {preparer.quote(columna)} {tipo}"
+                ))
+            for indice in tabla.indexes:
+                if indice.name not in indices and [c.name for c in indice.columns] == [columna]:
+                    print(f"--- Creando índice {indice.name} ---")
+                    indice.create(bind=conn)
+
+
+def crear_tablas():
+    """Contador de versiones y bajas de huellas (create_all solo crea las que faltan)."""
+    models.Base.metadata.create_all(
+        bind=engine, tables=[models.ContadorVersion.__table__, models.HuellaEliminada.__table__]
+    )
+
+
+def calcular_digests(lote: int) -> int:
+    actualizados = 0
+    with Session(engine) as db:
+        while True:
+            usuarios = db.query(models.Usuario).filter(
+                models.Usuario.plantilla_huella.isnot(None),
+                models.Usuario.huella_digest.is_(None)
+            ).limit(lote).all()
+            if not usuarios:
+                break
+            for usuario in usuarios:
+                usuario.huella_digest = fingerprint_service.template_digest(decode_template(usuario.plantilla_huella))
+            db.commit()
+            actualizados += len(usuarios)
+            print(f"--- {actualizados} digests calculados... ---")
+    return actualizados
+
+
+def asignar_versiones() -> int:
+    """Una versión distinta (en orden de id) por cada plantilla sin versión, reservadas del contador."""
+    with Session(engine) as db:
+        usuarios = db.query(models.Usuario).filter(
+            models.Usuario.plantilla_huella.isnot(None),
+            models.Usuario.huella_version.is_(None)
+        ).order_by(models.Usuario.id_usuario).all()
+        if not usuarios:
+            return 0
+        siguiente = fingerprint_service.reserve_template_versions(db, len(usuarios))
+        for i, usuario in enumerate(usuarios):
+            usuario.huella_version = siguiente + i
+        db.commit()
+    return len(usuarios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrega y llena Usuarios.huella_digest y huella_version.")
+    parser.add_argument("--lote", type=int, default=500, help="Usuarios por transacción")
+    args = parser.parse_args()
+
+    agregar_columnas()
+    crear_tablas()
+    total = calcular_digests(args.lote)
+    versiones = asignar_versiones()
+    print(f"Migración terminada. Digests calculados: {total}. Versiones asignadas: {versiones}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# ===============================================================
+# ARCHIVO: app/scripts/migrate_fingerprint_storage.py
+# PROPÓSITO: Convierte las plantillas de huella guardadas como texto
+#            UTF-8 (formato heredado) al formato compacto de
+#            app/services/fingerprint_storage.py, por lotes. El texto que
+#            reciben los clientes no cambia, así que no se toca la versión
+#            de la galería. Al final reporta el ahorro en bytes.
+#
+# Uso:
+#   python -m app.scripts.migrate_fingerprint_storage [--lote 500]
+# ===============================================================
+import argparse
+
+from sqlalchemy.orm import Session
+
+from app.database.database import engine
+from app.models import tablas as models
+from app.services.fingerprint_storage import encode_template, is_compact
+
+
+def compactar(lote: int) -> tuple:
+    convertidas, antes, despues = 0, 0, 0
+    ultimo_id = 0
+    with Session(engine) as db:
+        while True:
+            usuarios = db.query(models.Usuario).filter(
+                models.Usuario.plantilla_huella.isnot(None),
+                models.Usuario.id_usuario > ultimo_id
+            ).order_by(models.Usuario.id_usuario).limit(lote).all()
+            if not usuarios:
+                break
+            for usuario in usuarios:
+                if not is_compact(usuario.plantilla_huella):
+                    compacta = encode_template(usuario.plantilla_huella.decode("utf-8"))
+                    antes += len(usuario.plantilla_huella)
+                    despues += len(compacta)
+                    usuario.plantilla_huella = compacta
+                    convertidas += 1
+            ultimo_id = usuarios[-1].id_usuario
+            db.commit()
+            print(f"--- {convertidas} plantillas compactadas... ---")
+    return convertidas, antes, despues
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compacta las plantillas de huella guardadas como texto.")
+    parser.add_argument("--lote", type=int, default=500, help="Usuarios por transacción")
+    args = parser.parse_args()
+
+    convertidas, antes, despues = compactar(args.lote)
+    ahorro = (1 - despues / antes) * 100 if antes else 0.0
+    print(f"Migración terminada. Plantillas compactadas: {convertidas}. "
+          f"Bytes: {antes:,} -> {despues:,} ({ahorro:.0f}% menos)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# ===============================================================
+# ARCHIVO: app/scripts/migrate_open_attendance_index.py
+# PROPÓSITO: Agrega a una base existente la restricción "un solo
+#            registro de asistencia abierto por usuario y día":
+#            1. Cierra los registros abiertos duplicados que ya existan
+#               (se deja abierto el más reciente; los demás quedan con
+#               salida = entrada y se listan para revisión).
+#            2. Crea el índice único parcial ux_registro_abierto
+#               (SQLite/PostgreSQL) o su equivalente con columna generada
+#               (MySQL).
+#
+# Uso:
+#   python -m app.scripts.migrate_open_attendance_index
+# ===============================================================
+from sqlalchemy import func, inspect, text
+from sqlalchemy.orm import Session
+
+from app.database.database import engine
+from app.models import tablas as models
+
+INDICE = "ux_registro_abierto"
+
+
+def cerrar_duplicados() -> list:
+    Registro = models.RegistroAsistencia
+    cerrados = []
+    with Session(engine) as db:
+        grupos = db.query(Registro.id_usuario, Registro.fecha).filter(
+            Registro.hora_salida.is_(None)
+        ).group_by(Registro.id_usuario, Registro.fecha).having(func.count() > 1).all()
+        for id_usuario, fecha in grupos:
+            abiertos = db.query(Registro).filter(
+                Registro.id_usuario == id_usuario,
+                Registro.fecha == fecha,
+                Registro.hora_salida.is_(None)
+            ).order_by(Registro.hora_entrada.desc(), Registro.id_registro.desc()).all()
+            for registro in abiertos[1:]:
+                registro.hora_salida = registro.hora_entrada
+                cerrados.append(registro.id_registro)
+        db.commit()
+    return cerrados
+
+
+def crear_indice():
+    tabla = models.RegistroAsistencia.__tablename__
+    existentes = {i["name"] for i in inspect(engine).get_indexes(tabla)}
+    if INDICE in existentes:
+        print(f"--- El índice {INDICE} ya existe ---")
+        return
+
+    print(f"--- Creando índice {INDICE} en {tabla} ({engine.dialect.name}) ---")
+    if engine.dialect.name == "mysql":
+        columnas = {c["name"] for c in inspect(engine).get_columns(tabla)}
+        with engine.begin() as conn:
+            if "abierto" not in columnas:
+                conn.execute(text(
+                    f"ALTER TABLE {tabla} ADD COLUMN abierto TINYINT AS (IF(hora_salida IS NULL, 1, NULL)) VIRTUAL"
+                ))
+            conn.execute(text(f"ALTER TABLE {tabla} ADD UNIQUE INDEX {INDICE} (id_usuario, fecha, abierto)"))
+    else:
+        indice = next(i for i in models.RegistroAsistencia.__table__.indexes if i.name == INDICE)
+        indice.create(bind=engine)
+
+
+def main():
+    cerrados = cerrar_duplicados()
+    if cerrados:
+        print(f"--- Registros abiertos duplicados cerrados (revisar): {cerrados} ---")
+    crear_indice()
+    print(f"Migración terminada. Duplicados cerrados: {len(cerrados)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# ===============================================================
+# ARCHIVO: app/scripts/profile_startup.py
+# PROPÓSITO: Reporte del costo de arranque de la API: importa el módulo
+#            indicado en un proceso limpio con `python -X importtime`,
+#            suma el tiempo propio por paquete de primer nivel y lista
+#            los módulos más caros. Con --warm también mide la
+#            inicialización de los subsistemas del registro perezoso.
+#
+# Uso:
+#   python -m app.scripts.profile_startup [--modulo app.main] [--top 25] [--warm firebase,vision]
+# ===============================================================
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+_LINEA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def perfilar(modulo: str, warm: str = "") -> dict:
+    codigo = f"import {modulo}\n"
+    if warm:
+        codigo += (
+            "import json\n"
+            "from app.core.registry import registry, parse_names\n"
+            f"registry.warm(parse_names({warm!r}))\n"
+            "print('REGISTRY ' + json.dumps(registry.status()))\n"
+        )
+
+    inicio = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], capture_output=True, text=True)
+    total_s = time.perf_counter() - inicio
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "falló la importación")
+
+    modulos, paquetes = [], defaultdict(float)
+    for linea in proc.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if not m:
+            continue
+        propio_us, acumulado_us, sangria, nombre = int(m.group(1)), int(m.group(2)), m.group(3), m.group(4)
+        modulos.append({"module": nombre, "self_ms": propio_us / 1000, "cumulative_ms": acumulado_us / 1000, "depth": len(sangria) // 2})
+        paquetes[nombre.split(".")[0]] += propio_us / 1000
+
+    registro = None
+    for linea in proc.stdout.splitlines():
+        if linea.startswith("REGISTRY "):
+            registro = json.loads(linea[len("REGISTRY "):])
+
+    return {"wall_seconds": total_s, "modules": modulos, "packages": dict(paquetes), "registry": registro}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de importación al arrancar la API.")
+    parser.add_argument("--modulo", default="app.main", help="Módulo a importar (por defecto app.main)")
+    parser.add_argument("--top", type=int, default=25, help="Cuántos módulos/paquetes listar")
+    parser.add_argument("--warm", default="", help="Subsistemas a inicializar después de importar, separados por coma")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte completo en JSON")
+    args = parser.parse_args()
+
+    try:
+        reporte = perfilar(args.modulo, args.warm)
+    except RuntimeError as e:
+        parser.exit(1, f"No se pudo importar {args.modulo}: {e}\n")
+
+    if args.json:
+        print(json.dumps(reporte, indent=2))
+        return
+
+    print(f"Tiempo total (proceso nuevo): {reporte['wall_seconds']:.2f} s\n")
+    print(f"{'Paquete':<40}{'ms (propio)':>14}")
+    for nombre, ms in sorted(reporte["packages"].items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{nombre:<40}{ms:>14.1f}")
+
+    print(f"\n{'Módulo':<60}{'ms (acumulado)':>16}")
+    directos = [m for m in reporte["modules"] if m["depth"] <= 1]
+    for m in sorted(directos, key=lambda m: -m["cumulative_ms"])[:args.top]:
+        print(f"{m['module']:<60}{m['cumulative_ms']:>16.1f}")
+
+    if reporte["registry"] is not None:
+        print(f"\n{'Subsistema':<20}{'s':>10}  error")
+        for nombre, estado in reporte["registry"].items():
+            segundos = f"{estado['init_seconds']:.2f}" if estado["init_seconds"] is not None else "-"
+            print(f"{nombre:<20}{segundos:>10}  {estado['error'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
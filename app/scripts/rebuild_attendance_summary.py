@@ -0,0 +1,36 @@
+# ===============================================================
+# ARCHIVO: app/scripts/rebuild_attendance_summary.py
+# PROPÓSITO: Comando para reparar la tabla ResumenesAsistencia en un
+#            rango de fechas (por ejemplo, tras una carga manual de
+#            registros o al activar el resumen por primera vez).
+#
+# Uso:
+#   python -m app.scripts.rebuild_attendance_summary --desde 2025-07-01 --hasta 2025-07-31
+# ===============================================================
+import argparse
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from app.database.database import Base, engine
+from app.services import attendance_summary_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruye el resumen diario de asistencia.")
+    parser.add_argument("--desde", type=date.fromisoformat, required=True, help="Fecha inicial (AAAA-MM-DD)")
+    parser.add_argument("--hasta", type=date.fromisoformat, default=None, help="Fecha final (AAAA-MM-DD); por defecto igual a --desde")
+    args = parser.parse_args()
+
+    fecha_fin = args.hasta or args.desde
+    if fecha_fin < args.desde:
+        parser.error("--hasta no puede ser anterior a --desde")
+
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        total = attendance_summary_service.rebuild_summaries(db, args.desde, fecha_fin)
+    print(f"Resúmenes escritos: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# ===============================================================
+# ARCHIVO: app/scripts/train_face_ivf.py
+# PROPÓSITO: Entrena el índice IVF con las plantillas faciales guardadas
+#            y lo escribe en FACE_IVF_PATH. Conviene correrlo tras altas
+#            masivas para que las listas queden balanceadas.
+#
+# Uso:
+#   python -m app.scripts.train_face_ivf [--nlist 256] [--salida ruta.npz]
+# ===============================================================
+import argparse
+
+from sqlalchemy.orm import Session
+
+from app.core.config import FACE_IVF_NLIST, FACE_IVF_PATH
+from app.database.database import engine
+from app.services import face_index_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena y guarda el índice facial IVF.")
+    parser.add_argument("--nlist", type=int, default=FACE_IVF_NLIST, help="Número de listas; 0 = ~sqrt(N)")
+    parser.add_argument("--salida", default=FACE_IVF_PATH, help="Archivo .npz de salida")
+    args = parser.parse_args()
+
+    with Session(engine) as db:
+        try:
+            index = face_index_service.train_ivf(db, nlist=args.nlist, path=args.salida)
+        except ValueError as e:
+            parser.exit(1, f"{e}\n")
+    print(f"Índice IVF: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,60 +3,109 @@
 # PROPÓSITO: Contiene la lógica de negocio para registrar la
 #            asistencia usando la fecha y hora local del servidor.
 # ===============================================================
+from typing import Optional
+
 from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime # No se necesita timezone aquí
+from datetime import datetime, date # No se necesita timezone aquí
 
 from app.models import tablas as models
 from app.schemas import esquemas as schemas
+from app.services import attendance_summary_service
+
+def _close_open_record(db: Session, user_id: int, hoy: date, ahora: datetime) -> Optional[models.RegistroAsistencia]:
+    """
+    Check-out en una sola sentencia: UPDATE del registro abierto de hoy.
+    Devuelve el registro cerrado o None si no había ninguno abierto. Con
+    RETURNING (SQLite, PostgreSQL, MariaDB) no hace falta releerlo; sin él
+    (MySQL) se bloquea primero el registro abierto y se cierra por su id
+    (releerlo por hora_salida no sirve: DATETIME redondea los microsegundos).
+    """
+    Registro = models.RegistroAsistencia
+    abierto = (
+        Registro.id_usuario == user_id,
+        Registro.fecha == hoy,
+        Registro.hora_salida.is_(None)
+    )
+
+    # populate_existing: si la sesión ya tenía el registro, queda con la salida nueva.
+    if db.get_bind().dialect.update_returning:
+        cerrar = update(Registro).where(*abierto).values(hora_salida=ahora).returning(Registro)
+        return db.scalars(cerrar.execution_options(synchronize_session=False, populate_existing=True)).first()
+    id_registro = db.query(Registro.id_registro).filter(*abierto).with_for_update().scalar()
+    if id_registro is None:
+        return None
+    cerrados = db.execute(
+        update(Registro).where(Registro.id_registro == id_registro, Registro.hora_salida.is_(None))
+        .values(hora_salida=ahora).execution_options(synchronize_session=False)
+    ).rowcount
+    if not cerrados:
+        return None
+    return db.get(Registro, id_registro, populate_existing=True)
 
 def register_attendance(db: Session, usuario: models.Usuario):
     """
     Registra la asistencia para un usuario usando la fecha y hora local.
-    - Si no hay un check-in abierto hoy, crea uno nuevo.
-    - Si ya hay un check-in abierto, lo cierra (check-out).
+    - Si ya hay un check-in abierto hoy, lo cierra (check-out) con un UPDATE.
+    - Si no, crea uno nuevo (check-in).
+    El índice único ux_registro_abierto impide dos registros abiertos del
+    mismo usuario y día: si dos checadas llegan a la vez, la segunda no
+    duplica la entrada, recibe la que ya existe.
     """
     user_id = usuario.id_usuario
     ahora = datetime.now()
     hoy = ahora.date()
 
-    # 1. Buscar si hay un registro de check-in abierto para el día de hoy
-    registro_abierto = db.query(models.RegistroAsistencia).filter(
-        models.RegistroAsistencia.id_usuario == user_id,
-        models.RegistroAsistencia.fecha == hoy,
-        models.RegistroAsistencia.hora_salida == None
-    ).first()
-
-    if registro_abierto:
-        # --- Lógica de Check-out ---
+    # 1. Intentar cerrar el registro abierto de hoy (check-out).
+    registro_cerrado = _close_open_record(db, user_id, hoy, ahora)
+    if registro_cerrado:
         print(f"Cerrando registro de asistencia para el usuario ID: {user_id}")
-        registro_abierto.hora_salida = ahora
+        attendance_summary_service.refresh_daily_summary(db, user_id, hoy)
+        data = schemas.RegistroAsistencia.model_validate(registro_cerrado)
         db.commit()
-        db.refresh(registro_abierto)
-        
+
         return {
             "mensaje": "Salida (Check-out) registrada correctamente.",
-            "data": schemas.RegistroAsistencia.model_validate(registro_abierto)
+            "data": data
         }
-    else:
-        # --- Lógica de Check-in ---
-        print(f"Creando nuevo registro de asistencia para el usuario ID: {user_id}")
-        
-        # --- INICIO DE LA CORRECCIÓN ---
-        # Se añade el 'numero_empleado' al crear el nuevo registro.
-        nuevo_registro = models.RegistroAsistencia(
-            id_usuario=user_id,
-            numero_empleado=usuario.numero_empleado, # <-- LÍNEA AÑADIDA
-            fecha=hoy,
-            hora_entrada=ahora
-        )
-        # --- FIN DE LA CORRECCIÓN ---
-        
+
+    # 2. No había registro abierto: check-in.
+    print(f"Creando nuevo registro de asistencia para el usuario ID: {user_id}")
+    nuevo_registro = models.RegistroAsistencia(
+        id_usuario=user_id,
+        numero_empleado=usuario.numero_empleado,
+        fecha=hoy,
+        hora_entrada=ahora
+    )
+    try:
         db.add(nuevo_registro)
-        db.commit()
-        db.refresh(nuevo_registro)
-        
+        db.flush()
+    except IntegrityError:
+        # Otra checada simultánea ya abrió el registro de hoy.
+        db.rollback()
+        abierto = db.query(models.RegistroAsistencia).filter(
+            models.RegistroAsistencia.id_usuario == user_id,
+            models.RegistroAsistencia.fecha == hoy,
+            models.RegistroAsistencia.hora_salida.is_(None)
+        ).first()
+        if not abierto:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="La checada coincidió con otra del mismo empleado. Intenta de nuevo."
+            )
+        print(f"--- Checada duplicada para el usuario ID: {user_id}; ya tenía entrada abierta. ---")
         return {
-            "mensaje": "Entrada (Check-in) registrada correctamente.",
-            "data": schemas.RegistroAsistencia.model_validate(nuevo_registro)
+            "mensaje": "Entrada (Check-in) ya registrada.",
+            "data": schemas.RegistroAsistencia.model_validate(abierto)
         }
+
+    attendance_summary_service.refresh_daily_summary(db, user_id, hoy)
+    data = schemas.RegistroAsistencia.model_validate(nuevo_registro)
+    db.commit()
+
+    return {
+        "mensaje": "Entrada (Check-in) registrada correctamente.",
+        "data": data
+    }
@@ -0,0 +1,153 @@
+# ===============================================================
+# ARCHIVO: app/services/attendance_summary_service.py
+# PROPÓSITO: Mantiene la tabla ResumenesAsistencia (estatus y retardo
+#            por usuario y día) al momento de escribir, y permite
+#            reconstruirla para un rango de fechas.
+# ===============================================================
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import date
+
+from app.models import tablas as models
+from app.services.report_service import compute_attendance_status
+
+
+def refresh_daily_summary(db: Session, id_usuario: int, fecha: date):
+    """
+    Recalcula el resumen de un usuario para un día a partir de su
+    asignación y su primer registro de asistencia.
+    No hace commit: se ejecuta dentro de la transacción de quien lo llama.
+    """
+    db.flush()
+
+    hora_programada = db.query(models.TipoHorario.hora_entrada).join(
+        models.AsignacionHorario,
+        models.AsignacionHorario.id_tipo_horario == models.TipoHorario.id_tipo_horario
+    ).filter(
+        models.AsignacionHorario.id_usuario == id_usuario,
+        models.AsignacionHorario.fecha == fecha
+    ).scalar()
+
+    primer_registro = db.query(models.RegistroAsistencia).filter(
+        models.RegistroAsistencia.id_usuario == id_usuario,
+        models.RegistroAsistencia.fecha == fecha
+    ).order_by(models.RegistroAsistencia.id_registro).first()
+
+    resumen = db.query(models.ResumenAsistenciaDiaria).filter(
+        models.ResumenAsistenciaDiaria.id_usuario == id_usuario,
+        models.ResumenAsistenciaDiaria.fecha == fecha
+    ).first()
+
+    # Sin asignación ni registro no hay nada que resumir: el reporte lo
+    # mostrará como "Sin Asignación" al no encontrar fila.
+    if hora_programada is None and primer_registro is None:
+        if resumen:
+            db.delete(resumen)
+        return None
+
+    hora_entrada = primer_registro.hora_entrada if primer_registro else None
+    estado, minutos_retardo = compute_attendance_status(fecha, hora_programada, hora_entrada)
+
+    if not resumen:
+        resumen = _nuevo_resumen(db, id_usuario, fecha)
+
+    resumen.hora_programada = hora_programada
+    resumen.hora_entrada = hora_entrada
+    resumen.hora_salida = primer_registro.hora_salida if primer_registro else None
+    resumen.estado = estado
+    resumen.minutos_retardo = minutos_retardo
+    return resumen
+
+
+def _nuevo_resumen(db: Session, id_usuario: int, fecha: date):
+    """
+    Inserta la fila del resumen en un SAVEPOINT. Si otra petición la
+    insertó al mismo tiempo (_resumen_usuario_fecha_uc), se usa esa fila
+    en lugar de fallar con 500.
+    """
+    try:
+        with db.begin_nested():
+            resumen = models.ResumenAsistenciaDiaria(
+                id_usuario=id_usuario, fecha=fecha, estado="Sin Asignación", minutos_retardo=0
+            )
+            db.add(resumen)
+        return resumen
+    except IntegrityError:
+        print(f"--- LOG (resumen): Resumen de {id_usuario} del {fecha} creado en paralelo; se actualiza. ---")
+        return db.query(models.ResumenAsistenciaDiaria).filter(
+            models.ResumenAsistenciaDiaria.id_usuario == id_usuario,
+            models.ResumenAsistenciaDiaria.fecha == fecha
+        ).with_for_update().one()
+
+
+def rebuild_summaries(db: Session, fecha_inicio: date, fecha_fin: date) -> int:
+    """
+    Borra y vuelve a calcular los resúmenes de todos los usuarios entre
+    fecha_inicio y fecha_fin (inclusive) con consultas por conjunto.
+    Devuelve el número de resúmenes escritos.
+    """
+    print(f"--- Reconstruyendo resúmenes de asistencia del {fecha_inicio} al {fecha_fin} ---")
+
+    db.query(models.ResumenAsistenciaDiaria).filter(
+        models.ResumenAsistenciaDiaria.fecha >= fecha_inicio,
+        models.ResumenAsistenciaDiaria.fecha <= fecha_fin
+    ).delete(synchronize_session=False)
+
+    asignaciones = db.query(
+        models.AsignacionHorario.id_usuario,
+        models.AsignacionHorario.fecha,
+        models.TipoHorario.hora_entrada
+    ).join(
+        models.TipoHorario,
+        models.TipoHorario.id_tipo_horario == models.AsignacionHorario.id_tipo_horario
+    ).filter(
+        models.AsignacionHorario.fecha >= fecha_inicio,
+        models.AsignacionHorario.fecha <= fecha_fin
+    ).all()
+
+    primeros = db.query(
+        func.min(models.RegistroAsistencia.id_registro).label("id_registro")
+    ).filter(
+        models.RegistroAsistencia.fecha >= fecha_inicio,
+        models.RegistroAsistencia.fecha <= fecha_fin
+    ).group_by(
+        models.RegistroAsistencia.id_usuario,
+        models.RegistroAsistencia.fecha
+    ).subquery()
+
+    registros = db.query(
+        models.RegistroAsistencia.id_usuario,
+        models.RegistroAsistencia.fecha,
+        models.RegistroAsistencia.hora_entrada,
+        models.RegistroAsistencia.hora_salida
+    ).join(
+        primeros,
+        primeros.c.id_registro == models.RegistroAsistencia.id_registro
+    ).all()
+
+    programadas = {(a.id_usuario, a.fecha): a.hora_entrada for a in asignaciones}
+    entradas = {(r.id_usuario, r.fecha): r for r in registros}
+
+    resumenes = []
+    for id_usuario, fecha in programadas.keys() | entradas.keys():
+        hora_programada = programadas.get((id_usuario, fecha))
+        registro = entradas.get((id_usuario, fecha))
+        hora_entrada = registro.hora_entrada if registro else None
+        estado, minutos_retardo = compute_attendance_status(fecha, hora_programada, hora_entrada)
+        resumenes.append({
+            "id_usuario": id_usuario,
+            "fecha": fecha,
+            "hora_programada": hora_programada,
+            "hora_entrada": hora_entrada,
+            "hora_salida": registro.hora_salida if registro else None,
+            "estado": estado,
+            "minutos_retardo": minutos_retardo
+        })
+
+    if resumenes:
+        db.bulk_insert_mappings(models.ResumenAsistenciaDiaria, resumenes)
+    db.commit()
+
+    print(f"--- Reconstrucción terminada. Se escribieron {len(resumenes)} resúmenes. ---")
+    return len(resumenes)
@@ -0,0 +1,175 @@
+# ===============================================================
+# ARCHIVO: app/services/embedding_backends.py
+# PROPÓSITO: Backends intercambiables para la pasada del modelo de
+#            embeddings faciales. Todos reciben rostros ya recortados
+#            y normalizados (N, alto, ancho, 3) y devuelven (N, D) float32
+#            compatibles entre sí, de modo que las plantillas guardadas
+#            sirven sin importar el backend configurado.
+# ===============================================================
+import json
+import os
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import numpy as np
+
+from app.core.config import FACE_EMBEDDING_BACKEND, FACE_ONNX_MODEL_PATH, FACE_ONNX_THREADS, FACE_FAKE_EMBED_MS
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norm == 0, 1.0, norm)
+
+
+class EmbeddingBackend(ABC):
+    """Interfaz común: nombre, tamaño de entrada (ancho, alto) y forward por lotes."""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    @abstractmethod
+    def input_shape(self) -> Tuple[int, int]:
+        """(ancho, alto) que espera el modelo."""
+
+    @abstractmethod
+    def forward(self, faces: np.ndarray) -> np.ndarray:
+        """Rostros (N, alto, ancho, 3) -> embeddings (N, D) float32."""
+
+
+class DeepFaceBackend(EmbeddingBackend):
+    """Modelo de DeepFace sobre TensorFlow/Keras."""
+
+    name = "deepface"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from deepface import DeepFace
+
+        # DeepFace guarda el modelo construido en su caché interna,
+        # así que DeepFace.represent reutiliza esta misma instancia.
+        try:
+            self.client = DeepFace.build_model(task="facial_recognition", model_name=model_name)
+        except TypeError:
+            # Versiones de DeepFace anteriores a la firma con 'task'.
+            self.client = DeepFace.build_model(model_name=model_name)
+
+    @property
+    def input_shape(self) -> Tuple[int, int]:
+        return self.client.input_shape
+
+    def forward(self, faces: np.ndarray) -> np.ndarray:
+        """Una sola pasada del modelo para todo el lote; devuelve (N, D) float32."""
+        try:
+            embeddings = np.asarray(self.client.forward(faces), dtype=np.float32)
+            if embeddings.ndim == 2 and embeddings.shape[0] == faces.shape[0]:
+                return embeddings
+        except Exception as e:
+            print(f"--- LOG (embedding_backends): El modelo no aceptó el lote completo ({e}); se procesa imagen por imagen.")
+        return np.stack([
+            np.asarray(self.client.forward(face[None, ...]), dtype=np.float32).reshape(-1)
+            for face in faces
+        ])
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    El mismo modelo exportado a ONNX y ejecutado con ONNX Runtime en CPU.
+    Lee el archivo de metadatos (<modelo>.json) que escribe el script de
+    exportación para aplicar el mismo post-proceso que DeepFace.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_name: str, model_path: str = FACE_ONNX_MODEL_PATH, threads: int = FACE_ONNX_THREADS):
+        super().__init__(model_name)
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("FACE_EMBEDDING_BACKEND=onnx requiere el paquete 'onnxruntime'.")
+
+        metadata_path = os.path.splitext(model_path)[0] + ".json"
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata["model_name"] != model_name:
+            raise RuntimeError(
+                f"El modelo ONNX es de '{self.metadata['model_name']}' pero FACE_MODEL_NAME es '{model_name}'."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    @property
+    def input_shape(self) -> Tuple[int, int]:
+        return tuple(self.metadata["input_shape"])
+
+    def forward(self, faces: np.ndarray) -> np.ndarray:
+        outputs = self.session.run(None, {self.input_name: faces.astype(np.float32, copy=False)})[0]
+        embeddings = np.asarray(outputs, dtype=np.float32).reshape(faces.shape[0], -1)
+        if self.metadata.get("l2_normalize"):
+            embeddings = _l2_normalize(embeddings)
+        return embeddings
+
+
+class FakeBackend(EmbeddingBackend):
+    """
+    Backend determinista sin modelo, para benchmarks y pruebas sin
+    TensorFlow: promedia el rostro en una rejilla de 16x16 y lo proyecta
+    con una matriz aleatoria fija (semilla = nombre del modelo). La misma
+    imagen da siempre el mismo vector y rostros parecidos, vectores
+    cercanos. FACE_FAKE_EMBED_MS simula el costo por imagen del modelo real.
+    """
+
+    name = "fake"
+    # (ancho, alto) de entrada y dimensión de salida de los modelos reales.
+    SHAPES = {
+        "VGG-Face": ((224, 224), 2622),
+        "Facenet": ((160, 160), 128),
+        "Facenet512": ((160, 160), 512),
+        "ArcFace": ((112, 112), 512),
+    }
+    _GRID = 16
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self._shape, dim = self.SHAPES.get(model_name, ((160, 160), 128))
+        rng = np.random.default_rng(zlib.crc32(model_name.encode()))
+        self._projection = rng.standard_normal((self._GRID * self._GRID * 3, dim)).astype(np.float32)
+
+    @property
+    def input_shape(self) -> Tuple[int, int]:
+        return self._shape
+
+    def forward(self, faces: np.ndarray) -> np.ndarray:
+        n, height, width, _ = faces.shape
+        g = self._GRID
+        faces = faces[:, :height - height % g, :width - width % g, :]
+        pooled = faces.reshape(n, g, faces.shape[1] // g, g, faces.shape[2] // g, 3).mean(axis=(2, 4))
+        pooled = pooled.reshape(n, -1) - 0.5
+        if FACE_FAKE_EMBED_MS:
+            time.sleep(FACE_FAKE_EMBED_MS * n / 1000.0)
+        return _l2_normalize(pooled.astype(np.float32) @ self._projection)
+
+
+BACKENDS = {
+    DeepFaceBackend.name: DeepFaceBackend,
+    OnnxBackend.name: OnnxBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def create_backend(model_name: str, backend_name: str = FACE_EMBEDDING_BACKEND) -> EmbeddingBackend:
+    """Instancia el backend configurado en FACE_EMBEDDING_BACKEND."""
+    try:
+        backend_cls = BACKENDS[backend_name]
+    except KeyError:
+        raise ValueError(f"Backend de embeddings desconocido: '{backend_name}'. Use uno de {list(BACKENDS)}.")
+    return backend_cls(model_name)
@@ -0,0 +1,84 @@
+# ===============================================================
+# ARCHIVO: app/services/embedding_cache.py
+# PROPÓSITO: Caché LRU con caducidad (TTL) de embeddings faciales,
+#            direccionada por contenido: la llave es el hash de los bytes
+#            decodificados de la imagen más el nombre del modelo. Un
+#            reintento del kiosco con la misma foto cuesta microsegundos
+#            en lugar de una pasada completa del modelo.
+# ===============================================================
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.config import FACE_EMBEDDING_CACHE_SIZE, FACE_EMBEDDING_CACHE_TTL_SECONDS
+
+
+def cache_key(image_bytes: bytes, model_name: str) -> Tuple[bytes, str]:
+    return hashlib.blake2b(image_bytes, digest_size=20).digest(), model_name
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[bytes, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key) -> Optional[np.ndarray]:
+        if not self.enabled:
+            return None
+        ahora = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and ahora - entry[0] > self.ttl_s:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, embedding: np.ndarray):
+        """Guarda el embedding como solo lectura: se comparte con quien lo pida después."""
+        if not self.enabled:
+            return
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / consultas, 4) if consultas else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions
+            }
+
+
+embedding_cache = EmbeddingCache(FACE_EMBEDDING_CACHE_SIZE, FACE_EMBEDDING_CACHE_TTL_SECONDS)
@@ -0,0 +1,54 @@
+# ===============================================================
+# ARCHIVO: app/services/embedding_storage.py
+# PROPÓSITO: Formato binario de las plantillas faciales: float32
+#            little-endian crudo en Usuario.embedding_facial, con el
+#            modelo y la dimensión registrados en columnas aparte.
+#            La lectura es sin copia (np.frombuffer).
+# ===============================================================
+import json
+from typing import Optional
+
+import numpy as np
+
+from app.models import tablas as models
+
+EMBEDDING_DTYPE = np.dtype('<f4')
+
+# Modelo con el que se generaron las plantillas JSON anteriores a este formato.
+LEGACY_MODEL_NAME = "VGG-Face"
+
+
+def encode_embedding(vector) -> bytes:
+    """Serializa un vector a bytes float32 little-endian."""
+    return np.ascontiguousarray(vector, dtype=EMBEDDING_DTYPE).reshape(-1).tobytes()
+
+
+def decode_embedding(blob: bytes, dim: Optional[int] = None) -> np.ndarray:
+    """
+    Interpreta los bytes como float32 sin copiarlos. El arreglo devuelto
+    es de solo lectura porque comparte la memoria del objeto bytes.
+    """
+    vector = np.frombuffer(blob, dtype=EMBEDDING_DTYPE)
+    if dim is not None and vector.shape[0] != dim:
+        raise ValueError(f"La plantilla tiene {vector.shape[0]} valores, se esperaban {dim}.")
+    return vector
+
+
+def set_user_embedding(usuario: models.Usuario, vector, model_name: str):
+    """Guarda el embedding del usuario en formato binario."""
+    vector = np.asarray(vector, dtype=EMBEDDING_DTYPE).reshape(-1)
+    usuario.embedding_facial = encode_embedding(vector)
+    usuario.embedding_modelo = model_name
+    usuario.embedding_dim = int(vector.shape[0])
+
+
+def load_user_embedding(usuario: models.Usuario) -> Optional[np.ndarray]:
+    """
+    Devuelve el embedding del usuario. Si aún no se migró, cae al JSON
+    heredado de plantilla_facial.
+    """
+    if usuario.embedding_facial:
+        return decode_embedding(usuario.embedding_facial, usuario.embedding_dim)
+    if usuario.plantilla_facial:
+        return np.asarray(json.loads(usuario.plantilla_facial), dtype=EMBEDDING_DTYPE)
+    return None
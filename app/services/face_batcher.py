@@ -0,0 +1,136 @@
+# ===============================================================
+# ARCHIVO: app/services/face_batcher.py
+# PROPÓSITO: Agrupa en micro-lotes las peticiones de embedding que
+#            llegan casi al mismo tiempo (cambio de turno) para hacer
+#            una sola pasada del modelo por lote en lugar de una por
+#            imagen. Cada llamador recibe su propio vector.
+# ===============================================================
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+from app.core.config import FACE_BATCH_MAX_SIZE, FACE_BATCH_WINDOW_MS, FACE_MAX_ADMITTED_IMAGES, FACE_RETRY_AFTER_SECONDS
+from app.services.face_worker_pool import ColaLlenaError, FaceWorkerPool, face_pool
+
+
+class FaceBatcher:
+    """
+    Cola de peticiones + un hilo que arma lotes de hasta `max_batch_size`
+    imágenes o lo que llegue en `window_ms`, y los manda al pool de
+    inferencia como un solo trabajo. Como máximo `max_admitted` imágenes
+    entre pendientes y en inferencia (cada una es un hilo de la API
+    esperando); la siguiente recibe ColaLlenaError de inmediato.
+    """
+
+    def __init__(self, pool: FaceWorkerPool, batch_fn: Callable, max_batch_size: int,
+                 window_ms: float, max_admitted: int, retry_after: int):
+        self.pool = pool
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = window_ms / 1000.0
+        self.retry_after = retry_after
+        self.max_admitted = max(1, max_admitted)
+        self._admitted = threading.BoundedSemaphore(self.max_admitted)
+        self._pending: "queue.Queue[Tuple[bytes, Future]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name="face-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, image_bytes: bytes) -> Future:
+        """Encola una imagen; lanza ColaLlenaError si no hay lugar."""
+        if not self._admitted.acquire(blocking=False):
+            raise ColaLlenaError(self.retry_after)
+        self._ensure_thread()
+        future = Future()
+        self._pending.put_nowait((image_bytes, future))
+        return future
+
+    def embed(self, image_bytes: bytes):
+        """Encola la imagen y espera su embedding (o la excepción de su imagen)."""
+        return self.submit(image_bytes).result()
+
+    def _collect(self) -> List[Tuple[bytes, Future]]:
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            callers = [f for _, f in batch]
+            try:
+                # Bloquea hasta que el pool tenga lugar: mientras tanto se
+                # agotan los lugares admitidos y las nuevas peticiones reciben 503.
+                job = self.pool.submit(self.batch_fn, [b for b, _ in batch], block=True)
+            except Exception as e:
+                self._deliver_all(callers, [e] * len(callers))
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+            job.add_done_callback(lambda job, callers=callers: self._deliver(job, callers))
+
+    def _deliver(self, job: Future, callers: List[Future]):
+        try:
+            results = job.result()
+        except Exception as e:
+            results = [e] * len(callers)
+        self._deliver_all(callers, results)
+
+    def _deliver_all(self, callers: List[Future], results: list):
+        faltante = RuntimeError("El lote de inferencia no devolvió resultado para esta imagen.")
+        for i, f in enumerate(callers):
+            result = results[i] if i < len(results) else faltante
+            # El lugar se libera antes de despertar al llamador.
+            self._admitted.release()
+            if isinstance(result, Exception):
+                f.set_exception(result)
+            else:
+                f.set_result(result)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000.0,
+                "pending": self._pending.qsize(),
+                "max_admitted": self.max_admitted,
+                "batches": self.batches,
+                "avg_batch_size": (self.items / self.batches) if self.batches else 0.0
+            }
+
+
+def _embed_batch(images_bytes):
+    # Importación diferida: el hilo del batcher no necesita DeepFace, solo
+    # los procesos de inferencia (o este proceso si el pool está deshabilitado).
+    from app.services.face_service import embed_images_bytes
+    return embed_images_bytes(images_bytes)
+
+
+face_batcher = FaceBatcher(
+    face_pool,
+    _embed_batch,
+    FACE_BATCH_MAX_SIZE,
+    FACE_BATCH_WINDOW_MS,
+    FACE_MAX_ADMITTED_IMAGES,
+    FACE_RETRY_AFTER_SECONDS
+)
@@ -0,0 +1,77 @@
+# ===============================================================
+# ARCHIVO: app/services/face_distance.py
+# PROPÓSITO: Distancias entre embeddings faciales (coseno, euclidiana
+#            y euclidiana-L2) calculadas directo con NumPy, y los
+#            umbrales de decisión por modelo y métrica.
+# ===============================================================
+import json
+from typing import Dict
+
+import numpy as np
+
+from app.core.config import FACE_THRESHOLDS
+
+METRICAS = ("cosine", "euclidean", "euclidean_l2")
+
+# Umbrales de fábrica (los mismos que usa DeepFace.verify).
+UMBRALES_POR_DEFECTO: Dict[str, Dict[str, float]] = {
+    "VGG-Face": {"cosine": 0.68, "euclidean": 1.17, "euclidean_l2": 1.17},
+    "Facenet": {"cosine": 0.40, "euclidean": 10.0, "euclidean_l2": 0.80},
+    "Facenet512": {"cosine": 0.30, "euclidean": 23.56, "euclidean_l2": 1.04},
+    "ArcFace": {"cosine": 0.68, "euclidean": 4.15, "euclidean_l2": 1.13},
+    "Dlib": {"cosine": 0.07, "euclidean": 0.6, "euclidean_l2": 0.4},
+    "SFace": {"cosine": 0.593, "euclidean": 10.734, "euclidean_l2": 1.055},
+    "OpenFace": {"cosine": 0.10, "euclidean": 0.55, "euclidean_l2": 0.55},
+    "DeepFace": {"cosine": 0.23, "euclidean": 64.0, "euclidean_l2": 0.64},
+    "DeepID": {"cosine": 0.015, "euclidean": 45.0, "euclidean_l2": 0.17},
+    "GhostFaceNet": {"cosine": 0.65, "euclidean": 35.71, "euclidean_l2": 1.10},
+}
+
+
+def _cargar_umbrales() -> Dict[str, Dict[str, float]]:
+    umbrales = {modelo: dict(valores) for modelo, valores in UMBRALES_POR_DEFECTO.items()}
+    if FACE_THRESHOLDS:
+        try:
+            # Se valida todo antes de aplicar: un valor malo no deja la tabla a medias.
+            ajustes = {
+                modelo: {m: float(v) for m, v in valores.items()}
+                for modelo, valores in json.loads(FACE_THRESHOLDS).items()
+            }
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"--- ERROR (face_distance): FACE_THRESHOLDS no es un JSON válido, se ignora: {e}")
+            ajustes = {}
+        for modelo, valores in ajustes.items():
+            umbrales.setdefault(modelo, {}).update(valores)
+    return umbrales
+
+
+UMBRALES = _cargar_umbrales()
+
+
+def get_threshold(model_name: str, metric: str) -> float:
+    try:
+        return UMBRALES[model_name][metric]
+    except KeyError:
+        raise ValueError(f"No hay umbral configurado para el modelo '{model_name}' con la métrica '{metric}'.")
+
+
+def _l2_normalize(x: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norm == 0, 1.0, norm)
+
+
+def distance(a, b, metric: str = "cosine") -> np.ndarray:
+    """
+    Distancia entre `a` (D,) y `b` (D,) o (N, D). Con una matriz en `b`
+    devuelve las N distancias en una sola operación vectorizada.
+    """
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+
+    if metric == "cosine":
+        return 1.0 - _l2_normalize(b) @ _l2_normalize(a)
+    if metric == "euclidean":
+        return np.linalg.norm(b - a, axis=-1)
+    if metric == "euclidean_l2":
+        return np.linalg.norm(_l2_normalize(b) - _l2_normalize(a), axis=-1)
+    raise ValueError(f"Métrica no soportada: '{metric}'. Use una de {METRICAS}.")
@@ -0,0 +1,135 @@
+# ===============================================================
+# ARCHIVO: app/services/face_gate.py
+# PROPÓSITO: Filtro previo y barato (milisegundos, CPU) de las capturas
+#            faciales antes de mandarlas a inferencia: detector Haar de
+#            OpenCV, nitidez (varianza del Laplaciano), brillo medio y,
+#            opcionalmente, cuadros repetidos. Las capturas sin rostro,
+#            borrosas, oscuras o duplicadas se rechazan sin pagar DeepFace.
+# ===============================================================
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.config import (
+    FACE_GATE_MIN_SHARPNESS, FACE_GATE_MIN_BRIGHTNESS, FACE_GATE_MAX_BRIGHTNESS,
+    FACE_GATE_DETECTOR, FACE_GATE_DUPLICATE_SECONDS
+)
+
+# Mensajes para el usuario por motivo de rechazo.
+MOTIVOS = {
+    "sin_rostro": "No se detectó un rostro en la imagen. Colócate de frente a la cámara.",
+    "borrosa": "La imagen está borrosa. Mantén el dispositivo quieto e intenta de nuevo.",
+    "oscura": "La imagen está demasiado oscura. Busca un lugar con más luz.",
+    "sobreexpuesta": "La imagen tiene demasiada luz. Evita contraluces o luz directa.",
+    "duplicada": "Captura repetida. Espera un momento antes de volver a intentar.",
+}
+
+# Distancia de Hamming máxima (de 64 bits) para considerar dos cuadros iguales.
+_HAMMING_DUPLICADO = 5
+
+_local = threading.local()
+
+
+def _detector():
+    """
+    Un clasificador Haar por hilo (detectMultiScale no es seguro entre
+    hilos). None si esta versión de OpenCV no trae Haar (OpenCV 5 lo movió
+    a contrib): en ese caso solo se revisan nitidez y brillo.
+    """
+    import cv2
+
+    if not hasattr(_local, "cascade"):
+        if hasattr(cv2, "CascadeClassifier"):
+            _local.cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+        else:
+            print("--- ERROR (face_gate): OpenCV sin CascadeClassifier; se omite el detector de rostros.")
+            _local.cascade = None
+    return _local.cascade
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Hash de diferencias de 64 bits: dos cuadros casi iguales dan hashes cercanos."""
+    import cv2
+
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class DuplicateFilter:
+    """
+    Recuerda los hashes de los cuadros recientes durante `window_s`
+    segundos, por origen (kiosco o usuario del token): el cuadro de un
+    kiosco no bloquea la checada de otro.
+    """
+
+    def __init__(self, window_s: float):
+        self.window_s = window_s
+        self._lock = threading.Lock()
+        self._recent: Dict[Optional[str], deque] = {}
+
+    def seen(self, h: int, origen: Optional[str] = None) -> bool:
+        """True si un cuadro casi idéntico llegó del mismo origen dentro de la ventana; si no, lo registra."""
+        if self.window_s <= 0:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            for clave in list(self._recent):
+                recientes = self._recent[clave]
+                while recientes and ahora - recientes[0][0] > self.window_s:
+                    recientes.popleft()
+                if not recientes:
+                    del self._recent[clave]
+            recientes = self._recent.setdefault(origen, deque())
+            if any(bin(h ^ previo).count("1") <= _HAMMING_DUPLICADO for _, previo in recientes):
+                return True
+            recientes.append((ahora, h))
+            return False
+
+
+duplicates = DuplicateFilter(FACE_GATE_DUPLICATE_SECONDS)
+
+
+def evaluate(image: np.ndarray, detector: bool = FACE_GATE_DETECTOR, origen: Optional[str] = None) -> dict:
+    """
+    Evalúa una imagen BGR ya reducida (~FACE_GATE_MAX_SIDE px). `origen`
+    identifica al kiosco o usuario que la mandó, para el filtro de cuadros
+    repetidos. Devuelve las métricas y `reason` (None si la imagen es utilizable).
+    """
+    import cv2
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    brillo = float(gray.mean())
+    nitidez = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    resultado = {"brightness": round(brillo, 1), "sharpness": round(nitidez, 1), "faces": None, "reason": None}
+
+    if brillo < FACE_GATE_MIN_BRIGHTNESS:
+        resultado["reason"] = "oscura"
+    elif brillo > FACE_GATE_MAX_BRIGHTNESS:
+        resultado["reason"] = "sobreexpuesta"
+    elif nitidez < FACE_GATE_MIN_SHARPNESS:
+        resultado["reason"] = "borrosa"
+    if resultado["reason"]:
+        return resultado
+
+    region: Optional[np.ndarray] = gray
+    cascade = _detector() if detector else None
+    if cascade is not None:
+        lado_min = max(24, min(gray.shape) // 8)
+        caras = cascade.detectMultiScale(
+            cv2.equalizeHist(gray), scaleFactor=1.1, minNeighbors=4, minSize=(lado_min, lado_min)
+        )
+        resultado["faces"] = len(caras)
+        if len(caras) == 0:
+            resultado["reason"] = "sin_rostro"
+            return resultado
+        # El cuadro repetido se compara sobre el rostro más grande, no sobre el fondo.
+        x, y, w, h = max(caras, key=lambda c: c[2] * c[3])
+        region = gray[y:y + h, x:x + w]
+
+    if duplicates.seen(dhash(region), origen):
+        resultado["reason"] = "duplicada"
+    return resultado
@@ -0,0 +1,466 @@
+# ===============================================================
+# ARCHIVO: app/services/face_index_service.py
+# PROPÓSITO: Índice en memoria de las plantillas faciales para
+#            identificación 1:N ("¿quién es?") en checadores compartidos.
+#            Todas las plantillas viven en una sola matriz float32
+#            contigua y cada búsqueda es un único producto matriz-vector.
+#            Opcionalmente (FACE_INDEX_INT8) se guarda una copia int8 con
+#            escala por vector y los mejores candidatos se reordenan con
+#            los vectores exactos. Con FACE_IVF_ENABLED la búsqueda usa el
+#            índice aproximado IVF de face_ivf_index. Con
+#            FACE_SHARED_STORE_DIR la matriz float32 es un memmap de
+#            face_shared_store compartido por los workers.
+# ===============================================================
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    FACE_MODEL_NAME, FACE_INDEX_INT8, FACE_INDEX_RERANK,
+    FACE_IVF_ENABLED, FACE_IVF_PATH, FACE_IVF_NLIST, FACE_IVF_NPROBE,
+    FACE_SHARED_STORE_DIR, FACE_SHARED_STORE_RECONCILE_SECONDS
+)
+from app.models import tablas as models
+from app.services import embedding_storage, face_distance
+from app.services.face_ivf_index import IVFIndex
+from app.services.face_shared_store import SharedEmbeddingStore
+
+
+def umbral_identificacion() -> float:
+    """Distancia coseno máxima para aceptar una identificación con el modelo actual."""
+    return face_distance.get_threshold(FACE_MODEL_NAME, "cosine")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza cada renglón a norma 1 para que coseno = producto punto."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cuantización escalar simétrica por vector: x ≈ q * escala, con q int8
+    en [-127, 127] y escala = max|x| / 127.
+    """
+    vectors = np.atleast_2d(vectors)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+
+# Renglones por bloque al buscar en int8: limita el float32 temporal de la conversión.
+_QUANT_CHUNK = 8192
+
+# Recibe una lista de id_usuario y devuelve los ids que aún existen y sus
+# vectores exactos, en el mismo orden.
+ExactLoader = Callable[[List[int]], Tuple[List[int], np.ndarray]]
+
+
+class FaceIndex:
+    """
+    Matriz (N, D) de embeddings normalizados más el arreglo paralelo de
+    id_usuario. Crece por duplicación de capacidad para que las altas
+    incrementales no copien la matriz completa en cada enrolamiento.
+    En modo int8 la matriz es int8 y se acompaña de las escalas por vector.
+    """
+
+    def __init__(self, quantized: bool = False, rerank: int = 10):
+        self._lock = threading.Lock()
+        self.quantized = quantized
+        self.rerank = max(1, rerank)
+        self._matrix: Optional[np.ndarray] = None
+        self._scales = np.empty(0, dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self.loaded = False
+        # Versión del almacén compartido montada (None = matriz propia).
+        self.shared_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def load(self, db: Session):
+        """Carga (o recarga) todas las plantillas faciales del modelo actual."""
+        ids, matrix = load_templates(db)
+        self.build(ids, matrix)
+        print(f"--- LOG (face_index): Índice facial cargado con {self._size} plantillas. ---")
+
+    def build(self, ids: np.ndarray, vectors: Optional[np.ndarray]):
+        """Reemplaza el contenido del índice con estos ids y vectores."""
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32)) if vectors is not None and len(ids) else None
+        scales = np.empty(0, dtype=np.float32)
+        if matrix is not None and self.quantized:
+            matrix, scales = quantize(matrix)
+
+        with self._lock:
+            self._matrix = np.ascontiguousarray(matrix) if matrix is not None else None
+            self._scales = scales
+            self._ids = np.asarray(ids, dtype=np.int64)
+            self._size = len(ids)
+            self.shared_version = None
+            self.loaded = True
+
+    def attach(self, ids: np.ndarray, matrix: np.ndarray, version: int):
+        """Usa directamente una matriz ya normalizada (memmap de solo lectura), sin copiarla."""
+        with self._lock:
+            self._matrix = matrix
+            self._ids = ids
+            self._size = len(ids)
+            self.shared_version = version
+            self.loaded = True
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.load(db)
+
+    def snapshot(self) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[int]]:
+        """(ids, matriz, versión del almacén) vigentes, sin copiar la matriz."""
+        with self._lock:
+            matrix = self._matrix[:self._size] if self._matrix is not None else None
+            return self._ids[:self._size], matrix, self.shared_version
+
+    def add(self, id_usuario: int, embedding):
+        """Agrega (o reemplaza) la plantilla de un usuario sin recargar el índice."""
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        scale = np.ones(1, dtype=np.float32)
+        if self.quantized:
+            vector, scale = quantize(vector)
+        vector = vector[0]
+        dtype = np.int8 if self.quantized else np.float32
+
+        with self._lock:
+            existing = np.flatnonzero(self._ids[:self._size] == id_usuario)
+            if existing.size:
+                self._matrix[existing[0]] = vector
+                if self.quantized:
+                    self._scales[existing[0]] = scale[0]
+                return
+
+            if self._matrix is None:
+                self._matrix = np.empty((16, vector.shape[0]), dtype=dtype)
+                self._scales = np.empty(16, dtype=np.float32)
+                self._ids = np.empty(16, dtype=np.int64)
+            elif self._size == self._matrix.shape[0]:
+                capacity = self._matrix.shape[0] * 2
+                matrix = np.empty((capacity, self._matrix.shape[1]), dtype=dtype)
+                matrix[:self._size] = self._matrix[:self._size]
+                ids = np.empty(capacity, dtype=np.int64)
+                ids[:self._size] = self._ids[:self._size]
+                scales = np.empty(capacity, dtype=np.float32)
+                if self.quantized:
+                    scales[:self._size] = self._scales[:self._size]
+                self._matrix, self._ids, self._scales = matrix, ids, scales
+
+            self._matrix[self._size] = vector
+            if self.quantized:
+                self._scales[self._size] = scale[0]
+            self._ids[self._size] = id_usuario
+            self._size += 1
+
+    def memory_bytes(self) -> int:
+        """Bytes ocupados por los vectores, escalas e ids del índice."""
+        with self._lock:
+            n = self._size
+            if self._matrix is None:
+                return 0
+            total = n * self._matrix.shape[1] * self._matrix.itemsize + n * self._ids.itemsize
+            if self.quantized:
+                total += n * self._scales.itemsize
+            return total
+
+    def _approx_distances(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Distancias coseno aproximadas con la copia int8, por bloques."""
+        with self._lock:
+            n = self._size
+            matrix, scales, ids = self._matrix, self._scales, self._ids[:n].copy()
+        distances = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _QUANT_CHUNK):
+            stop = min(start + _QUANT_CHUNK, n)
+            scores = matrix[start:stop].astype(np.float32) @ query
+            distances[start:stop] = 1.0 - scores * scales[start:stop]
+        return distances, ids
+
+    def search(self, embedding, k: int = 1, exact_loader: Optional[ExactLoader] = None) -> List[Tuple[int, float]]:
+        """
+        Devuelve los k usuarios más cercanos como (id_usuario, distancia
+        coseno), ordenados de menor a mayor distancia.
+        En modo int8, si se da `exact_loader`, los k * rerank mejores
+        candidatos aproximados se reordenan con sus vectores exactos.
+        """
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+
+        if self._size == 0:
+            return []
+        if self.quantized:
+            distances, ids = self._approx_distances(query)
+        else:
+            with self._lock:
+                distances = 1.0 - self._matrix[:self._size] @ query
+                ids = self._ids[:self._size].copy()
+
+        top = _top_k(distances, k * self.rerank if (self.quantized and exact_loader) else k)
+
+        if self.quantized and exact_loader:
+            candidates, vectors = exact_loader([int(i) for i in ids[top]])
+            if not candidates:
+                return []
+            exact = 1.0 - _normalize(np.asarray(vectors, dtype=np.float32)) @ query
+            order = _top_k(exact, k)
+            return [(candidates[i], float(exact[i])) for i in order]
+
+        return [(int(ids[i]), float(distances[i])) for i in top]
+
+    def stats(self) -> dict:
+        return {
+            "size": self._size,
+            "mode": "int8" if self.quantized else "float32",
+            "memory_bytes": self.memory_bytes(),
+            "shared_version": self.shared_version
+        }
+
+
+def _template_filter():
+    """Usuarios con plantilla facial del modelo actual (o JSON heredado, si aplica)."""
+    del_modelo = models.Usuario.embedding_facial.isnot(None) & (models.Usuario.embedding_modelo == FACE_MODEL_NAME)
+    if FACE_MODEL_NAME != embedding_storage.LEGACY_MODEL_NAME:
+        return del_modelo
+    return del_modelo | (models.Usuario.embedding_facial.is_(None) & models.Usuario.plantilla_facial.isnot(None))
+
+
+def template_signature(db: Session) -> List[int]:
+    """
+    gallery_signature de los usuarios que load_templates devolvería, en
+    una consulta agregada (sin leer los vectores).
+    """
+    total, suma, maximo = db.query(
+        func.count(models.Usuario.id_usuario),
+        func.sum(models.Usuario.id_usuario),
+        func.max(models.Usuario.id_usuario)
+    ).filter(_template_filter()).one()
+    return [int(total), int(suma or 0), int(maximo or 0)]
+
+
+def load_templates(db: Session, ids: Optional[List[int]] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Lee las plantillas faciales del modelo actual (opcionalmente solo de
+    estos usuarios). Las binarias se leen sin parsear; las JSON heredadas
+    aún no migradas se convierten al vuelo.
+    """
+    query = db.query(
+        models.Usuario.id_usuario,
+        models.Usuario.embedding_facial,
+        models.Usuario.embedding_modelo,
+        models.Usuario.embedding_dim,
+        models.Usuario.plantilla_facial
+    ).filter(_template_filter())
+    if ids is not None:
+        query = query.filter(models.Usuario.id_usuario.in_(ids))
+
+    found, vectors = [], []
+    for r in query.all():
+        if r.embedding_facial:
+            if r.embedding_modelo != FACE_MODEL_NAME:
+                continue
+            vectors.append(embedding_storage.decode_embedding(r.embedding_facial, r.embedding_dim))
+        elif FACE_MODEL_NAME == embedding_storage.LEGACY_MODEL_NAME:
+            vectors.append(embedding_storage.load_user_embedding(r))
+        else:
+            continue
+        found.append(r.id_usuario)
+
+    return np.asarray(found, dtype=np.int64), (np.stack(vectors) if vectors else None)
+
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Índices de las k distancias menores, ordenados."""
+    k = min(k, distances.shape[0])
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top])]
+
+
+def load_exact_embeddings(db: Session, ids: List[int]) -> Tuple[List[int], Optional[np.ndarray]]:
+    """
+    Lee de la base de datos los vectores exactos de estos usuarios, en el
+    mismo orden. Se omiten los usuarios borrados (o sin plantilla) después
+    de cargar el índice.
+    """
+    rows = db.query(
+        models.Usuario.id_usuario,
+        models.Usuario.embedding_facial,
+        models.Usuario.embedding_dim,
+        models.Usuario.plantilla_facial
+    ).filter(models.Usuario.id_usuario.in_(ids)).all()
+    por_id = {
+        r.id_usuario: embedding_storage.load_user_embedding(r)
+        for r in rows if r.embedding_facial or r.plantilla_facial
+    }
+    vigentes = [i for i in ids if i in por_id]
+    return vigentes, (np.stack([por_id[i] for i in vigentes]) if vigentes else None)
+
+
+# Índices compartidos por todas las peticiones del proceso.
+face_index = FaceIndex(quantized=FACE_INDEX_INT8, rerank=FACE_INDEX_RERANK)
+ivf_index = IVFIndex(nprobe=FACE_IVF_NPROBE)
+_ivf_lock = threading.Lock()
+_ivf_thread: Optional[threading.Thread] = None
+# El IVF ya se cargó (o entrenó) y tiene la galería repartida.
+_ivf_ready = False
+shared_store = SharedEmbeddingStore("" if FACE_INDEX_INT8 else FACE_SHARED_STORE_DIR)
+# Momento (time.monotonic) de la siguiente conciliación del almacén con la base de datos.
+_next_reconcile = 0.0
+
+
+def attach_shared() -> bool:
+    """
+    Monta la versión vigente del almacén compartido si cambió. No toca la
+    base de datos; devuelve False si aún no hay versión del modelo actual.
+    """
+    meta = shared_store.current()
+    if meta is None or meta["model"] != FACE_MODEL_NAME:
+        return False
+    if meta["version"] != face_index.shared_version:
+        ids, matrix = shared_store.open(meta)
+        face_index.attach(ids, matrix, meta["version"])
+        print(f"--- LOG (face_index): Matriz compartida v{meta['version']} montada ({meta['count']} plantillas). ---")
+    return True
+
+
+def _shared_base(db: Session) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Galería completa desde la base de datos, normalizada para el almacén."""
+    ids, matrix = load_templates(db)
+    return ids, (_normalize(matrix.astype(np.float32)) if matrix is not None else None)
+
+
+def _ensure_shared_loaded(db: Session):
+    """
+    Monta el almacén compartido; si no existe, lo publica desde la base de
+    datos (también vacío: una galería vacía no se vuelve a consultar en cada
+    búsqueda). Cada FACE_SHARED_STORE_RECONCILE_SECONDS compara la firma
+    de la galería (número, suma y máximo de los id) con la base de datos y
+    republica si no coincide.
+    """
+    global _next_reconcile
+    meta = shared_store.current()
+    vigente = meta is not None and meta["model"] == FACE_MODEL_NAME
+    if vigente and time.monotonic() >= _next_reconcile:
+        _next_reconcile = time.monotonic() + FACE_SHARED_STORE_RECONCILE_SECONDS
+        firma = template_signature(db)
+        if firma != meta.get("firma"):
+            print(f"--- LOG (face_store): El almacén ({meta.get('firma')}) no coincide con la BD ({firma}); se republica. ---")
+            vigente = False
+    if not vigente:
+        shared_store.publish(*_shared_base(db), FACE_MODEL_NAME)
+        _next_reconcile = time.monotonic() + FACE_SHARED_STORE_RECONCILE_SECONDS
+    attach_shared()
+
+
+def train_ivf(db: Session, nlist: int = FACE_IVF_NLIST, path: str = FACE_IVF_PATH) -> IVFIndex:
+    """Entrena el índice IVF con todas las plantillas guardadas y lo guarda en disco."""
+    ids, matrix = load_templates(db)
+    if matrix is None:
+        raise ValueError("No hay plantillas faciales para entrenar el índice IVF.")
+    ivf_index.train(ids, matrix, FACE_MODEL_NAME, nlist=nlist)
+    ivf_index.save(path)
+    return ivf_index
+
+
+def _prepare_ivf(bind):
+    """
+    Hilo de fondo (fuera de las peticiones): carga el IVF de disco, o lo
+    entrena si no existe o es de otro modelo, y reparte en sus listas la
+    galería vigente: la versión montada del almacén compartido o, sin él,
+    las plantillas de la base de datos.
+    """
+    global _ivf_ready
+    try:
+        with Session(bind=bind) as db:
+            if ivf_index.model_name != FACE_MODEL_NAME:
+                if not ivf_index.load(FACE_IVF_PATH) or ivf_index.model_name != FACE_MODEL_NAME:
+                    print("--- LOG (face_ivf): No hay índice IVF vigente en disco; entrenando en segundo plano... ---")
+                    train_ivf(db)
+            if shared_store.enabled:
+                ids, matrix, version = face_index.snapshot()
+            else:
+                (ids, matrix), version = load_templates(db), None
+            ivf_index.assign(ids, matrix if matrix is not None else np.empty((0, 0), dtype=np.float32), version)
+        _ivf_ready = True
+        print(f"--- LOG (face_ivf): Índice IVF listo con {len(ivf_index)} plantillas. ---")
+    except ValueError as e:
+        print(f"--- LOG (face_ivf): {e} Se usa la búsqueda exacta. ---")
+    except Exception as e:
+        print(f"--- ERROR (face_ivf): No se pudo preparar el índice IVF: {e} ---")
+
+
+def _start_ivf_preparation(db: Session):
+    """Lanza _prepare_ivf en segundo plano si no está corriendo ya."""
+    global _ivf_thread
+    with _ivf_lock:
+        if _ivf_thread is not None and _ivf_thread.is_alive():
+            return
+        _ivf_thread = threading.Thread(target=_prepare_ivf, args=(db.get_bind(),), name="face-ivf", daemon=True)
+        _ivf_thread.start()
+
+
+def _ivf_in_sync() -> bool:
+    """
+    Con almacén compartido, el IVF debe reflejar la versión montada. Las
+    altas anotadas en el almacén se aplican aquí (son pocas); si hubo una
+    publicación completa de por medio devuelve False y hay que repartir
+    toda la galería otra vez.
+    """
+    actual = face_index.shared_version
+    if ivf_index.store_version == actual:
+        return True
+    meta = shared_store.current()
+    if ivf_index.store_version is None or meta is None or meta["version"] != actual:
+        return False
+    cambios = shared_store.changes_since(meta, ivf_index.store_version)
+    if cambios is None:
+        return False
+    ids, matrix, _ = face_index.snapshot()
+    for id_usuario in set(cambios):
+        pos = np.flatnonzero(ids == id_usuario)
+        if pos.size:
+            ivf_index.add(id_usuario, matrix[pos[0]])
+    ivf_index.store_version = actual
+    return True
+
+
+def add_template(db: Session, id_usuario: int, embedding):
+    """Agrega la plantilla recién enrolada (ya confirmada en la BD) a los índices en memoria."""
+    if shared_store.enabled:
+        # Nueva versión en disco; los demás workers la montan en su siguiente búsqueda.
+        # Sin versión previa se parte de todas las plantillas de la BD.
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        shared_store.upsert(id_usuario, vector, FACE_MODEL_NAME, lambda: _shared_base(db))
+        attach_shared()
+    else:
+        face_index.add(id_usuario, embedding)
+    ivf_index.add(id_usuario, embedding)
+
+
+def identify(db: Session, embedding, k: int = 1) -> List[Tuple[int, float]]:
+    """
+    Busca los k candidatos más parecidos, cargando el índice si hace falta.
+    Con FACE_IVF_ENABLED usa el IVF solo cuando está listo y al día con la
+    versión montada; mientras se carga o entrena (en segundo plano) la
+    búsqueda es exacta.
+    """
+    if shared_store.enabled:
+        _ensure_shared_loaded(db)
+    else:
+        face_index.ensure_loaded(db)
+    if len(face_index) == 0:
+        return []
+    if FACE_IVF_ENABLED:
+        if _ivf_ready and (not shared_store.enabled or _ivf_in_sync()):
+            return ivf_index.search(embedding, k=k)
+        _start_ivf_preparation(db)
+    loader = (lambda ids: load_exact_embeddings(db, ids)) if face_index.quantized else None
+    return face_index.search(embedding, k=k, exact_loader=loader)
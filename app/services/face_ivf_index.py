@@ -0,0 +1,215 @@
+# ===============================================================
+# ARCHIVO: app/services/face_ivf_index.py
+# PROPÓSITO: Índice aproximado IVF (inverted file) para galerías faciales
+#            grandes, en NumPy puro. Un k-means esférico reparte las
+#            plantillas en listas; cada búsqueda compara la captura solo
+#            contra las `nprobe` listas con centroide más cercano.
+#            El índice entrenado se guarda en disco (.npz).
+# ===============================================================
+import os
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Máximo de puntos por centroide que se usan para entrenar el k-means.
+_PUNTOS_POR_CENTROIDE = 64
+# Renglones por bloque al asignar puntos a centroides.
+_CHUNK = 8192
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Centroide más cercano (máxima similitud coseno) de cada renglón."""
+    labels = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], _CHUNK):
+        labels[start:start + _CHUNK] = np.argmax(vectors[start:start + _CHUNK] @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(vectors: np.ndarray, nlist: int, iteraciones: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    K-means esférico sobre vectores normalizados. Entrena con una muestra
+    de a lo más nlist * _PUNTOS_POR_CENTROIDE puntos.
+    """
+    rng = np.random.default_rng(seed)
+    if vectors.shape[0] > nlist * _PUNTOS_POR_CENTROIDE:
+        vectors = vectors[rng.choice(vectors.shape[0], nlist * _PUNTOS_POR_CENTROIDE, replace=False)]
+
+    centroids = vectors[rng.choice(vectors.shape[0], nlist, replace=False)].copy()
+    for _ in range(iteraciones):
+        labels = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=nlist)
+
+        # Las listas vacías se vuelven a sembrar con puntos al azar.
+        vacias = np.flatnonzero(counts == 0)
+        if vacias.size:
+            sums[vacias] = vectors[rng.choice(vectors.shape[0], vacias.size, replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def default_nlist(n: int) -> int:
+    """Regla usual: ~sqrt(N) listas, al menos 1."""
+    return max(1, int(round(np.sqrt(n))))
+
+
+class IVFIndex:
+    """
+    Centroides (nlist, D) más una lista invertida por centroide con los
+    id_usuario y sus vectores normalizados (IVF-Flat: la distancia dentro
+    de las listas es exacta).
+    """
+
+    def __init__(self, nprobe: int = 8):
+        self._lock = threading.Lock()
+        # Al menos una lista; el tope por número de listas se aplica al buscar (aún no hay centroides).
+        self.nprobe = max(1, nprobe)
+        self.model_name: Optional[str] = None
+        self.centroids: Optional[np.ndarray] = None
+        self._list_ids: List[np.ndarray] = []
+        self._list_vectors: List[np.ndarray] = []
+        self._size = 0
+        # Versión del almacén compartido repartida en las listas (None = otra fuente).
+        self.store_version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, ids: np.ndarray, vectors: np.ndarray, model_name: str,
+              nlist: int = 0, iteraciones: int = 20, seed: int = 0):
+        """Entrena los centroides con estas plantillas y las reparte en listas."""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        ids = np.asarray(ids, dtype=np.int64)
+        nlist = min(nlist or default_nlist(len(ids)), len(ids))
+        centroids = kmeans(vectors, nlist, iteraciones, seed)
+        self._fill(centroids, ids, vectors, model_name)
+
+    def assign(self, ids: np.ndarray, vectors: np.ndarray, store_version: Optional[int] = None):
+        """
+        Reemplaza el contenido de las listas con estas plantillas, usando los
+        centroides ya entrenados (sin volver a correr k-means).
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        self._fill(self.centroids, np.asarray(ids, dtype=np.int64), vectors, self.model_name, store_version)
+
+    def _fill(self, centroids: np.ndarray, ids: np.ndarray, vectors: np.ndarray, model_name: str,
+              store_version: Optional[int] = None):
+        labels = _assign(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(centroids.shape[0] + 1))
+        list_ids = [ids[order[a:b]] for a, b in zip(bounds[:-1], bounds[1:])]
+        list_vectors = [vectors[order[a:b]] for a, b in zip(bounds[:-1], bounds[1:])]
+
+        with self._lock:
+            self.centroids = centroids
+            self.model_name = model_name
+            self._list_ids, self._list_vectors = list_ids, list_vectors
+            self._size = len(ids)
+            self.store_version = store_version
+
+    def ids(self) -> np.ndarray:
+        with self._lock:
+            return np.concatenate(self._list_ids) if self._list_ids else np.empty(0, dtype=np.int64)
+
+    def add(self, id_usuario: int, embedding):
+        """Agrega (o reemplaza) una plantilla en la lista de su centroide más cercano."""
+        if not self.trained:
+            return
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        lista = int(np.argmax(self.centroids @ vector[0]))
+
+        with self._lock:
+            for i, ids in enumerate(self._list_ids):
+                pos = np.flatnonzero(ids == id_usuario)
+                if pos.size:
+                    self._list_ids[i] = np.delete(ids, pos)
+                    self._list_vectors[i] = np.delete(self._list_vectors[i], pos, axis=0)
+                    self._size -= pos.size
+            self._list_ids[lista] = np.append(self._list_ids[lista], np.int64(id_usuario))
+            self._list_vectors[lista] = np.vstack([self._list_vectors[lista], vector])
+            self._size += 1
+
+    def search(self, embedding, k: int = 1, nprobe: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Devuelve los k usuarios más cercanos como (id_usuario, distancia
+        coseno) buscando solo en las `nprobe` listas más prometedoras.
+        """
+        if not self.trained or self._size == 0:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        nprobe = max(1, min(nprobe or self.nprobe, self.centroids.shape[0]))
+
+        with self._lock:
+            scores = self.centroids @ query
+            listas = np.argpartition(-scores, nprobe - 1)[:nprobe]
+            ids = np.concatenate([self._list_ids[i] for i in listas])
+            vectors = [self._list_vectors[i] for i in listas]
+        if ids.size == 0:
+            return []
+
+        distances = 1.0 - np.concatenate(vectors) @ query
+        k = min(k, distances.shape[0])
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(int(ids[i]), float(distances[i])) for i in top]
+
+    def save(self, path: str):
+        """Guarda el índice en un .npz; se escribe a un temporal y se renombra (atómico)."""
+        with self._lock:
+            sizes = np.array([len(ids) for ids in self._list_ids], dtype=np.int64)
+            ids = np.concatenate(self._list_ids)
+            vectors = np.concatenate(self._list_vectors)
+            centroids, model_name = self.centroids, self.model_name
+
+        directorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, centroids=centroids, ids=ids, vectors=vectors, sizes=sizes,
+                         model_name=np.array(model_name))
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+        print(f"--- LOG (face_ivf): Índice IVF guardado en {path} ({len(ids)} plantillas, {len(sizes)} listas). ---")
+
+    def load(self, path: str) -> bool:
+        """Carga un índice guardado. Devuelve False si el archivo no existe."""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            bounds = np.concatenate([[0], np.cumsum(data["sizes"])])
+            ids, vectors = data["ids"], data["vectors"]
+            list_ids = [ids[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            list_vectors = [vectors[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            centroids, model_name = data["centroids"], str(data["model_name"])
+
+        with self._lock:
+            self.centroids, self.model_name = centroids, model_name
+            self._list_ids, self._list_vectors = list_ids, list_vectors
+            self._size = len(ids)
+            self.store_version = None
+        return True
+
+    def stats(self) -> dict:
+        sizes = [len(ids) for ids in self._list_ids]
+        return {
+            "size": self._size,
+            "nlist": len(sizes),
+            "nprobe": min(self.nprobe, len(sizes)) if sizes else self.nprobe,
+            "max_list": max(sizes) if sizes else 0
+        }
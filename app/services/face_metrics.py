@@ -0,0 +1,64 @@
+# ===============================================================
+# ARCHIVO: app/services/face_metrics.py
+# PROPÓSITO: Métricas en memoria del pipeline facial: tiempos por
+#            etapa (decodificación, reescalado, detección, embedding)
+#            agrupados por tamaño de la imagen de entrada, y contadores
+#            generales. Se consultan en GET /vision/metrics.
+# ===============================================================
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+def size_bucket(pixels: int) -> str:
+    """Agrupa las imágenes por megapíxeles de entrada."""
+    mp = pixels / 1_000_000
+    if mp <= 0.5:
+        return "<=0.5MP"
+    if mp <= 2:
+        return "0.5-2MP"
+    if mp <= 8:
+        return "2-8MP"
+    return ">8MP"
+
+
+class FaceMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self._counters: Dict[str, float] = defaultdict(float)
+
+    def record_stages(self, tiempos: Dict[str, float], pixels: int):
+        """Registra los milisegundos de cada etapa de una imagen."""
+        bucket = size_bucket(pixels)
+        with self._lock:
+            for etapa, ms in tiempos.items():
+                stats = self._stages[(bucket, etapa)]
+                stats["count"] += 1
+                stats["total_ms"] += ms
+                stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] += value
+
+    def avg_pipeline_ms(self) -> float:
+        """Tiempo promedio de una imagen en el pipeline completo (suma de etapas); 0 sin datos."""
+        with self._lock:
+            total = sum(s["total_ms"] for s in self._stages.values())
+            imagenes = sum(s["count"] for (_, etapa), s in self._stages.items() if etapa == "embed")
+        return total / imagenes if imagenes else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages: Dict[str, dict] = defaultdict(dict)
+            for (bucket, etapa), stats in self._stages.items():
+                stages[bucket][etapa] = {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "max_ms": round(stats["max_ms"], 3)
+                }
+            return {"stages": dict(stages), "counters": dict(self._counters)}
+
+
+face_metrics = FaceMetrics()
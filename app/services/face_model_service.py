@@ -0,0 +1,100 @@
+# ===============================================================
+# ARCHIVO: app/services/face_model_service.py
+# PROPÓSITO: Mantiene el modelo de reconocimiento facial residente en
+#            memoria. Se construye una sola vez (al arrancar o en el
+#            primer uso) con el backend configurado (ver
+#            embedding_backends), se calienta con una inferencia de
+#            prueba y expone si ya está listo para atender peticiones.
+# ===============================================================
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import FACE_MODEL_NAME
+from app.services.embedding_backends import EmbeddingBackend, create_backend
+
+
+class FaceModelManager:
+    """Construye el backend de embeddings una vez y lo conserva en el proceso."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        self._model = None
+        self._ready = threading.Event()
+        self._started = False
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def state(self) -> str:
+        """'not_started' (nadie lo ha pedido), 'loading', 'ready' o 'failed'."""
+        if self.ready:
+            return "ready"
+        if self.error:
+            return "failed"
+        return "loading" if self._started else "not_started"
+
+    def get_model(self) -> EmbeddingBackend:
+        """Devuelve el backend del modelo, construyéndolo solo la primera vez."""
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                print(f"--- LOG (face_model): Construyendo el modelo {self.model_name}... ---")
+                inicio = time.perf_counter()
+                self._model = create_backend(self.model_name)
+                self.load_seconds = time.perf_counter() - inicio
+                print(f"--- LOG (face_model): Modelo listo en {self.load_seconds:.2f} s. ---")
+        return self._model
+
+    def warmup(self):
+        """
+        Construye el modelo y hace una inferencia con una imagen vacía para
+        inicializar el grafo y el detector antes de la primera checada.
+        """
+        self._started = True
+        try:
+            model = self.get_model()
+            width, height = model.input_shape
+            model.forward(np.zeros((1, height, width, 3), dtype=np.float32))
+            if model.name != "fake": # El backend falso no usa el detector de DeepFace.
+                from deepface import DeepFace
+                DeepFace.extract_faces(img_path=np.zeros((height, width, 3), dtype=np.uint8), enforce_detection=False)
+            self.error = None
+            self._ready.set()
+            print("--- LOG (face_model): Calentamiento del modelo terminado. ---")
+        except Exception as e:
+            self.error = str(e)
+            print(f"--- ERROR (face_model): Falló el calentamiento del modelo: {e}")
+
+    def ensure_ready(self):
+        """Garantiza que el modelo esté construido y caliente (primer uso)."""
+        if not self.ready:
+            self.warmup()
+
+    def warmup_in_background(self) -> threading.Thread:
+        hilo = threading.Thread(target=self.warmup, name="face-model-warmup", daemon=True)
+        hilo.start()
+        return hilo
+
+    def status(self) -> dict:
+        return {
+            "model": self.model_name,
+            "backend": self._model.name if self._model is not None else None,
+            "ready": self.ready,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": self.error
+        }
+
+
+# Instancia única por proceso.
+face_model = FaceModelManager(FACE_MODEL_NAME)
+
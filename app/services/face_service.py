@@ -3,19 +3,34 @@
 # PROPÓSITO: Contiene la lógica para generar "embeddings" faciales
 #            y comparar rostros usando la librería deepface.
 # ===============================================================
-# ===============================================================
-# ARCHIVO: app/services/face_service.py (con Logs de Depuración)
-# ===============================================================
 import base64
-import json
+import time
 import numpy as np
-from deepface import DeepFace
+from concurrent.futures.process import BrokenProcessPool
 from fastapi import HTTPException, status
-import tempfile
-import os
+from typing import List, Optional, Tuple
+
+from app.core.config import (
+    FACE_DISTANCE_METRIC, FACE_MAX_IMAGE_SIDE, FACE_GATE_ENABLED, FACE_GATE_MAX_SIDE, FACE_EMBEDDING_BACKEND
+)
+from app.services import face_distance, face_gate
+from app.services.face_model_service import face_model
+from app.services.face_batcher import face_batcher
+from app.services.face_metrics import face_metrics
+from app.services.embedding_cache import cache_key, embedding_cache
+from app.services.face_worker_pool import ColaLlenaError
+
+
+class ImagenInvalidaError(Exception):
+    """Los bytes recibidos no se pueden decodificar como imagen."""
+
+# Detalle del 400 cuando la imagen no se puede leer, según cómo llegó.
+DETALLE_BASE64_INVALIDO = "Invalid base64 image format." # JSON con image_base64
+DETALLE_IMAGEN_INVALIDA = "Invalid image data." # multipart u octet-stream
+
 
-def _decode_image(image_base64: str) -> str:
-    """Helper function to decode base64 image and save it temporarily."""
+def decode_base64_image(image_base64: str) -> bytes:
+    """Quita el prefijo data:image y decodifica el Base64 a bytes crudos."""
     
     # --- LOG 1: Imprimimos los primeros 100 caracteres de lo que recibimos ---
     print(f"--- LOG (face_service): Recibido image_base64 (primeros 100 chars): {image_base64[:100]}")
@@ -35,33 +50,220 @@ def _decode_image(image_base64: str) -> str:
             print(f"--- LOG (face_service): Corrigiendo padding. Añadiendo {4 - missing_padding} caracteres '='.")
             image_data += '=' * (4 - missing_padding)
             
-        image_bytes = base64.b64decode(image_data)
-        
-        temp_dir = tempfile.gettempdir()
-        temp_image_path = os.path.join(temp_dir, "temp_face_image.jpg")
-        
-        with open(temp_image_path, "wb") as f:
-            f.write(image_bytes)
-        
-        print(f"--- LOG (face_service): Imagen guardada temporalmente en {temp_image_path}")
-        return temp_image_path
-        
+        return base64.b64decode(image_data)
     except Exception as e:
         # --- LOG 3: Si la decodificación falla, imprimimos el error ---
         print(f"--- ERROR (face_service): Falló la decodificación de Base64. Error: {e}")
-        raise HTTPException(status_code=400, detail="Invalid base64 image format.")
+        raise HTTPException(status_code=400, detail=DETALLE_BASE64_INVALIDO)
+
+# Marcadores SOF de JPEG que traen alto/ancho (todos menos DHT, JPG y DAC).
+_JPEG_SOF = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Lee (ancho, alto) del encabezado de un JPEG sin decodificarlo."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        length = int.from_bytes(data[i + 2:i + 4], "big")
+        if marker in _JPEG_SOF:
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + length
+    return None
 
-def generate_embedding(image_base64: str) -> str:
+def _decode_image(image_bytes: bytes, max_side: int = FACE_MAX_IMAGE_SIDE) -> Tuple[np.ndarray, int]:
     """
-    Genera un embedding facial de una imagen y lo devuelve como un string JSON.
+    Decodifica la imagen en memoria a un arreglo BGR de NumPy, listo para
+    DeepFace. No toca el disco, así que peticiones concurrentes no se
+    pisan entre sí. Si es un JPEG mucho más grande que `max_side`, se usa
+    la decodificación reducida de libjpeg (1/2, 1/4 u 1/8), que es mucho
+    más barata que decodificar completo y reescalar.
+    Devuelve la imagen y los píxeles de la imagen original.
     """
-    temp_image_path = _decode_image(image_base64)
+    import cv2 # Importación diferida: los workers sin checador facial no cargan OpenCV.
+
+    flag = cv2.IMREAD_COLOR
+    dims = _jpeg_dimensions(image_bytes)
+    if max_side and dims:
+        lado = max(dims)
+        for factor, reduced_flag in ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2)):
+            if lado // factor >= max_side:
+                flag = reduced_flag
+                break
+
+    # cv2.imdecode trabaja directo sobre el buffer; devuelve None si no es una imagen válida.
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), flag)
+    if image is None:
+        raise ImagenInvalidaError("Los bytes recibidos no son una imagen válida.")
+    pixels = dims[0] * dims[1] if dims else image.shape[0] * image.shape[1]
+    return image, pixels
+
+def _downscale(image: np.ndarray, max_side: int = FACE_MAX_IMAGE_SIDE) -> np.ndarray:
+    """Reescala para que el lado mayor no pase de `max_side`."""
+    height, width = image.shape[:2]
+    lado = max(height, width)
+    if not max_side or lado <= max_side:
+        return image
+    import cv2
+
+    scale = max_side / lado
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+
+def _fake_extract_face(image: np.ndarray, target_size) -> np.ndarray:
+    """
+    Detector falso del backend 'fake': recorte cuadrado central, sin
+    DeepFace. Misma forma de salida que _extract_face.
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    lado = int(min(height, width) * 0.6)
+    y, x = (height - lado) // 2, (width - lado) // 2
+    face = cv2.resize(image[y:y + lado, x:x + lado], tuple(target_size), interpolation=cv2.INTER_AREA)
+    return (face[:, :, ::-1].astype(np.float32) / 255.0)[None, ...]
+
+def _extract_face(image: np.ndarray, target_size) -> np.ndarray:
+    """
+    Detecta y alinea el rostro y recorta solo esa región para el modelo:
+    (1, alto, ancho, 3) en BGR normalizado, igual que DeepFace.represent.
+    Lanza ValueError si no hay rostro.
+    """
+    if FACE_EMBEDDING_BACKEND == "fake":
+        return _fake_extract_face(image, target_size)
+
+    # Importación diferida: DeepFace arrastra a TensorFlow (varios segundos).
+    from deepface import DeepFace
+    from deepface.modules import preprocessing
+
+    face_objs = DeepFace.extract_faces(img_path=image, enforce_detection=True, align=True)
+    face = face_objs[0]["face"][:, :, ::-1]
+    face = preprocessing.resize_image(img=face, target_size=(target_size[1], target_size[0]))
+    return preprocessing.normalize_input(img=face, normalization="base")
+
+def embed_images_bytes(images_bytes: List[bytes]) -> list:
+    """
+    Calcula los embeddings de un lote de imágenes. Es el trabajo que
+    ejecutan los procesos de inferencia (face_worker_pool) para cada
+    micro-lote armado por face_batcher. Cada imagen pasa por
+    decodificación (reducida si aplica), reescalado, detección y recorte;
+    la pasada del modelo (backend configurado) es una sola para todo el lote.
+    Devuelve, en el mismo orden, una tupla (vector float32, tiempos por
+    etapa en ms, píxeles de entrada) por imagen, o la excepción que le
+    corresponde (ImagenInvalidaError, ValueError si no hay rostro).
+    """
+    model = face_model.get_model()
+    face_model.ensure_ready()
+
+    resultados: list = [None] * len(images_bytes)
+    caras, posiciones, tiempos, pixeles = [], [], [], []
+    for i, image_bytes in enumerate(images_bytes):
+        try:
+            t0 = time.perf_counter()
+            image, pixels = _decode_image(image_bytes)
+            t1 = time.perf_counter()
+            image = _downscale(image)
+            t2 = time.perf_counter()
+            caras.append(_extract_face(image, model.input_shape))
+            t3 = time.perf_counter()
+            posiciones.append(i)
+            pixeles.append(pixels)
+            tiempos.append({
+                "decode": (t1 - t0) * 1000,
+                "resize": (t2 - t1) * 1000,
+                "detect": (t3 - t2) * 1000
+            })
+        except (ImagenInvalidaError, ValueError) as e:
+            resultados[i] = e
+        except Exception as e:
+            # Se envía como RuntimeError para que siempre se pueda serializar entre procesos.
+            resultados[i] = RuntimeError(str(e))
+
+    if caras:
+        t0 = time.perf_counter()
+        embeddings = model.forward(np.concatenate(caras, axis=0))
+        # El tiempo del lote se reparte entre sus imágenes.
+        embed_ms = (time.perf_counter() - t0) * 1000 / len(caras)
+        for i, embedding, etapas, pixels in zip(posiciones, embeddings, tiempos, pixeles):
+            etapas["embed"] = embed_ms
+            resultados[i] = (embedding, etapas, pixels)
+    return resultados
+
+def precheck_image(image_bytes: bytes, origen: Optional[str] = None):
+    """
+    Filtro previo (face_gate) en este mismo proceso: decodifica la imagen
+    reducida y rechaza con 400 las capturas sin rostro, borrosas, oscuras
+    o repetidas (del mismo `origen`) antes de que lleguen a la cola de inferencia. Registra
+    los rechazos y el tiempo ahorrado en face_metrics.
+    """
+    if not FACE_GATE_ENABLED:
+        return
+    t0 = time.perf_counter()
+    image, _ = _decode_image(image_bytes, FACE_GATE_MAX_SIDE)
+    resultado = face_gate.evaluate(_downscale(image, FACE_GATE_MAX_SIDE), origen=origen)
+    gate_ms = (time.perf_counter() - t0) * 1000
+
+    face_metrics.incr("gate_checked")
+    face_metrics.incr("gate_ms_total", gate_ms)
+    motivo = resultado["reason"]
+    if motivo is None:
+        return
+
+    face_metrics.incr("gate_rejected")
+    face_metrics.incr(f"gate_rejected_{motivo}")
+    # Lo que habría costado la imagen en el pipeline completo, menos lo que costó el filtro.
+    face_metrics.incr("gate_saved_ms", max(0.0, face_metrics.avg_pipeline_ms() - gate_ms))
+    print(f"--- LOG (face_service): Filtro previo rechazó la imagen ({motivo}, {gate_ms:.1f} ms): {resultado}")
+    raise HTTPException(status_code=400, detail=face_gate.MOTIVOS[motivo])
+
+def generate_embedding_from_bytes(image_bytes: bytes, detalle_invalida: str = DETALLE_IMAGEN_INVALIDA,
+                                  origen: Optional[str] = None) -> np.ndarray:
+    """
+    Genera el embedding facial (vector float32, ver embedding_storage para
+    guardarlo) de los bytes crudos de la imagen: subidas multipart u
+    octet-stream, o lo que devuelve decode_base64_image.
+    Si la misma imagen ya se procesó hace poco (reintento del kiosco), se
+    devuelve el embedding de embedding_cache. Si no, pasa por el filtro
+    previo local (precheck_image) y entra al micro-lote en curso
+    (face_batcher), que se procesa en el pool de inferencia; si la cola
+    está llena responde 503 con Retry-After. Si los bytes no son una
+    imagen responde 400 con `detalle_invalida` (DETALLE_BASE64_INVALIDO
+    cuando la imagen llegó en Base64). `origen` (uid del kiosco o usuario
+    del token) separa el filtro de cuadros repetidos por dispositivo.
+    """
+    key = cache_key(image_bytes, face_model.model_name)
+    embedding = embedding_cache.get(key)
+    if embedding is not None:
+        print("--- LOG (face_service): Embedding tomado de la caché (imagen repetida).")
+        return embedding
+
     try:
-        print("--- LOG (face_service): Llamando a DeepFace.represent...")
-        embedding_objs = DeepFace.represent(img_path=temp_image_path, model_name='VGG-Face', enforce_detection=True)
-        embedding = embedding_objs[0]['embedding']
+        precheck_image(image_bytes, origen)
+        print("--- LOG (face_service): Enviando imagen al lote de inferencia...")
+        embedding, tiempos, pixels = face_batcher.embed(image_bytes)
+        face_metrics.record_stages(tiempos, pixels)
+        embedding_cache.put(key, embedding)
         print("--- LOG (face_service): Embedding generado por DeepFace exitosamente.")
-        return json.dumps(embedding)
+        return embedding
+    except (ColaLlenaError, BrokenProcessPool):
+        print("--- ERROR (face_service): Cola de inferencia llena, se rechaza la petición.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servicio de reconocimiento facial está saturado. Intenta de nuevo en unos segundos.",
+            headers={"Retry-After": str(face_batcher.retry_after)}
+        )
+    except HTTPException:
+        raise
+    except ImagenInvalidaError as e:
+        print(f"--- ERROR (face_service): {e}")
+        raise HTTPException(status_code=400, detail=detalle_invalida)
     except ValueError as e:
         print(f"--- ERROR (face_service): DeepFace no detectó un rostro. Error: {e}")
         raise HTTPException(status_code=400, detail=f"No se pudo procesar el rostro: {e}")
@@ -69,23 +271,38 @@ def generate_embedding(image_base64: str) -> str:
         print(f"--- ERROR (face_service): Error inesperado en DeepFace. Error: {e}")
         raise HTTPException(status_code=500, detail=f"Error interno en el procesamiento facial: {e}")
 
-# La función verify_faces_match no necesita logs adicionales por ahora,
-# ya que el error ocurre antes.
-def verify_faces_match(image_base64_check: str, stored_embedding_json: str) -> bool:
-    # ... (código sin cambios)
-    if not stored_embedding_json:
+def verify_faces_match(image_bytes_check: bytes, stored_embedding: Optional[np.ndarray],
+                       detalle_invalida: str = DETALLE_IMAGEN_INVALIDA, origen: Optional[str] = None) -> dict:
+    """
+    Compara el rostro de la imagen (bytes crudos; para Base64 usar
+    decode_base64_image primero) contra la plantilla guardada del
+    usuario (ya leída con embedding_storage.load_user_embedding).
+    Solo se calcula el embedding de la imagen nueva; la comparación es
+    una distancia de NumPy contra el umbral del modelo y la métrica.
+    Devuelve la decisión junto con la distancia para poder afinar umbrales.
+    """
+    if stored_embedding is None:
         raise HTTPException(status_code=400, detail="No hay una plantilla facial registrada para este usuario.")
-    embedding_check_json = generate_embedding(image_base64_check)
-    embedding_check = np.array(json.loads(embedding_check_json))
-    stored_embedding = np.array(json.loads(stored_embedding_json))
-    try:
-        resultado = DeepFace.verify(
-            img1_path=embedding_check, 
-            img2_path=stored_embedding, 
-            model_name='VGG-Face'
+    embedding_check = generate_embedding_from_bytes(image_bytes_check, detalle_invalida, origen)
+
+    if embedding_check.shape != stored_embedding.shape:
+        raise HTTPException(
+            status_code=409,
+            detail="La plantilla guardada no corresponde al modelo facial actual. Es necesario volver a enrolar."
         )
-        print(f"Resultado de la verificación facial: {resultado}")
-        return resultado['verified']
-    except Exception as e:
+
+    try:
+        umbral = face_distance.get_threshold(face_model.model_name, FACE_DISTANCE_METRIC)
+        distancia = float(face_distance.distance(embedding_check, stored_embedding, FACE_DISTANCE_METRIC))
+    except ValueError as e:
         raise HTTPException(status_code=500, detail=f"Error durante la comparación facial: {e}")
 
+    resultado = {
+        "verified": distancia <= umbral,
+        "distance": distancia,
+        "threshold": umbral,
+        "metric": FACE_DISTANCE_METRIC,
+        "model": face_model.model_name
+    }
+    print(f"Resultado de la verificación facial: {resultado}")
+    return resultado
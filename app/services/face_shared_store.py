@@ -0,0 +1,195 @@
+# ===============================================================
+# ARCHIVO: app/services/face_shared_store.py
+# PROPÓSITO: Matriz de embeddings faciales en disco, versionada, que
+#            todos los workers de uvicorn abren con np.memmap de solo
+#            lectura: una sola copia en el page cache por servidor y
+#            arranque en milisegundos (sin consultar ni parsear SQLite).
+#
+#            Cada versión son dos archivos .npy (vectores normalizados
+#            float32 e id_usuario). `current.json` apunta a la versión
+#            vigente y se reemplaza de forma atómica (os.replace); los
+#            workers detectan el cambio con un stat barato y cambian de
+#            memmap. Las escrituras se serializan con un candado de archivo.
+# ===============================================================
+import contextlib
+import glob
+import json
+import os
+import re
+import tempfile
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError: # Windows: sin candado entre procesos
+    fcntl = None
+
+_PUNTERO = "current.json"
+_CANDADO = ".lock"
+# Versiones que se conservan en disco para los workers que aún no cambian.
+_VERSIONES_CONSERVADAS = 3
+# Altas recientes anotadas en el puntero como (versión, id_usuario), para que
+# quien lleva otra copia (el índice IVF) se ponga al día sin releer todo.
+_CAMBIOS_ANOTADOS = 64
+
+# Devuelve (ids, vectores normalizados) de la galería completa desde la base de datos.
+BaseLoader = Callable[[], Tuple[np.ndarray, np.ndarray]]
+
+
+class SharedEmbeddingStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._stat_key = None
+        self._meta: Optional[dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextlib.contextmanager
+    def _write_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(_CANDADO), "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def current(self) -> Optional[dict]:
+        """
+        Metadatos de la versión vigente ({version, model, count, dim}) o
+        None si aún no hay. Solo relee el puntero si cambió en disco.
+        """
+        try:
+            st = os.stat(self._path(_PUNTERO))
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._stat_key:
+            with open(self._path(_PUNTERO), "r") as f:
+                self._meta = json.load(f)
+            self._stat_key = key
+        return self._meta
+
+    def open(self, meta: dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Abre (memmap, solo lectura) los ids y vectores de una versión."""
+        v = meta["version"]
+        ids = np.load(self._path(f"ids-v{v}.npy"), mmap_mode="r")
+        vectors = np.load(self._path(f"vectors-v{v}.npy"), mmap_mode="r")
+        return ids, vectors
+
+    def publish(self, ids: np.ndarray, vectors: Optional[np.ndarray], model_name: str) -> dict:
+        """
+        Escribe una versión nueva completa y la hace vigente. Una galería
+        vacía (vectors None) también se publica, para no volver a consultar
+        la base de datos en cada búsqueda.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if vectors is None:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        with self._write_lock():
+            return self._publish(ids, np.asarray(vectors, dtype=np.float32), model_name)
+
+    def upsert(self, id_usuario: int, vector: np.ndarray, model_name: str, load_base: BaseLoader) -> dict:
+        """
+        Nueva versión = vigente + (o con reemplazo de) la plantilla de este
+        usuario. El vector debe venir normalizado. Si aún no hay versión del
+        modelo (primer enrolamiento antes de cualquier búsqueda), la base es
+        la galería completa de `load_base`, no solo este usuario.
+        """
+        vector = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        with self._write_lock():
+            meta = self.current()
+            if meta is None or meta["model"] != model_name:
+                ids, vectors = load_base()
+            elif meta["count"]:
+                ids, vectors = self.open(meta)
+            else:
+                ids, vectors = None, None
+            cambios = None
+            if meta is not None and meta["model"] == model_name:
+                cambios = (meta.get("cambios", []) + [[meta["version"] + 1, int(id_usuario)]])[-_CAMBIOS_ANOTADOS:]
+            return self._publish(*_upsert_rows(ids, vectors, id_usuario, vector), model_name, cambios)
+
+    @staticmethod
+    def changes_since(meta: dict, version: int) -> Optional[List[int]]:
+        """
+        id_usuario agregados o reemplazados después de `version` y hasta la
+        versión de `meta`. None si no se puede saber: hubo una publicación
+        completa de por medio o esos cambios ya no están anotados.
+        """
+        por_version = {v: [] for v in range(version + 1, meta["version"] + 1)}
+        for v, id_usuario in meta.get("cambios", []):
+            if v in por_version:
+                por_version[v].append(id_usuario)
+        if any(not ids for ids in por_version.values()):
+            return None
+        return [id_usuario for ids in por_version.values() for id_usuario in ids]
+
+    def _publish(self, ids: np.ndarray, vectors: np.ndarray, model_name: str, cambios: Optional[list] = None) -> dict:
+        previous = self.current()
+        version = previous["version"] + 1 if previous else 1
+        self._write_npy(f"ids-v{version}.npy", ids)
+        self._write_npy(f"vectors-v{version}.npy", np.ascontiguousarray(vectors))
+
+        meta = {"version": version, "model": model_name, "count": int(len(ids)), "dim": int(vectors.shape[1]),
+                "firma": gallery_signature(ids), "cambios": cambios or []}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._path(_PUNTERO))
+
+        self._cleanup(version)
+        print(f"--- LOG (face_store): Versión {version} publicada con {meta['count']} plantillas. ---")
+        return self.current()
+
+    def _write_npy(self, name: str, array: np.ndarray):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, array)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(name))
+
+    def _cleanup(self, version: int):
+        """Borra las versiones viejas; en Linux los memmaps abiertos siguen siendo válidos."""
+        for path in glob.glob(self._path("*-v*.npy")):
+            match = re.search(r"-v(\d+)\.npy$", path)
+            if match and int(match.group(1)) <= version - _VERSIONES_CONSERVADAS:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass # Windows: aún abierto por otro worker
+
+
+def gallery_signature(ids) -> List[int]:
+    """
+    [cuántos, suma, máximo] de los id_usuario de la galería. Los id no se
+    reutilizan, así que una baja más un alta (mismo número de plantillas)
+    también la cambian.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ids):
+        return [0, 0, 0]
+    return [int(len(ids)), int(ids.sum()), int(ids.max())]
+
+
+def _upsert_rows(ids: Optional[np.ndarray], vectors: Optional[np.ndarray], id_usuario: int, vector: np.ndarray):
+    """Copia de (ids, vectores) con la plantilla de este usuario agregada o reemplazada."""
+    if ids is None or len(ids) == 0:
+        return np.array([id_usuario], dtype=np.int64), vector
+    new_ids = np.array(ids, dtype=np.int64)
+    new_vectors = np.array(vectors, dtype=np.float32)
+    existing = np.flatnonzero(new_ids == id_usuario)
+    if existing.size:
+        new_vectors[existing[0]] = vector[0]
+        return new_ids, new_vectors
+    return np.append(new_ids, np.int64(id_usuario)), np.vstack([new_vectors, vector])
@@ -0,0 +1,155 @@
+# ===============================================================
+# ARCHIVO: app/services/face_worker_pool.py
+# PROPÓSITO: Pool de procesos dedicados a la inferencia facial. Cada
+#            proceso carga el modelo una vez; la API solo encola trabajo
+#            en una cola acotada y responde 503 cuando está llena, de
+#            modo que una ráfaga de checadas no deja sin hilos al resto
+#            de las rutas (huella, reportes, etc.).
+# ===============================================================
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.core.config import FACE_WORKERS, FACE_QUEUE_DEPTH, FACE_RETRY_AFTER_SECONDS
+
+
+class ColaLlenaError(Exception):
+    """La cola de inferencia está llena; el cliente debe reintentar."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def _init_worker():
+    """Se ejecuta una vez en cada proceso: construye y calienta el modelo."""
+    from app.services.face_model_service import face_model
+    face_model.warmup()
+
+
+def _worker_ready() -> bool:
+    from app.services.face_model_service import face_model
+    return face_model.ready
+
+
+class FaceWorkerPool:
+    """
+    Envoltura de ProcessPoolExecutor con admisión acotada: como máximo
+    `workers + queue_depth` trabajos en vuelo; el resto se rechaza de inmediato.
+    """
+
+    def __init__(self, workers: int, queue_depth: int, retry_after: int):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_depth)
+        self._in_flight = 0
+        self._rejected = 0
+        self._warmups = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self):
+        """Levanta los procesos y les pide que carguen el modelo."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        if self._executor is None:
+            print(f"--- LOG (face_pool): Iniciando {self.workers} procesos de inferencia. ---")
+            # 'spawn' evita heredar por fork el estado de TensorFlow del proceso padre.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+            self._warmups = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                self._warmups = []
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def submit(self, fn: Callable, *args, block: bool = False) -> Future:
+        """
+        Encola `fn(*args)` en un proceso de inferencia y devuelve el Future.
+        Sin lugar en la cola lanza ColaLlenaError, salvo con block=True,
+        que espera turno. Si el pool está deshabilitado se ejecuta aquí mismo.
+        """
+        if not self.enabled:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._rejected += 1
+            raise ColaLlenaError(self.retry_after)
+
+        try:
+            # Arrancar y encolar con el candado: shutdown() (p. ej. desde
+            # _check_broken) no puede dejar el executor en None a la mitad.
+            with self._lock:
+                self._in_flight += 1
+                self._start_locked()
+                future = self._executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # Se rompió antes de que su callback lo reiniciara: se recrea en la siguiente petición.
+            self._release()
+            self.shutdown()
+            raise ColaLlenaError(self.retry_after)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        future.add_done_callback(self._check_broken)
+        return future
+
+    def _check_broken(self, future: Future):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Un proceso murió (p. ej. sin memoria): se recrea el pool en la siguiente petición.
+            print("--- ERROR (face_pool): El pool de inferencia se rompió; se reiniciará. ---")
+            self.shutdown()
+
+    def _state(self) -> str:
+        """'not_started' (aún no se levanta el pool), 'loading', 'ready' o 'failed'."""
+        if not self._warmups:
+            return "not_started"
+        terminados = [f for f in self._warmups if f.done()]
+        if any(f.cancelled() or f.exception() or not f.result() for f in terminados):
+            return "failed"
+        return "ready" if len(terminados) == len(self._warmups) else "loading"
+
+    def status(self) -> dict:
+        with self._lock:
+            state = self._state()
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self._in_flight,
+                "rejected": self._rejected,
+                "ready": state == "ready",
+                "state": state
+            }
+
+
+# Pool único por proceso de la API.
+face_pool = FaceWorkerPool(FACE_WORKERS, FACE_QUEUE_DEPTH, FACE_RETRY_AFTER_SECONDS)
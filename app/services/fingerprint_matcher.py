@@ -0,0 +1,428 @@
+# ===============================================================
+# ARCHIVO: app/services/fingerprint_matcher.py
+# PROPÓSITO: Motor de comparación de huellas por minucias, en NumPy.
+#            - Lee la plantilla (registro ISO/IEC 19794-2 o ANSI 378 en
+#              Base64, o XML con elementos <Minutia x y angle type>) a un
+#              arreglo (n, 4): x, y, ángulo (rad), tipo.
+#            - Alinea por votación (Hough) de rotación + traslación, ajusta
+#              por mínimos cuadrados y empareja minucias 1 a 1, todo
+#              vectorizado y para varios candidatos a la vez.
+#            - Para 1:N, un prefiltro con llaves de pares de minucias
+#              (invariantes a rotación y traslación) descarta la mayoría
+#              de la galería antes del cálculo completo.
+#            El índice en memoria guarda todas las minucias en un solo
+#              arreglo float32 contiguo con desplazamientos por usuario.
+# ===============================================================
+import base64
+import re
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.core.config import (
+    FINGERPRINT_MATCH_THRESHOLD, FINGERPRINT_MIN_PAIRS, FINGERPRINT_PREFILTER_TOP,
+    FINGERPRINT_DISTANCE_TOLERANCE, FINGERPRINT_ANGLE_TOLERANCE
+)
+from app.models import tablas as models
+from app.services.fingerprint_storage import decode_template
+
+# Columnas del arreglo de minucias.
+X, Y, THETA, TIPO = 0, 1, 2, 3
+TIPO_OTRO, TIPO_TERMINACION, TIPO_BIFURCACION = 0, 1, 2
+
+# Votación de la alineación (Hough generalizada): cada par de minucias vota
+# por los bins de rotación cercanos a su diferencia de ángulos (10° cada
+# uno) y por la traslación que implica esa rotación. Con ambas huellas
+# centradas la traslación real es chica: ±_MAX_T px en bins de _PASO_T px.
+_BINS_THETA = 36
+_PASO_T = 24
+_MAX_T = 168
+_BINS_T = 2 * _MAX_T // _PASO_T
+# Candidatos por bloque al puntuar (acota la memoria de la votación).
+_BLOQUE = 64
+
+# Prefiltro 1:N: cada par de minucias cercanas da una llave invariante a
+# rotación y traslación (distancia + ángulo de cada minucia respecto a la
+# recta que las une). La misma huella comparte muchas llaves; otra, pocas.
+_MAX_PAR = 120.0
+_PASO_PAR = 6.0
+_BINS_ALFA = 24
+_N_LLAVES = int(_MAX_PAR // _PASO_PAR) * _BINS_ALFA * _BINS_ALFA
+
+
+# --- Lectura de plantillas ---
+
+_MINUCIA_XML = re.compile(r"<\s*(?:\w+:)?minuti\w*\b([^>]*)>", re.IGNORECASE)
+_ATRIBUTO = re.compile(r"([\w:-]+)\s*=\s*[\"']([^\"']*)[\"']")
+_NOMBRES = {
+    X: ("x", "posx", "xcoord"),
+    Y: ("y", "posy", "ycoord"),
+    THETA: ("angle", "direction", "theta", "orientation", "a"),
+    TIPO: ("type", "kind", "t"),
+}
+
+
+def _parse_xml(texto: str) -> Optional[np.ndarray]:
+    filas = []
+    for match in _MINUCIA_XML.finditer(texto):
+        attrs = {k.lower().split(":")[-1]: v for k, v in _ATRIBUTO.findall(match.group(1))}
+        valores = {}
+        for col, nombres in _NOMBRES.items():
+            valores[col] = next((attrs[n] for n in nombres if n in attrs), None)
+        if valores[X] is None or valores[Y] is None or valores[THETA] is None:
+            continue
+        tipo = (valores[TIPO] or "").lower()
+        if tipo in ("2", "bifurcation", "bifurcacion", "bifurcación"):
+            tipo = TIPO_BIFURCACION
+        elif tipo in ("1", "ending", "ridge_ending", "end", "terminacion", "terminación"):
+            tipo = TIPO_TERMINACION
+        else:
+            tipo = TIPO_OTRO
+        try:
+            filas.append((float(valores[X]), float(valores[Y]), float(valores[THETA]), tipo))
+        except ValueError:
+            continue # Atributo no numérico: minucia ilegible
+    if not filas:
+        return None
+    minucias = np.asarray(filas, dtype=np.float32)
+    # Grados salvo que todos quepan en [0, 2π] (plantillas en radianes).
+    if minucias[:, THETA].max() > 2 * np.pi + 1e-3:
+        minucias[:, THETA] = np.deg2rad(minucias[:, THETA])
+    minucias[:, THETA] %= 2 * np.pi
+    return minucias
+
+
+def _parse_fmr(data: bytes) -> Optional[np.ndarray]:
+    """Registro binario ISO/IEC 19794-2:2005 o ANSI INCITS 378-2004 (primera vista)."""
+    if len(data) < 30 or data[:4] != b"FMR\x00":
+        return None
+    if int.from_bytes(data[8:12], "big") == len(data):
+        inicio, unidad_angulo = 24, 360.0 / 256 # ISO: 1.40625° por unidad
+    elif int.from_bytes(data[8:10], "big") == len(data):
+        inicio, unidad_angulo = 26, 2.0 # ANSI: 2° por unidad
+    else:
+        return None
+    n = data[inicio + 3]
+    datos = data[inicio + 4:inicio + 4 + 6 * n]
+    if n == 0 or len(datos) < 6 * n:
+        return None
+
+    raw = np.frombuffer(datos, dtype=np.uint8).reshape(n, 6).astype(np.int32)
+    minucias = np.empty((n, 4), dtype=np.float32)
+    minucias[:, X] = ((raw[:, 0] & 0x3F) << 8) | raw[:, 1]
+    minucias[:, Y] = ((raw[:, 2] & 0x3F) << 8) | raw[:, 3]
+    minucias[:, THETA] = np.deg2rad(raw[:, 4] * unidad_angulo) % (2 * np.pi)
+    # Tipo en los 2 bits altos: 01 terminación, 10 bifurcación.
+    minucias[:, TIPO] = raw[:, 0] >> 6
+    return minucias
+
+
+def parse_template(template) -> Optional[np.ndarray]:
+    """
+    Minucias (n, 4) float32 de una plantilla (str o bytes), o None si el
+    formato no se reconoce (en ese caso se usa la comparación exacta).
+    """
+    if isinstance(template, bytes):
+        if template.startswith(b"FMR\x00"):
+            return _parse_fmr(template)
+        template = template.decode("utf-8", errors="ignore")
+    texto = template.strip()
+    if "<" in texto:
+        return _parse_xml(texto)
+    try:
+        return _parse_fmr(base64.b64decode(texto, validate=False))
+    except (ValueError, TypeError):
+        return None
+
+
+# --- Llaves de pares (prefiltro) ---
+
+def _wrap(angulos: np.ndarray) -> np.ndarray:
+    """Lleva a [-π, π) una diferencia de ángulos en (-3π, 3π) (más barato que el módulo)."""
+    angulos = np.where(angulos >= np.pi, angulos - np.float32(2 * np.pi), angulos)
+    return np.where(angulos < -np.pi, angulos + np.float32(2 * np.pi), angulos)
+
+
+def pair_keys(minucias: np.ndarray) -> np.ndarray:
+    """Llaves (uint16, sin repetir) de todos los pares de minucias a menos de _MAX_PAR px."""
+    i, j = np.nonzero(~np.eye(minucias.shape[0], dtype=bool))
+    dx, dy = minucias[j, X] - minucias[i, X], minucias[j, Y] - minucias[i, Y]
+    distancia = np.hypot(dx, dy)
+    cerca = distancia < _MAX_PAR
+    i, j, distancia = i[cerca], j[cerca], distancia[cerca]
+    recta = np.arctan2(dy[cerca], dx[cerca])
+    escala = _BINS_ALFA / (2 * np.pi)
+    alfa_i = ((_wrap(minucias[i, THETA] - recta) + np.pi) * escala).astype(np.int64) % _BINS_ALFA
+    alfa_j = ((_wrap(minucias[j, THETA] - recta) + np.pi) * escala).astype(np.int64) % _BINS_ALFA
+    llaves = ((distancia // _PASO_PAR).astype(np.int64) * _BINS_ALFA + alfa_i) * _BINS_ALFA + alfa_j
+    return np.unique(llaves).astype(np.uint16)
+
+
+# --- Comparación vectorizada ---
+
+def score_candidates(probe: np.ndarray, galeria: np.ndarray, mascara: np.ndarray,
+                     tol_dist: float = FINGERPRINT_DISTANCE_TOLERANCE,
+                     tol_ang: float = np.deg2rad(FINGERPRINT_ANGLE_TOLERANCE)) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compara una huella (n, 4) contra K candidatos a la vez.
+    `galeria` es (K, M, 4) con relleno y `mascara` (K, M) marca las minucias reales.
+    Devuelve (puntajes (K,), pares emparejados (K,)). Puntaje = pares² / (n·m).
+    """
+    K, M, _ = galeria.shape
+    n = probe.shape[0]
+    filas = np.arange(K)
+    # Ambas huellas se centran en su centroide: la traslación queda acotada
+    # y un error pequeño de rotación apenas la mueve.
+    px, py = probe[:, X] - probe[:, X].mean(), probe[:, Y] - probe[:, Y].mean()
+    m = np.maximum(mascara.sum(axis=1), 1)
+    cx = (galeria[:, :, X] * mascara).sum(axis=1, keepdims=True) / m[:, None].astype(np.float32)
+    cy = (galeria[:, :, Y] * mascara).sum(axis=1, keepdims=True) / m[:, None].astype(np.float32)
+    gcx, gcy = galeria[:, :, X] - cx, galeria[:, :, Y] - cy # (K, M)
+    gx, gy, gt = gcx[:, None, :], gcy[:, None, :], galeria[:, None, :, THETA]
+    dtheta = _wrap(gt - probe[None, :, None, THETA]) # (K, n, M)
+    validos = np.broadcast_to(mascara[:, None, :], dtheta.shape)
+
+    # 1. Votación conjunta (rotación, tx, ty). Cada par vota por su bin de
+    #    rotación y los dos vecinos, con la rotación del centro del bin.
+    paso = 2 * np.pi / _BINS_THETA
+    base = ((dtheta + np.pi) * (1 / paso)).astype(np.int32)
+    # La captura ya girada por cada uno de los _BINS_THETA ángulos: (bins, n).
+    angulos = (np.arange(_BINS_THETA) + 0.5) * paso - np.pi
+    rx = (np.cos(angulos)[:, None] * px[None, :] - np.sin(angulos)[:, None] * py[None, :]).astype(np.float32).ravel()
+    ry = (np.sin(angulos)[:, None] * px[None, :] + np.cos(angulos)[:, None] * py[None, :]).astype(np.float32).ravel()
+    i = np.arange(n)[None, :, None]
+    celdas = _BINS_THETA * _BINS_T * _BINS_T
+    claves = []
+    for desplazamiento in (-1, 0, 1):
+        bt = (base + desplazamiento) % _BINS_THETA
+        fila = bt * n + i
+        # Truncar con un desplazamiento positivo equivale a floor y es más barato.
+        bx = ((gx - rx.take(fila)) * (1 / _PASO_T) + (_BINS_T // 2 + 64)).astype(np.int32) - 64
+        by = ((gy - ry.take(fila)) * (1 / _PASO_T) + (_BINS_T // 2 + 64)).astype(np.int32) - 64
+        ok = validos & (bx >= 0) & (bx < _BINS_T) & (by >= 0) & (by < _BINS_T)
+        claves.append((filas[:, None, None] * celdas + (bt * _BINS_T + bx) * _BINS_T + by)[ok])
+    votos = np.bincount(np.concatenate(claves), minlength=K * celdas).reshape(K, _BINS_THETA, _BINS_T, _BINS_T)
+    # Suma 2x2 en traslación: un grupo de pares partido entre bins vecinos cuenta completo.
+    votos[:, :, :-1, :] += votos[:, :, 1:, :]
+    votos[:, :, :, :-1] += votos[:, :, :, 1:]
+    mejor = votos.reshape(K, -1).argmax(axis=1)
+    rot = (mejor // (_BINS_T * _BINS_T) + 0.5) * paso - np.pi
+    tx = ((mejor // _BINS_T) % _BINS_T + 1) * _PASO_T - _MAX_T
+    ty = (mejor % _BINS_T + 1) * _PASO_T - _MAX_T
+
+    def emparejar(rot, tx, ty, tol_d, tol_a):
+        """Vecinos mutuos dentro de tolerancia: (emparejada (K, n), índice en la galería (K, n))."""
+        c, s = np.cos(rot)[:, None], np.sin(rot)[:, None]
+        qx = (c * px[None, :] - s * py[None, :] + tx[:, None]).astype(np.float32)
+        qy = (s * px[None, :] + c * py[None, :] + ty[:, None]).astype(np.float32)
+        dist = np.square(qx[:, :, None] - gx) + np.square(qy[:, :, None] - gy)
+        ang = np.abs(_wrap(dtheta - rot.astype(np.float32)[:, None, None]))
+        dist = np.where(validos & (dist <= tol_d ** 2) & (ang <= tol_a), dist, np.inf)
+        mejor_j = dist.argmin(axis=2)
+        mejor_i = dist.argmin(axis=1)
+        mutuo = np.take_along_axis(mejor_i, mejor_j, axis=1) == np.arange(n)[None, :]
+        finito = np.isfinite(np.take_along_axis(dist, mejor_j[:, :, None], axis=2)[:, :, 0])
+        return mutuo & finito, mejor_j
+
+    # 2. Ajuste fino: con los pares de una primera alineación holgada se
+    #    calcula la transformación rígida de mínimos cuadrados (Procrustes).
+    pares0, j0 = emparejar(rot, tx, ty, 2 * tol_dist, tol_ang + paso / 2)
+    w = pares0.astype(np.float64)
+    cuenta = np.maximum(w.sum(axis=1), 1)[:, None]
+    bx_, by_ = np.take_along_axis(gcx, j0, axis=1), np.take_along_axis(gcy, j0, axis=1)
+    ax_m, ay_m = (w * px[None, :]).sum(axis=1, keepdims=True) / cuenta, (w * py[None, :]).sum(axis=1, keepdims=True) / cuenta
+    bx_m, by_m = (w * bx_).sum(axis=1, keepdims=True) / cuenta, (w * by_).sum(axis=1, keepdims=True) / cuenta
+    ax_c, ay_c, bx_c, by_c = px[None, :] - ax_m, py[None, :] - ay_m, bx_ - bx_m, by_ - by_m
+    fino = np.arctan2((w * (ax_c * by_c - ay_c * bx_c)).sum(axis=1), (w * (ax_c * bx_c + ay_c * by_c)).sum(axis=1))
+    ajustable = pares0.sum(axis=1) >= 3
+    rot = np.where(ajustable, fino, rot)
+    c, s = np.cos(rot)[:, None], np.sin(rot)[:, None]
+    tx = np.where(ajustable, (bx_m - (c * ax_m - s * ay_m))[:, 0], tx)
+    ty = np.where(ajustable, (by_m - (s * ax_m + c * ay_m))[:, 0], ty)
+
+    # 3. Emparejamiento final con las tolerancias configuradas.
+    pares = emparejar(rot, tx, ty, tol_dist, tol_ang)[0].sum(axis=1)
+
+    return (pares ** 2) / (n * m), pares
+
+
+def is_match(puntaje: float, pares: int) -> bool:
+    return puntaje >= FINGERPRINT_MATCH_THRESHOLD and pares >= FINGERPRINT_MIN_PAIRS
+
+
+def match_templates(a: np.ndarray, b: np.ndarray) -> Tuple[float, int]:
+    """Comparación 1:1 de dos huellas ya leídas."""
+    puntajes, pares = score_candidates(a, b[None, ...], np.ones((1, b.shape[0]), dtype=bool))
+    return float(puntajes[0]), int(pares[0])
+
+
+# --- Índice 1:N ---
+
+def _layout(cuentas: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(desplazamientos, cuentas) de segmentos contiguos en un arreglo concatenado."""
+    cuentas = np.asarray(cuentas, dtype=np.int64)
+    return np.cumsum(cuentas) - cuentas, cuentas
+
+
+class FingerprintIndex:
+    """
+    Minucias de toda la galería en un solo arreglo (total, 4) float32 y
+    llaves de pares en otro (uint16), cada uno con desplazamiento y
+    cuenta por usuario. Las plantillas se leen una sola vez, al cargar o
+    al enrolar.
+    """
+
+    def __init__(self, prefilter_top: int = FINGERPRINT_PREFILTER_TOP):
+        self._lock = threading.Lock()
+        self.prefilter_top = prefilter_top
+        self._minucias = np.empty((0, 4), dtype=np.float32)
+        self._offsets = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        self._llaves = np.empty(0, dtype=np.uint16)
+        self._llaves_offsets = np.empty(0, dtype=np.int64)
+        self._llaves_counts = np.empty(0, dtype=np.int64)
+        # Índice invertido llave -> posiciones de usuario; se rearma tras enrolar.
+        self._invertido: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._max_id = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return self._ids.shape[0]
+
+    def build(self, ids: List[int], plantillas: List[np.ndarray]):
+        """Reemplaza el índice con estas huellas ya leídas."""
+        llaves = [pair_keys(p) for p in plantillas]
+        with self._lock:
+            self._minucias = np.concatenate(plantillas) if plantillas else np.empty((0, 4), dtype=np.float32)
+            self._offsets, self._counts = _layout([p.shape[0] for p in plantillas])
+            self._llaves = np.concatenate(llaves) if llaves else np.empty(0, dtype=np.uint16)
+            self._llaves_offsets, self._llaves_counts = _layout([len(k) for k in llaves])
+            self._invertido = None
+            self._ids = np.asarray(ids, dtype=np.int64)
+            self._max_id = int(self._ids.max()) if len(ids) else 0
+            self.loaded = True
+
+    def add(self, id_usuario: int, minucias: np.ndarray):
+        """Agrega una huella enrolada (o reemplaza la del usuario) sin recargar todo."""
+        with self._lock:
+            existente = np.flatnonzero(self._ids == id_usuario)
+            if existente.size:
+                # Reemplazo: la fila vieja se marca con id -1; sus minucias y llaves quedan huérfanas.
+                self._ids[existente] = -1
+            self._offsets = np.append(self._offsets, self._minucias.shape[0])
+            self._counts = np.append(self._counts, minucias.shape[0])
+            self._minucias = np.concatenate([self._minucias, minucias.astype(np.float32)])
+            llaves = pair_keys(minucias)
+            self._llaves_offsets = np.append(self._llaves_offsets, self._llaves.shape[0])
+            self._llaves_counts = np.append(self._llaves_counts, len(llaves))
+            self._llaves = np.concatenate([self._llaves, llaves])
+            self._invertido = None
+            self._ids = np.append(self._ids, np.int64(id_usuario))
+            self._max_id = max(self._max_id, id_usuario)
+
+    def load(self, db: Session, desde_id: int = 0):
+        """Lee y parsea las plantillas de huella (todas, o solo las de id > desde_id)."""
+        rows = db.query(models.Usuario.id_usuario, models.Usuario.plantilla_huella).filter(
+            models.Usuario.plantilla_huella.isnot(None),
+            models.Usuario.id_usuario > desde_id
+        ).order_by(models.Usuario.id_usuario).all()
+
+        ids, plantillas = [], []
+        for r in rows:
+            minucias = parse_template(decode_template(r.plantilla_huella))
+            if minucias is not None and minucias.shape[0] > 0:
+                ids.append(r.id_usuario)
+                plantillas.append(minucias)
+
+        if desde_id:
+            for id_usuario, minucias in zip(ids, plantillas):
+                self.add(id_usuario, minucias)
+            with self._lock:
+                self._max_id = max(self._max_id, max((r.id_usuario for r in rows), default=desde_id))
+        else:
+            self.build(ids, plantillas)
+            self._max_id = max(self._max_id, max((r.id_usuario for r in rows), default=0))
+            print(f"--- LOG (fingerprint_matcher): Índice de huellas cargado con {len(ids)} plantillas. ---")
+
+    def ensure_loaded(self, db: Session):
+        """Carga el índice la primera vez; después solo agrega lo enrolado por otros workers."""
+        if not self.loaded:
+            self.load(db)
+            return
+        ultimo = db.query(models.Usuario.id_usuario).filter(
+            models.Usuario.plantilla_huella.isnot(None)
+        ).order_by(models.Usuario.id_usuario.desc()).limit(1).scalar()
+        if ultimo and ultimo > self._max_id:
+            self.load(db, desde_id=self._max_id)
+
+    def _indice_invertido(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(posiciones de usuario ordenadas por llave, límites por llave)."""
+        if self._invertido is None:
+            orden = np.argsort(self._llaves, kind="stable") # radix sort para uint16
+            posiciones = np.repeat(np.arange(len(self._ids), dtype=np.int32), self._llaves_counts)[orden]
+            limites = np.concatenate([[0], np.cumsum(np.bincount(self._llaves, minlength=_N_LLAVES))])
+            self._invertido = (posiciones, limites)
+        return self._invertido
+
+    def _candidatos(self, probe: np.ndarray, top: int) -> np.ndarray:
+        """
+        Posiciones de los `top` usuarios que comparten más llaves de pares
+        con la huella capturada (normalizado por cuántas llaves tiene cada uno).
+        """
+        validos = self._ids >= 0
+        if np.count_nonzero(validos) <= top:
+            return np.flatnonzero(validos)
+        posiciones, limites = self._indice_invertido()
+        llaves = pair_keys(probe)
+        inicio, largo = limites[llaves], limites[llaves + 1] - limites[llaves]
+        # Concatena las listas de cada llave sin bucle de Python.
+        salto = np.repeat(inicio - (np.cumsum(largo) - largo), largo)
+        votos = np.bincount(posiciones[salto + np.arange(largo.sum())], minlength=len(self._ids))
+        votos = votos / np.sqrt(np.maximum(self._llaves_counts, 1))
+        votos[~validos] = -1
+        return np.argpartition(-votos, top - 1)[:top]
+
+    def _padded(self, posiciones: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        counts = self._counts[posiciones]
+        M = int(counts.max())
+        columnas = np.arange(M)[None, :]
+        mascara = columnas < counts[:, None]
+        indices = np.where(mascara, self._offsets[posiciones][:, None] + columnas, 0)
+        return self._minucias[indices], mascara
+
+    def search(self, probe: np.ndarray, k: int = 1, prefilter: bool = True) -> List[Tuple[int, float, int]]:
+        """
+        Los k mejores (id_usuario, puntaje, pares), de mayor a menor
+        puntaje. Con `prefilter` solo se puntúan los candidatos del
+        prefiltro global.
+        """
+        with self._lock:
+            if not len(self):
+                return []
+            posiciones = self._candidatos(probe, self.prefilter_top) if prefilter else np.flatnonzero(self._ids >= 0)
+            ids = self._ids[posiciones]
+            galeria, mascara = self._padded(posiciones)
+
+        puntajes = np.empty(len(posiciones))
+        pares = np.empty(len(posiciones), dtype=np.int64)
+        for inicio in range(0, len(posiciones), _BLOQUE):
+            fin = inicio + _BLOQUE
+            puntajes[inicio:fin], pares[inicio:fin] = score_candidates(probe, galeria[inicio:fin], mascara[inicio:fin])
+        orden = np.argsort(-puntajes)[:k]
+        return [(int(ids[i]), float(puntajes[i]), int(pares[i])) for i in orden]
+
+    def stats(self) -> dict:
+        return {
+            "size": int(np.count_nonzero(self._ids >= 0)),
+            "minutiae": int(self._minucias.shape[0]),
+            "pair_keys": int(self._llaves.shape[0]),
+            "memory_bytes": int(self._minucias.nbytes + self._llaves.nbytes + self._ids.nbytes * 5),
+            "prefilter_top": self.prefilter_top
+        }
+
+
+# Índice compartido por las peticiones del proceso.
+fingerprint_index = FingerprintIndex()
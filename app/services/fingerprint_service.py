@@ -1,9 +1,139 @@
 # ===============================================================
 # ARCHIVO: app/services/fingerprint_service.py
 # PROPÓSITO: Contiene la lógica para verificar si una huella
-#            capturada coincide con una almacenada.
+#            capturada coincide con una almacenada, y para identificar
+#            al empleado por el digest (hash) de su plantilla o, si el
+#            lector generó una plantilla distinta, por sus minucias.
 # ===============================================================
+import hashlib
+
 from fastapi import HTTPException, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models import tablas as models
+from .fingerprint_matcher import fingerprint_index, is_match, match_templates, parse_template
+from .fingerprint_storage import decode_template, encode_template
+
+# Renglón de ContadoresVersion con la versión de la galería de huellas.
+CONTADOR_HUELLAS = "huellas"
+
+def normalize_template(template: str) -> str:
+    """
+    Forma canónica de la plantilla para calcular su digest: sin espacios
+    al inicio/final y con saltos de línea Unix (los lectores y clientes
+    varían en eso, no en el contenido).
+    """
+    return template.replace("\r\n", "\n").strip()
+
+def template_digest(template: str) -> str:
+    """SHA-256 (hex) de la plantilla normalizada; se guarda en Usuario.huella_digest."""
+    return hashlib.sha256(normalize_template(template).encode("utf-8")).hexdigest()
+
+def reserve_template_versions(db: Session, cantidad: int = 1) -> int:
+    """
+    Reserva `cantidad` versiones consecutivas de la galería y devuelve la
+    primera. El UPDATE del contador deja su fila bloqueada hasta el commit:
+    dos enrolamientos simultáneos no comparten versión y se confirman en el
+    orden en que la tomaron, así que una terminal nunca deja atrás una
+    versión que todavía no se confirma.
+    """
+    contador = models.ContadorVersion.__table__
+    conn = db.connection()
+    incrementar = update(contador).where(contador.c.nombre == CONTADOR_HUELLAS).values(
+        valor=contador.c.valor + cantidad
+    )
+    if not conn.execute(incrementar).rowcount:
+        _crear_contador(conn)
+        conn.execute(incrementar)
+    valor = conn.execute(select(contador.c.valor).where(contador.c.nombre == CONTADOR_HUELLAS)).scalar_one()
+    return valor - cantidad + 1
+
+def _crear_contador(conn):
+    """Bases anteriores al contador: arranca en la versión más alta ya usada."""
+    inicial = max(
+        conn.execute(select(func.max(models.Usuario.huella_version))).scalar() or 0,
+        conn.execute(select(func.max(models.HuellaEliminada.huella_version))).scalar() or 0
+    )
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(models.ContadorVersion.__table__).values(nombre=CONTADOR_HUELLAS, valor=inicial))
+    except IntegrityError:
+        pass # Otro proceso lo creó al mismo tiempo; el UPDATE siguiente espera su commit.
+
+def next_template_version(db: Session) -> int:
+    """Siguiente versión de la galería de huellas (la usan las terminales como cursor)."""
+    return reserve_template_versions(db, 1)
+
+def set_user_fingerprint(db: Session, usuario: models.Usuario, huella_datos: str):
+    """Guarda la plantilla (BLOB compacto), su digest indexado y la nueva versión de la galería."""
+    usuario.plantilla_huella = encode_template(huella_datos)
+    usuario.huella_digest = template_digest(huella_datos)
+    usuario.huella_version = next_template_version(db)
+
+def remove_user_fingerprint(db: Session, usuario: models.Usuario):
+    """
+    Quita la plantilla de huella del usuario y deja una baja (HuellaEliminada)
+    con versión nueva para que la sincronización incremental la quite también
+    de las terminales. Todo camino que borre un usuario con huella o le quite
+    la plantilla debe pasar por aquí (antes del db.delete, si se borra).
+    """
+    if usuario.plantilla_huella is None:
+        return
+    db.add(models.HuellaEliminada(
+        numero_empleado=usuario.numero_empleado,
+        huella_version=reserve_template_versions(db, 1)
+    ))
+    usuario.plantilla_huella = None
+    usuario.huella_digest = None
+    usuario.huella_version = None
+
+def identify_by_template(db: Session, huella_datos: str) -> models.Usuario:
+    """
+    Identificación 1:N. Primero una búsqueda indexada por digest (la
+    misma plantilla byte a byte); si no hay, se comparan minucias contra
+    el índice en memoria (misma huella, lectura distinta).
+    """
+    candidatos = db.query(models.Usuario).filter(
+        models.Usuario.huella_digest == template_digest(huella_datos)
+    ).limit(2).all()
+    candidatos = [
+        u for u in candidatos
+        if normalize_template(decode_template(u.plantilla_huella)) == normalize_template(huella_datos)
+    ]
+    if not candidatos:
+        return _identify_by_minutiae(db, huella_datos)
+    if len(candidatos) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La huella está registrada para más de un empleado. Contacta al administrador."
+        )
+    print(f"--- Huella identificada: empleado {candidatos[0].numero_empleado} ---")
+    return candidatos[0]
+
+def _identify_by_minutiae(db: Session, huella_datos: str) -> models.Usuario:
+    minucias = parse_template(huella_datos)
+    if minucias is None or minucias.shape[0] == 0:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Huella no reconocida.")
+
+    fingerprint_index.ensure_loaded(db)
+    resultados = [r for r in fingerprint_index.search(minucias, k=2) if is_match(r[1], r[2])]
+    if not resultados:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Huella no reconocida.")
+    if len(resultados) > 1 and resultados[1][1] >= resultados[0][1] * 0.9:
+        # Dos empleados casi empatados: no se adivina.
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La huella coincide con más de un empleado. Intenta de nuevo o contacta al administrador."
+        )
+
+    id_usuario, puntaje, pares = resultados[0]
+    usuario = db.query(models.Usuario).filter(models.Usuario.id_usuario == id_usuario).first()
+    if not usuario:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Huella no reconocida.")
+    print(f"--- Huella identificada por minucias: empleado {usuario.numero_empleado} (puntaje {puntaje:.2f}, {pares} pares) ---")
+    return usuario
 
 def verify_fingerprints_match(
     captured_fingerprint_data: str,
@@ -18,11 +148,21 @@ def verify_fingerprints_match(
             detail="El usuario no tiene una huella dactilar registrada."
         )
 
-    # Convertimos la plantilla guardada (bytes) de nuevo a string para comparar.
-    stored_fingerprint_str = stored_fingerprint_template.decode('utf-8')
+    # Convertimos la plantilla guardada (bytes, compacta o heredada) de nuevo a string para comparar.
+    stored_fingerprint_str = decode_template(stored_fingerprint_template)
+
+    # Si ambas plantillas traen minucias legibles se comparan por minucias:
+    # el mismo dedo no produce la misma plantilla en dos lecturas.
+    capturada = parse_template(captured_fingerprint_data)
+    guardada = parse_template(stored_fingerprint_str)
+    if capturada is not None and guardada is not None and len(capturada) and len(guardada):
+        puntaje, pares = match_templates(capturada, guardada)
+        coincide = is_match(puntaje, pares)
+        print(f"--- Verificación de huella por minucias: puntaje {puntaje:.2f}, {pares} pares, "
+              f"{'exitosa' if coincide else 'fallida'}. ---")
+        return coincide
 
-    # La verificación es una comparación directa de las plantillas.
-    # Si el lector y el software son los mismos, las plantillas deben coincidir.
+    # Formato no reconocido: comparación directa de las plantillas.
     if captured_fingerprint_data == stored_fingerprint_str:
         print("--- Verificación de huella exitosa: Las plantillas coinciden. ---")
         return True
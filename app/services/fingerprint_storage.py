@@ -0,0 +1,70 @@
+# ===============================================================
+# ARCHIVO: app/services/fingerprint_storage.py
+# PROPÓSITO: Formato binario compacto de las plantillas de huella en
+#            Usuario.plantilla_huella:
+#              \x00FP | versión de formato (1 byte) | códec (1 byte) | datos
+#            - FMR:  registro ISO/ANSI que llegó en Base64 -> se guardan
+#                    los bytes del registro (25% menos que el texto),
+#                    comprimidos si eso ayuda (FMR_ZLIB).
+#            - ZLIB: cualquier otra plantilla (XML/texto) comprimida.
+#            - RAW:  texto tal cual cuando comprimir no ayuda.
+#            Se guarda la opción más chica.
+#            Las filas anteriores (texto UTF-8 sin encabezado) se siguen
+#            leyendo igual; ninguna plantilla de texto empieza con \x00.
+#            La conversión es sin pérdida: decode_template devuelve
+#            exactamente el texto que mandó el lector.
+# ===============================================================
+import base64
+import binascii
+import zlib
+
+MAGIC = b"\x00FP"
+FORMAT_VERSION = 1
+CODEC_RAW, CODEC_ZLIB, CODEC_FMR, CODEC_FMR_ZLIB = 0, 1, 2, 3
+_HEADER_LEN = len(MAGIC) + 2
+
+# Tipo de contenido para mandar la plantilla compacta tal cual está guardada.
+COMPACT_MEDIA_TYPE = "application/x-fingerprint-template"
+
+
+def encode_template(template: str) -> bytes:
+    """Serializa la plantilla del lector al formato compacto."""
+    texto = template.encode("utf-8")
+    opciones = [(CODEC_RAW, texto), (CODEC_ZLIB, zlib.compress(texto, 9))]
+    try:
+        registro = base64.b64decode(texto, validate=True)
+        # Solo si el Base64 es canónico: al leer se reconstruye el mismo texto.
+        if registro.startswith(b"FMR\x00") and base64.b64encode(registro) == texto:
+            opciones += [(CODEC_FMR, registro), (CODEC_FMR_ZLIB, zlib.compress(registro, 9))]
+    except (binascii.Error, ValueError):
+        pass
+    codec, datos = min(opciones, key=lambda opcion: len(opcion[1]))
+    return MAGIC + bytes([FORMAT_VERSION, codec]) + datos
+
+
+def is_compact(blob: bytes) -> bool:
+    return blob[:len(MAGIC)] == MAGIC
+
+
+def decode_template(blob: bytes) -> str:
+    """Texto original de la plantilla, esté en formato compacto o heredado."""
+    if not is_compact(blob):
+        return blob.decode("utf-8")
+    version, codec = blob[len(MAGIC)], blob[len(MAGIC) + 1]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Versión de formato de plantilla de huella no soportada: {version}")
+    datos = blob[_HEADER_LEN:]
+    if codec == CODEC_FMR:
+        return base64.b64encode(datos).decode("ascii")
+    if codec == CODEC_FMR_ZLIB:
+        return base64.b64encode(zlib.decompress(datos)).decode("ascii")
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(datos).decode("utf-8")
+    if codec == CODEC_RAW:
+        return datos.decode("utf-8")
+    raise ValueError(f"Códec de plantilla de huella desconocido: {codec}")
+
+
+def compact_template(blob: bytes) -> bytes:
+    """La plantilla en formato compacto; las filas heredadas se convierten al vuelo."""
+    return blob if is_compact(blob) else encode_template(blob.decode("utf-8"))
@@ -0,0 +1,123 @@
+# ===============================================================
+# ARCHIVO: app/services/fingerprint_sync_service.py
+# PROPÓSITO: Sincronización incremental de plantillas de huella hacia
+#            las terminales (checadores). Cada plantilla guarda la
+#            versión de la galería en que cambió (Usuario.huella_version);
+#            la terminal pide "todo lo cambiado desde mi versión" y recibe
+#            un lote NDJSON comprimido en streaming, con una línea de
+#            baja por cada plantilla eliminada (HuellasEliminadas). Las
+#            versiones salen de un contador con bloqueo de fila, así que
+#            se confirman en orden. Con el ETag de la galería, una
+#            terminal al día paga un solo 304.
+# ===============================================================
+import json
+import zlib
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import and_, func, literal, null, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.database.database import engine
+from app.models import tablas as models
+from app.services.fingerprint_service import CONTADOR_HUELLAS
+from app.services.fingerprint_storage import decode_template
+
+MEDIA_TYPE = "application/x-ndjson"
+# Filas leídas de la BD por viaje mientras se transmite el lote.
+_LOTE_BD = 500
+
+
+def gallery_state(db: Session) -> Tuple[int, int]:
+    """
+    (versión más reciente, número de plantillas) en una sola consulta
+    agregada. La versión es la del contador: también avanza con las bajas.
+    """
+    contador = select(models.ContadorVersion.valor).where(
+        models.ContadorVersion.nombre == CONTADOR_HUELLAS
+    ).scalar_subquery()
+    version, total, valor_contador = db.query(
+        func.max(models.Usuario.huella_version),
+        func.count(models.Usuario.id_usuario),
+        contador
+    ).filter(models.Usuario.plantilla_huella.isnot(None)).one()
+    return max(version or 0, valor_contador or 0), total
+
+
+def gallery_etag(version: int, total: int) -> str:
+    """ETag del estado de la galería (no de cada respuesta parcial)."""
+    return f'"huellas-{version}-{total}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Interpreta If-None-Match: lista separada por comas, '*' o ETags débiles (W/)."""
+    if not if_none_match:
+        return False
+    candidatos = [e.strip() for e in if_none_match.split(",")]
+    return "*" in candidatos or etag in (e[2:] if e.startswith("W/") else e for e in candidatos)
+
+
+def _lineas(desde: int, hasta: int, completo: bool) -> Iterator[bytes]:
+    yield _json({"desde": desde, "version": hasta, "completo": completo})
+    enviadas = 0
+    # Sesión propia: el generador se consume después de que el endpoint
+    # regresa (y de que se cierre la sesión de get_db).
+    with Session(engine) as db:
+        version = models.Usuario.huella_version
+        if completo:
+            # Incluye las plantillas anteriores a la columna de versión (NULL).
+            rango = or_(version.is_(None), version <= hasta)
+        else:
+            # Estricto: el contador confirma las versiones en orden, así que
+            # nada con versión <= desde puede aparecer después.
+            rango = and_(version > desde, version <= hasta)
+        consulta = select(
+            models.Usuario.numero_empleado, models.Usuario.plantilla_huella,
+            version.label("version"), literal(0).label("eliminada")
+        ).where(models.Usuario.plantilla_huella.isnot(None), rango)
+        if not completo:
+            # Una descarga completa reemplaza la galería; solo los deltas llevan bajas.
+            Baja = models.HuellaEliminada
+            consulta = union_all(consulta, select(
+                Baja.numero_empleado, null(), Baja.huella_version, literal(1)
+            ).where(Baja.huella_version > desde, Baja.huella_version <= hasta))
+        cambios = consulta.subquery()
+        filas = db.execute(
+            select(cambios).order_by(cambios.c.version).execution_options(yield_per=_LOTE_BD)
+        )
+        for numero_empleado, plantilla, version_fila, eliminada in filas:
+            enviadas += 1
+            if eliminada:
+                yield _json({"numero_empleado": numero_empleado, "eliminada": True, "version": version_fila})
+                continue
+            yield _json({
+                "numero_empleado": numero_empleado,
+                "huella_template": decode_template(plantilla),
+                "version": version_fila or 0
+            })
+    # La última línea confirma que el lote llegó completo.
+    yield _json({"fin": True, "enviadas": enviadas})
+
+
+def _json(obj: dict) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def stream_changes(desde: int, hasta: int, comprimir: bool) -> Iterator[bytes]:
+    """
+    Lote NDJSON de los cambios con versión mayor que `desde` y hasta
+    `hasta`: una línea de encabezado, una por plantilla o baja
+    ({"numero_empleado", "eliminada": true, "version"}) y una final. Con `comprimir`
+    sale como gzip, en trozos a medida que se leen las filas.
+    desde=0 es una descarga completa: la terminal reemplaza su galería.
+    """
+    lineas = _lineas(desde, hasta, completo=desde == 0)
+    if not comprimir:
+        yield from lineas
+        return
+
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31: formato gzip
+    for linea in lineas:
+        trozo = gzip.compress(linea)
+        if trozo:
+            yield trozo
+    yield gzip.flush()
@@ -3,89 +3,191 @@
 # PROPÓSITO: Contiene ÚNICAMENTE la lógica de negocio para generar
 #            el reporte de asistencias.
 # ===============================================================
-from sqlalchemy.orm import Session, joinedload
-from datetime import date, datetime
-from typing import Optional
+from sqlalchemy import and_, exists, func
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time
+from typing import Optional, Tuple
 
 from app.models import tablas as models
 
-def get_daily_attendance_report(db: Session, report_date: date, cost_center: Optional[str] = None):
+PRIVILEGED_COST_CENTERS = {'C003', 'CC_RH_01'}
+
+# Minutos de tolerancia antes de que una entrada cuente como "Retardo".
+TOLERANCIA_RETARDO_MINUTOS = 5
+
+
+def compute_attendance_status(
+    report_date: date,
+    scheduled_check_in: Optional[time],
+    actual_check_in: Optional[datetime]
+) -> Tuple[str, int]:
     """
-   genarando reporte 
+    Calcula el estatus del día ("Asistencia", "Retardo", "Ausencia",
+    "Sin Asignación") y los minutos de retardo a partir de la hora
+    programada del turno y la primera entrada registrada.
     """
-    print(f"\n--- Iniciando reporte de asistencia para la fecha: {report_date} ---")
-    if cost_center:
-        print(f"--- Recibido parámetro de Cost Center: {cost_center} ---")
+    status = "Sin Asignación"
+    delay_minutes = 0
 
-    PRIVILEGED_COST_CENTERS = {'C003', 'CC_RH_01'}
+    if scheduled_check_in:
+        status = "Ausencia"
 
-    report = []
+    if actual_check_in:
+        status = "Asistencia"
+        if scheduled_check_in:
+            scheduled_dt = datetime.combine(report_date, scheduled_check_in)
+            actual_dt = actual_check_in.replace(tzinfo=None)
+
+            if actual_dt > scheduled_dt:
+                delay = actual_dt - scheduled_dt
+                delay_minutes = int(delay.total_seconds() / 60)
+                if delay_minutes > TOLERANCIA_RETARDO_MINUTOS:
+                    status = "Retardo"
+
+    return status, delay_minutes
 
-    query_users = db.query(models.Usuario).options(
-        joinedload(models.Usuario.departamento),
-        joinedload(models.Usuario.rol)
+
+def _build_report_entry(row, report_date: date, status: str, delay_minutes: int) -> dict:
+    """Da al renglón del reporte el formato que consume el frontend."""
+    return {
+        "user_id": row.id_usuario,
+        "employee_number": row.numero_empleado,
+        "full_name": row.nombre_completo,
+        "department": row.nombre_depto if row.nombre_depto else "N/A",
+        "role": row.nombre_rol if row.nombre_rol else "N/A",
+        "cost_center": row.costCenter if row.costCenter else "N/A",
+        "date": report_date.isoformat(),
+        "scheduled_check_in": row.scheduled_check_in.strftime('%H:%M:%S') if row.scheduled_check_in else "N/A",
+        "actual_check_in": row.hora_entrada.strftime('%H:%M:%S') if row.hora_entrada else "N/A",
+        "check_out": row.hora_salida.strftime('%H:%M:%S') if row.hora_salida else "N/A",
+        "status": status,
+        "delay_minutes": delay_minutes
+    }
+
+
+def _base_users_query(db: Session, cost_center: Optional[str], *columns):
+    """Usuarios con su departamento y rol, filtrados por Cost Center si aplica."""
+    query = db.query(
+        models.Usuario.id_usuario,
+        models.Usuario.numero_empleado,
+        models.Usuario.nombre_completo,
+        models.Usuario.costCenter,
+        models.Departamento.nombre_depto,
+        models.Rol.nombre_rol,
+        *columns
+    ).outerjoin(
+        models.Departamento,
+        models.Departamento.id_departamento == models.Usuario.id_departamento
+    ).outerjoin(
+        models.Rol,
+        models.Rol.id_rol == models.Usuario.id_rol
     )
 
     if cost_center is not None and cost_center not in PRIVILEGED_COST_CENTERS:
         print(f"--- Aplicando filtro para el Cost Center: {cost_center} ---")
-        query_users = query_users.filter(models.Usuario.costCenter == cost_center)
+        query = query.filter(models.Usuario.costCenter == cost_center)
     else:
         print("--- No se aplica filtro de Cost Center. Mostrando todos los usuarios. ---")
-    
-    users = query_users.all()
-    print(f"--- Encontrados {len(users)} usuarios para procesar. ---")
-
-    for user in users:
-        assignment = db.query(models.AsignacionHorario).options(
-            joinedload(models.AsignacionHorario.tipo_horario)
-        ).filter(
-            models.AsignacionHorario.id_usuario == user.id_usuario,
+    return query
+
+
+def _report_from_summary(db: Session, report_date: date, cost_center: Optional[str]):
+    """
+    Reporte de un día cerrado leído de ResumenesAsistencia: un solo
+    escaneo por (id_usuario, fecha), sin recalcular estatus.
+    """
+    query = _base_users_query(
+        db, cost_center,
+        models.ResumenAsistenciaDiaria.hora_programada.label("scheduled_check_in"),
+        models.ResumenAsistenciaDiaria.hora_entrada.label("hora_entrada"),
+        models.ResumenAsistenciaDiaria.hora_salida.label("hora_salida"),
+        models.ResumenAsistenciaDiaria.estado,
+        models.ResumenAsistenciaDiaria.minutos_retardo
+    ).outerjoin(
+        models.ResumenAsistenciaDiaria,
+        and_(
+            models.ResumenAsistenciaDiaria.id_usuario == models.Usuario.id_usuario,
+            models.ResumenAsistenciaDiaria.fecha == report_date
+        )
+    )
+
+    rows = query.order_by(models.Usuario.id_usuario).all()
+    print(f"--- Encontrados {len(rows)} usuarios en el resumen diario. ---")
+
+    return [
+        _build_report_entry(row, report_date, row.estado or "Sin Asignación", row.minutos_retardo or 0)
+        for row in rows
+    ]
+
+
+def _has_summary(db: Session, report_date: date) -> bool:
+    """Si el día ya tiene filas en ResumenesAsistencia."""
+    return db.query(
+        exists().where(models.ResumenAsistenciaDiaria.fecha == report_date)
+    ).scalar()
+
+
+def get_daily_attendance_report(db: Session, report_date: date, cost_center: Optional[str] = None):
+    """
+    Genera el reporte de asistencia del día.
+    - Días cerrados con resumen: se lee la tabla ResumenesAsistencia.
+    - Día en curso, o días anteriores a la tabla de resúmenes (sin filas
+      todavía): UNA sola consulta, usuarios LEFT JOIN su asignación/turno
+      del día LEFT JOIN su primer registro del día; estatus y retardo se
+      calculan en una pasada.
+    """
+    print(f"\n--- Iniciando reporte de asistencia para la fecha: {report_date} ---")
+    if cost_center:
+        print(f"--- Recibido parámetro de Cost Center: {cost_center} ---")
+
+    if report_date < date.today():
+        if _has_summary(db, report_date):
+            report = _report_from_summary(db, report_date, cost_center)
+            print("\n--- Reporte finalizado (desde resumen). ---")
+            return report
+        print("--- El día no tiene resumen; se calcula desde los registros. ---")
+
+    # Primer registro de cada usuario en el día (equivale al antiguo .first()).
+    primer_registro = db.query(
+        models.RegistroAsistencia.id_usuario.label("id_usuario"),
+        func.min(models.RegistroAsistencia.id_registro).label("id_registro")
+    ).filter(
+        models.RegistroAsistencia.fecha == report_date
+    ).group_by(
+        models.RegistroAsistencia.id_usuario
+    ).subquery()
+
+    query = _base_users_query(
+        db, cost_center,
+        models.TipoHorario.hora_entrada.label("scheduled_check_in"),
+        models.RegistroAsistencia.hora_entrada.label("hora_entrada"),
+        models.RegistroAsistencia.hora_salida.label("hora_salida")
+    ).outerjoin(
+        models.AsignacionHorario,
+        and_(
+            models.AsignacionHorario.id_usuario == models.Usuario.id_usuario,
             models.AsignacionHorario.fecha == report_date
-        ).first()
-        
-        attendance_record = db.query(models.RegistroAsistencia).filter(
-            models.RegistroAsistencia.id_usuario == user.id_usuario,
-            models.RegistroAsistencia.fecha == report_date
-        ).first()
-
-        status = "Sin Asignación"
-        scheduled_check_in = None
-        actual_check_in = None
-        delay_minutes = 0
-
-        if assignment and assignment.tipo_horario:
-            scheduled_check_in = assignment.tipo_horario.hora_entrada
-            status = "Ausencia"
-
-        if attendance_record:
-            actual_check_in = attendance_record.hora_entrada.time()
-            status = "Asistencia"
-            if scheduled_check_in:
-                scheduled_dt = datetime.combine(report_date, scheduled_check_in)
-                actual_dt = attendance_record.hora_entrada.replace(tzinfo=None)
-                
-                if actual_dt > scheduled_dt:
-                    delay = actual_dt - scheduled_dt
-                    delay_minutes = int(delay.total_seconds() / 60)
-                    if delay_minutes > 5:
-                        status = "Retardo"
-
-        report_entry = {
-            "user_id": user.id_usuario,
-            "employee_number": user.numero_empleado,
-            "full_name": user.nombre_completo,
-            "department": user.departamento.nombre_depto if user.departamento else "N/A",
-            "role": user.rol.nombre_rol if user.rol else "N/A",
-            "cost_center": user.costCenter if user.costCenter else "N/A",
-            "date": report_date.isoformat(),
-            "scheduled_check_in": scheduled_check_in.strftime('%H:%M:%S') if scheduled_check_in else "N/A",
-            "actual_check_in": actual_check_in.strftime('%H:%M:%S') if actual_check_in else "N/A",
-            "check_out": attendance_record.hora_salida.strftime('%H:%M:%S') if attendance_record and attendance_record.hora_salida else "N/A",
-            "status": status,
-            "delay_minutes": delay_minutes
-        }
-        
-        report.append(report_entry)
+        )
+    ).outerjoin(
+        models.TipoHorario,
+        models.TipoHorario.id_tipo_horario == models.AsignacionHorario.id_tipo_horario
+    ).outerjoin(
+        primer_registro,
+        primer_registro.c.id_usuario == models.Usuario.id_usuario
+    ).outerjoin(
+        models.RegistroAsistencia,
+        models.RegistroAsistencia.id_registro == primer_registro.c.id_registro
+    )
+
+    rows = query.order_by(models.Usuario.id_usuario).all()
+    print(f"--- Encontrados {len(rows)} usuarios para procesar. ---")
+
+    report = []
+    for row in rows:
+        status, delay_minutes = compute_attendance_status(
+            report_date, row.scheduled_check_in, row.hora_entrada
+        )
+        report.append(_build_report_entry(row, report_date, status, delay_minutes))
 
     print("\n--- Reporte finalizado. ---")
-    return report
\ No newline at end of file
+    return report
@@ -1,9 +1,4 @@
 import os
-import gspread
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
 
 # --- Permisos requeridos ---
 SCOPES = [
@@ -16,6 +11,12 @@ def _get_gspread_client():
     """
     verifico si el token esta funcionando @
     """
+    # Importaciones diferidas: solo las paga quien exporta a Sheets.
+    import gspread
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -39,6 +40,8 @@ def create_and_write_spreadsheet(report_data, file_title, user_email, folder_id=
     :param user_email: Email del usuario que solicita la exportación (no se usa en OAuth directo, pero puedes usarlo para logging).
     :param folder_id: ID de carpeta de Google Drive donde se guardará el archivo.
     """
+    from googleapiclient.discovery import build
+
     client, creds = _get_gspread_client()
 
     # --- Crear archivo en Drive ---
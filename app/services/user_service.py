@@ -7,6 +7,7 @@ from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from ..models import tablas as models
+from .fingerprint_service import set_user_fingerprint
 
 def create_user_with_fingerprint(
     db: Session,
@@ -34,10 +35,11 @@ def create_user_with_fingerprint(
         # AÑADIDO: Campo de email requerido por el modelo. Ajústalo a tus necesidades.
         email=f"{numero_empleado}@ejemplo.com", 
         # SOLUCIÓN: Asigna el ID del departamento al campo de clave foránea `id_departamento`.
-        id_departamento=departamento,
-        # La columna 'plantilla_huella' es de tipo BLOB, por lo que convertimos el string a bytes.
-        plantilla_huella=huella_datos.encode('utf-8')
+        id_departamento=departamento
     )
+    # La columna 'plantilla_huella' es de tipo BLOB (formato compacto, ver fingerprint_storage); además
+    # se guarda su digest indexado para la identificación 1:N.
+    set_user_fingerprint(db, nuevo_usuario, huella_datos)
 
     # 3. Guardar en la base de datos con manejo de errores de integridad.
     try:
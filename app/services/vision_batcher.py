@@ -0,0 +1,181 @@
+# ===============================================================
+# ARCHIVO: app/services/vision_batcher.py
+# PROPÓSITO: Cliente asíncrono de detección de rostros con Google Vision.
+#            Junta las peticiones concurrentes en llamadas a
+#            batch_annotate_images (hasta VISION_BATCH_SIZE imágenes o lo
+#            que llegue en VISION_FLUSH_MS), con tiempo máximo por
+#            llamada y un número acotado de reintentos (solo de errores
+#            transitorios).
+# ===============================================================
+import asyncio
+from typing import Callable, List, Optional, Tuple
+
+from app.core.config import (
+    VISION_BATCH_SIZE, VISION_FLUSH_MS, VISION_TIMEOUT_SECONDS, VISION_MAX_RETRIES,
+    VISION_RETRY_BACKOFF_SECONDS, VISION_MAX_INFLIGHT, VISION_QUEUE_DEPTH, FACE_RETRY_AFTER_SECONDS
+)
+from app.services.face_worker_pool import ColaLlenaError
+
+# Valor de vision.Feature.Type.FACE_DETECTION (entero para no importar la librería).
+FACE_DETECTION = 1
+
+# Errores de la API que vale la pena reintentar: tiempo agotado, límite de
+# cuota y fallas del servidor. Se revisan por código (HTTP en e.code, gRPC
+# en e.grpc_status_code) para no importar google.api_core.
+CODIGOS_HTTP_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+CODIGOS_GRPC_TRANSITORIOS = {"DEADLINE_EXCEEDED", "RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL", "ABORTED"}
+
+
+def es_transitorio(error: Exception) -> bool:
+    """True si el error puede desaparecer al reintentar (no es culpa de la petición)."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "code", None) in CODIGOS_HTTP_TRANSITORIOS:
+        return True
+    grpc_code = getattr(error, "grpc_status_code", None)
+    return getattr(grpc_code, "name", None) in CODIGOS_GRPC_TRANSITORIOS
+
+
+def face_request(image_bytes: bytes) -> dict:
+    """Petición de batch_annotate_images para detectar un rostro."""
+    return {"image": {"content": image_bytes}, "features": [{"type_": FACE_DETECTION, "max_results": 1}]}
+
+
+class VisionBatchClient:
+    """
+    Cola asyncio acotada + una tarea que arma lotes y los manda a la API en
+    un hilo (el cliente de Google es bloqueante), con a lo más
+    `max_inflight` lotes en vuelo.
+    """
+
+    def __init__(self, client_factory: Callable, max_batch_size: int = VISION_BATCH_SIZE,
+                 flush_ms: float = VISION_FLUSH_MS, timeout_s: float = VISION_TIMEOUT_SECONDS,
+                 max_retries: int = VISION_MAX_RETRIES, backoff_s: float = VISION_RETRY_BACKOFF_SECONDS,
+                 max_inflight: int = VISION_MAX_INFLIGHT, max_pending: int = VISION_QUEUE_DEPTH,
+                 retry_after: int = FACE_RETRY_AFTER_SECONDS):
+        self.client_factory = client_factory
+        self.max_batch_size = max(1, min(16, max_batch_size))
+        self.flush = flush_ms / 1000.0
+        self.timeout_s = timeout_s
+        self.max_retries = max(0, max_retries)
+        self.backoff_s = backoff_s
+        self.max_inflight = max(1, max_inflight)
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self.batches = 0
+        self.items = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _ensure_started(self):
+        """La cola y la tarea viven en el event loop actual (se recrean si cambia)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._inflight = asyncio.Semaphore(self.max_inflight)
+            self._task = loop.create_task(self._run())
+
+    async def annotate(self, image_bytes: bytes):
+        """
+        Devuelve la AnnotateImageResponse de esta imagen. Lanza ColaLlenaError
+        si no hay lugar en la cola, o la excepción de la API si se agotaron
+        los reintentos.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        try:
+            self._queue.put_nowait((image_bytes, future))
+        except asyncio.QueueFull:
+            raise ColaLlenaError(self.retry_after)
+        return await future
+
+    async def _collect(self) -> List[Tuple[bytes, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.flush
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._inflight.acquire()
+            self._loop.create_task(self._send(batch))
+
+    async def _send(self, batch: List[Tuple[bytes, asyncio.Future]]):
+        try:
+            requests = [face_request(b) for b, _ in batch]
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                response = await self._call_with_retries(requests)
+            except Exception as e:
+                self.failures += 1
+                for _, f in batch:
+                    if not f.done():
+                        f.set_exception(e)
+                return
+            respuestas = list(response.responses)
+            for (_, f), r in zip(batch, respuestas):
+                if not f.done():
+                    f.set_result(r)
+            # Si la API devolvió menos respuestas que imágenes, las que faltan fallan (no se quedan colgadas).
+            if len(respuestas) < len(batch):
+                self.failures += 1
+                error = RuntimeError(
+                    f"Google Vision devolvió {len(respuestas)} respuestas para {len(batch)} imágenes."
+                )
+                for _, f in batch[len(respuestas):]:
+                    if not f.done():
+                        f.set_exception(error)
+        finally:
+            self._inflight.release()
+
+    async def _call_with_retries(self, requests: list):
+        client = self.client_factory()
+        for intento in range(self.max_retries + 1):
+            try:
+                # El cliente recibe su propio timeout; wait_for es la red de seguridad.
+                return await asyncio.wait_for(
+                    asyncio.to_thread(client.batch_annotate_images, requests=requests, timeout=self.timeout_s),
+                    self.timeout_s + 1
+                )
+            except Exception as e:
+                # Credenciales, petición inválida, etc.: reintentar no cambia nada.
+                if intento == self.max_retries or not es_transitorio(e):
+                    print(f"--- ERROR (vision_batcher): Lote de {len(requests)} imágenes falló tras {intento + 1} intentos: {e}")
+                    raise
+                self.retries += 1
+                espera = self.backoff_s * (2 ** intento)
+                print(f"--- LOG (vision_batcher): Reintentando lote en {espera:.2f} s ({e}). ---")
+                await asyncio.sleep(espera)
+
+    def status(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "flush_ms": self.flush * 1000.0,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "retries": self.retries,
+            "failures": self.failures
+        }
+
+
+def _vision_client():
+    from app.core.clients import get_vision_client
+    return get_vision_client()
+
+
+vision_batcher = VisionBatchClient(_vision_client)
@@ -0,0 +1,59 @@
+# ===============================================================
+# ARCHIVO: app/services/vision_fake.py
+# PROPÓSITO: Cliente falso de Google Cloud Vision para pruebas y
+#            benchmarks sin red. Implementa batch_annotate_images con la
+#            misma forma de respuesta (responses[i].face_annotations,
+#            responses[i].error.message) y una latencia configurable por
+#            llamada y por imagen, para medir el efecto de los lotes.
+#            Se activa en la API con VISION_FAKE=1.
+# ===============================================================
+import threading
+import time
+from types import SimpleNamespace
+
+# Las imágenes cuyo contenido empieza con este marcador "no tienen rostro".
+SIN_ROSTRO = b"NOFACE"
+
+
+class FakeVisionError(Exception):
+    """Error transitorio simulado de la API (con el código HTTP que daría Google)."""
+
+    def __init__(self, message: str, code: int = 503):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeVisionClient:
+    def __init__(self, latency_s: float = 0.05, per_image_s: float = 0.002,
+                 confidence: float = 0.98, fail_every: int = 0):
+        self.latency_s = latency_s
+        self.per_image_s = per_image_s
+        self.confidence = confidence
+        # Cada cuántas llamadas falla una (0 = nunca), para probar los reintentos.
+        self.fail_every = fail_every
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.images = 0
+
+    def batch_annotate_images(self, requests, timeout=None):
+        with self._lock:
+            self.calls += 1
+            self.images += len(requests)
+            llamada = self.calls
+
+        demora = self.latency_s + self.per_image_s * len(requests)
+        if timeout is not None and demora > timeout:
+            time.sleep(timeout)
+            raise FakeVisionError(f"Deadline exceeded ({timeout}s)", code=504)
+        time.sleep(demora)
+        if self.fail_every and llamada % self.fail_every == 0:
+            raise FakeVisionError("Servicio no disponible (simulado)")
+
+        return SimpleNamespace(responses=[self._annotate(r) for r in requests])
+
+    def _annotate(self, request) -> SimpleNamespace:
+        content = request["image"]["content"]
+        caras = []
+        if not content.startswith(SIN_ROSTRO):
+            caras.append(SimpleNamespace(detection_confidence=self.confidence))
+        return SimpleNamespace(face_annotations=caras, error=SimpleNamespace(message=""))
@@ -1,55 +1,75 @@
 # app/services/vision_service.py
 import base64
+from typing import TYPE_CHECKING
 from fastapi import HTTPException, status
-from google.cloud import vision
-from ..core.clients import vision_client
+from ..core.clients import get_vision_client
+from .face_worker_pool import ColaLlenaError
+from .vision_batcher import face_request, vision_batcher
 
-def detect_face_from_base64(image_base64: str) -> vision.FaceAnnotation:
+if TYPE_CHECKING:
+    from google.cloud import vision
+
+def _decode_base64(image_base64: str) -> bytes:
+    if ',' in image_base64:
+        _, image_data = image_base64.split(',', 1)
+    else:
+        image_data = image_base64
+    try:
+        return base64.b64decode(image_data)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La imagen en Base64 no es válida."
+        )
+
+def _first_face(response) -> "vision.FaceAnnotation":
+    """Valida la respuesta de Vision para una imagen y devuelve su primer rostro."""
+    if response.error.message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Error de la API de Vision: {response.error.message}"
+        )
+
+    face_annotations = response.face_annotations
+    if not face_annotations:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se detectó ningún rostro en la imagen."
+        )
+
+    first_face = face_annotations[0]
+    if first_face.detection_confidence < 0.90:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se pudo verificar el rostro con suficiente confianza."
+        )
+
+    print(f"Rostro detectado con una confianza de: {first_face.detection_confidence:.2f}")
+    return first_face
+
+def detect_face_from_base64(image_base64: str) -> "vision.FaceAnnotation":
     """
     Recibe una imagen en Base64, la envía a Google Vision y devuelve la
     anotación del rostro si se detecta con suficiente confianza.
     Lanza una excepción HTTPException si falla la verificación.
     """
-    if not vision_client:
+    try:
+        vision_client = get_vision_client()
+    except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="El cliente de Google Cloud Vision no está inicializado."
         )
 
     try:
-        if ',' in image_base64:
-            _, image_data = image_base64.split(',', 1)
-        else:
-            image_data = image_base64
-
-        image_content = base64.b64decode(image_data)
-        image = vision.Image(content=image_content)
+        image_content = _decode_base64(image_base64)
 
         print("Enviando imagen a Google Cloud Vision para análisis...")
-        response = vision_client.face_detection(image=image)
-        
-        if response.error.message:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Error de la API de Vision: {response.error.message}"
-            )
-
-        face_annotations = response.face_annotations
-        if not face_annotations:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No se detectó ningún rostro en la imagen."
-            )
-
-        first_face = face_annotations[0]
-        if first_face.detection_confidence < 0.90:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No se pudo verificar el rostro con suficiente confianza."
-            )
-        
-        print(f"Rostro detectado con una confianza de: {first_face.detection_confidence:.2f}")
-        return first_face
+        response = vision_client.batch_annotate_images(
+            requests=[face_request(image_content)],
+            timeout=vision_batcher.timeout_s
+        ).responses[0]
+        return _first_face(response)
 
     except Exception as e:
         # Si ya es una HTTPException, relánzala. Si no, crea una nueva.
@@ -59,4 +79,27 @@ def detect_face_from_base64(image_base64: str) -> vision.FaceAnnotation:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ocurrió un error interno al procesar la imagen."
-        )
\ No newline at end of file
+        )
+
+async def detect_face_from_base64_async(image_base64: str) -> "vision.FaceAnnotation":
+    """
+    Igual que detect_face_from_base64, pero sin bloquear el event loop: la
+    imagen se junta con las demás peticiones concurrentes en una sola
+    llamada a batch_annotate_images (ver vision_batcher).
+    """
+    image_content = _decode_base64(image_base64)
+    try:
+        response = await vision_batcher.annotate(image_content)
+    except ColaLlenaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servicio de visión está saturado. Intenta de nuevo en unos segundos.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except Exception as e:
+        print(f"Error inesperado en el servicio de visión: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Google Cloud Vision no respondió a tiempo. Intenta de nuevo."
+        )
+    return _first_face(response)
@@ -18,9 +18,16 @@ CREATE TABLE Usuarios (
     -- password_hash VARCHAR(255) NOT NULL,   -- CAMBIO: Eliminado
     id_rol INT,
     id_departamento INT,
-    plantilla_huella BLOB,
-    plantilla_facial TEXT,
+    plantilla_huella BLOB,   -- Formato compacto con encabezado de versión (ver fingerprint_storage.py)
+    huella_digest CHAR(64),  -- SHA-256 (hex) de la plantilla de huella normalizada
+    huella_version INT,      -- Versión de la galería en que cambió la plantilla (sync de terminales)
+    plantilla_facial TEXT,   -- Heredado: JSON del embedding
+    embedding_facial BLOB,   -- float32 little-endian crudo
+    embedding_modelo VARCHAR(50),
+    embedding_dim INT,
 
+    INDEX (huella_digest),
+    INDEX (huella_version),
     FOREIGN KEY (id_rol) REFERENCES Roles(id_rol) ON DELETE SET NULL,
     FOREIGN KEY (id_departamento) REFERENCES Departamentos(id_departamento) ON DELETE SET NULL
 );
@@ -52,6 +59,11 @@ CREATE TABLE RegistrosAsistencia (
     fecha DATE NOT NULL,
     hora_entrada DATETIME NOT NULL,
     hora_salida DATETIME, -- Permite nulo porque el usuario aún no ha checado su salida
+    -- 1 mientras el registro está abierto, NULL al cerrarse: el índice único
+    -- emula el parcial (id_usuario, fecha) WHERE hora_salida IS NULL, porque
+    -- MySQL no repite la restricción entre valores NULL.
+    abierto TINYINT AS (IF(hora_salida IS NULL, 1, NULL)) VIRTUAL,
+    UNIQUE INDEX ux_registro_abierto (id_usuario, fecha, abierto),
     FOREIGN KEY (id_usuario) REFERENCES Usuarios(id_usuario) ON DELETE CASCADE
 );
 
@@ -66,4 +78,34 @@ CREATE TABLE EventosAdicionales (
     motivo TEXT,
     estado VARCHAR(20) NOT NULL DEFAULT 'PENDIENTE', -- 'PENDIENTE', 'APROBADO', 'RECHAZADO'
     FOREIGN KEY (id_usuario) REFERENCES Usuarios(id_usuario) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- ========= TABLA 8: Resumen Diario de Asistencia (estatus precalculado) =========
+CREATE TABLE ResumenesAsistencia (
+    id_resumen INT AUTO_INCREMENT PRIMARY KEY,
+    id_usuario INT NOT NULL,
+    fecha DATE NOT NULL,
+    hora_programada TIME,  -- Entrada del turno asignado (nulo si no hay asignación)
+    hora_entrada DATETIME, -- Primera entrada del día
+    hora_salida DATETIME,
+    estado VARCHAR(20) NOT NULL, -- 'Asistencia', 'Retardo', 'Ausencia', 'Sin Asignación'
+    minutos_retardo INT NOT NULL DEFAULT 0,
+    UNIQUE (id_usuario, fecha),
+    INDEX (fecha),
+    FOREIGN KEY (id_usuario) REFERENCES Usuarios(id_usuario) ON DELETE CASCADE
+);
+
+-- ========= TABLA 9: Contadores de Versión (secuencias con bloqueo de fila) =========
+CREATE TABLE ContadoresVersion (
+    nombre VARCHAR(50) PRIMARY KEY, -- 'huellas': versión de la galería de huellas (sync de terminales)
+    valor INT NOT NULL DEFAULT 0
+);
+INSERT INTO ContadoresVersion (nombre, valor) VALUES ('huellas', 0);
+
+-- ========= TABLA 10: Huellas Eliminadas (tombstones para la sync incremental) =========
+CREATE TABLE HuellasEliminadas (
+    id_eliminacion INT AUTO_INCREMENT PRIMARY KEY,
+    numero_empleado VARCHAR(20) NOT NULL,
+    huella_version INT NOT NULL,
+    INDEX (huella_version)
+);
@@ -0,0 +1,73 @@
+# ===============================================================
+# ARCHIVO: tests/conftest.py
+# PROPÓSITO: Base de datos SQLite en archivo temporal para las pruebas:
+#            cada prueba recibe su propio engine con todas las tablas.
+# ===============================================================
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database.database import Base
+from app.models import tablas as models
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # En archivo (no en memoria) para que varios hilos vean la misma base.
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'checador.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def count_queries(engine):
+    """Cuenta las sentencias que llegan al cursor mientras dura el bloque `with`."""
+    class _Contador:
+        def __init__(self):
+            self.sentencias = []
+
+        def _registrar(self, conn, cursor, statement, parameters, context, executemany):
+            self.sentencias.append(statement)
+
+        def __enter__(self):
+            self.sentencias.clear()
+            event.listen(engine, "before_cursor_execute", self._registrar)
+            return self
+
+        def __exit__(self, *exc):
+            event.remove(engine, "before_cursor_execute", self._registrar)
+
+        @property
+        def total(self):
+            return len(self.sentencias)
+
+    return _Contador()
+
+
+def crear_usuarios(db: Session, n: int, inicio: int = 1) -> list:
+    usuarios = [
+        models.Usuario(
+            numero_empleado=f"E{i:04d}",
+            nombre_completo=f"Empleado {i}",
+            email=f"empleado{i}@example.com"
+        )
+        for i in range(inicio, inicio + n)
+    ]
+    db.add_all(usuarios)
+    db.commit()
+    return usuarios
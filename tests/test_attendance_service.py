@@ -0,0 +1,111 @@
+# ===============================================================
+# ARCHIVO: tests/test_attendance_service.py
+# PROPÓSITO: Checadas de entrada/salida: el camino sin RETURNING
+#            (MySQL) y los check-in simultáneos del mismo empleado.
+# ===============================================================
+import threading
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models import tablas as models
+from app.routers import asistencia
+from app.services import attendance_service
+from tests.conftest import crear_usuarios
+
+
+def test_checada_sin_returning_cierra_el_registro_abierto(monkeypatch, engine, db):
+    # MySQL no tiene UPDATE ... RETURNING.
+    monkeypatch.setattr(engine.dialect, "update_returning", False)
+    usuario = crear_usuarios(db, 1)[0]
+
+    entrada = attendance_service.register_attendance(db, usuario)
+    salida = attendance_service.register_attendance(db, usuario)
+
+    assert entrada["mensaje"].startswith("Entrada")
+    assert salida["mensaje"].startswith("Salida")
+    assert salida["data"].hora_salida is not None
+    registros = db.query(models.RegistroAsistencia).all()
+    assert len(registros) == 1
+    assert registros[0].hora_salida is not None
+
+
+def test_check_out_actualiza_el_registro_una_sola_vez(db, count_queries):
+    usuario = crear_usuarios(db, 1)[0]
+    attendance_service.register_attendance(db, usuario)
+    # La sesión ya tiene cargado el registro abierto: debe quedar con su salida.
+    abierto = db.query(models.RegistroAsistencia).one()
+
+    with count_queries as contador:
+        salida = attendance_service.register_attendance(db, usuario)
+
+    updates = [s for s in contador.sentencias if s.startswith('UPDATE "RegistrosAsistencia"')]
+    assert len(updates) == 1
+    assert abierto.hora_salida is not None
+    assert salida["data"].hora_salida == abierto.hora_salida
+
+
+@pytest.mark.parametrize("update_returning", [True, False])
+def test_checadas_simultaneas_dejan_a_lo_mas_un_registro_abierto(monkeypatch, engine, db, session_factory,
+                                                                   update_returning):
+    monkeypatch.setattr(engine.dialect, "update_returning", update_returning)
+    crear_usuarios(db, 1)
+    resultados, errores = [], []
+    barrera = threading.Barrier(8, timeout=10)
+
+    def _checar():
+        with session_factory() as sesion:
+            usuario = sesion.query(models.Usuario).one()
+            barrera.wait()
+            try:
+                resultados.append(attendance_service.register_attendance(sesion, usuario)["mensaje"])
+            except HTTPException as e:
+                # 409 es aceptable (checada empalmada); cualquier otra cosa sería un 500.
+                resultados.append(e.status_code)
+            except Exception as e:
+                errores.append(e)
+
+    hilos = [threading.Thread(target=_checar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert len(resultados) == 8
+    assert all(r == 409 or isinstance(r, str) for r in resultados)
+    abiertos = db.query(models.RegistroAsistencia).filter(models.RegistroAsistencia.hora_salida.is_(None)).count()
+    assert abiertos <= 1
+
+
+def test_check_in_simultaneos_uno_entra_y_el_otro_recibe_409(engine, db, session_factory):
+    crear_usuarios(db, 1)
+    # Los dos hilos pasan la validación antes de que cualquiera inserte.
+    barrera = threading.Barrier(2, timeout=10)
+
+    def _esperar_al_insertar(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO \"RegistrosAsistencia\""):
+            barrera.wait()
+
+    event.listen(engine, "before_cursor_execute", _esperar_al_insertar)
+    resultados = []
+
+    def _check_in():
+        with session_factory() as sesion:
+            usuario = sesion.query(models.Usuario).one()
+            try:
+                asistencia.registrar_check_in(db=sesion, current_user=usuario)
+                resultados.append(200)
+            except HTTPException as e:
+                resultados.append(e.status_code)
+
+    hilos = [threading.Thread(target=_check_in) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    event.remove(engine, "before_cursor_execute", _esperar_al_insertar)
+
+    assert sorted(resultados) == [200, 409]
+    assert db.query(models.RegistroAsistencia).count() == 1
@@ -0,0 +1,51 @@
+# ===============================================================
+# ARCHIVO: tests/test_embedding_backends.py
+# PROPÓSITO: Paridad entre backends de embeddings: el modelo exportado a
+#            ONNX debe dar los mismos vectores que DeepFace, para que las
+#            plantillas guardadas sirvan con cualquiera de los dos.
+#            Se omite si no están onnxruntime, DeepFace o el modelo exportado.
+# ===============================================================
+import os
+
+import numpy as np
+import pytest
+
+from app.core.config import FACE_MODEL_NAME, FACE_ONNX_MODEL_PATH
+from app.services.embedding_backends import EmbeddingBackend, FakeBackend, create_backend
+
+# Distancia coseno máxima aceptada entre las salidas de ambos backends.
+TOLERANCIA_PARIDAD = 1e-4
+
+
+def test_el_backend_base_es_abstracto():
+    with pytest.raises(TypeError):
+        EmbeddingBackend(FACE_MODEL_NAME)
+
+
+def test_backend_fake_es_determinista():
+    backend = FakeBackend("Facenet")
+    width, height = backend.input_shape
+    rostros = np.random.default_rng(0).random((3, height, width, 3), dtype=np.float32)
+    a, b = backend.forward(rostros), backend.forward(rostros)
+    assert a.shape == (3, 128) and a.dtype == np.float32
+    np.testing.assert_array_equal(a, b)
+
+
+def test_paridad_onnx_contra_deepface():
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("deepface")
+    if not os.path.exists(FACE_ONNX_MODEL_PATH):
+        pytest.skip(f"No hay modelo exportado en {FACE_ONNX_MODEL_PATH} (ver app/scripts/export_onnx_model.py).")
+
+    referencia = create_backend(FACE_MODEL_NAME, "deepface")
+    candidato = create_backend(FACE_MODEL_NAME, "onnx")
+    assert candidato.input_shape == tuple(referencia.input_shape)
+
+    width, height = referencia.input_shape
+    rostros = np.random.default_rng(123).random((8, height, width, 3), dtype=np.float32)
+    a, b = referencia.forward(rostros), candidato.forward(rostros)
+
+    assert a.shape == b.shape
+    a /= np.linalg.norm(a, axis=1, keepdims=True)
+    b /= np.linalg.norm(b, axis=1, keepdims=True)
+    assert float(np.max(1.0 - np.sum(a * b, axis=1))) <= TOLERANCIA_PARIDAD
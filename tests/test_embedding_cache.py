@@ -0,0 +1,91 @@
+# ===============================================================
+# ARCHIVO: tests/test_embedding_cache.py
+# PROPÓSITO: Caché de embeddings: aciertos, caducidad por TTL, desalojo
+#            LRU, llaves por modelo y arreglos compartidos de solo lectura.
+# ===============================================================
+import numpy as np
+import pytest
+
+from app.services import embedding_cache as modulo
+from app.services.embedding_cache import EmbeddingCache, cache_key
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(modulo.time, "monotonic", reloj)
+    return reloj
+
+
+def test_acierto_devuelve_el_mismo_embedding(reloj):
+    cache = EmbeddingCache(max_entries=4, ttl_s=60)
+    llave = cache_key(b"foto", "Facenet512")
+
+    assert cache.get(llave) is None
+    cache.put(llave, [0.1, 0.2, 0.3])
+
+    np.testing.assert_array_equal(cache.get(llave), np.float32([0.1, 0.2, 0.3]))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entrada_caduca_al_pasar_el_ttl(reloj):
+    cache = EmbeddingCache(max_entries=4, ttl_s=60)
+    llave = cache_key(b"foto", "Facenet512")
+    cache.put(llave, [1.0])
+
+    reloj.ahora += 59
+    assert cache.get(llave) is not None
+    reloj.ahora += 2
+    assert cache.get(llave) is None
+    assert cache.expired == 1 and cache.status()["size"] == 0
+
+
+def test_desaloja_la_menos_usada_al_llenarse(reloj):
+    cache = EmbeddingCache(max_entries=2, ttl_s=60)
+    a, b, c = (cache_key(foto, "Facenet512") for foto in (b"a", b"b", b"c"))
+    cache.put(a, [1.0])
+    cache.put(b, [2.0])
+    cache.get(a)  # "b" queda como la menos usada
+    cache.put(c, [3.0])
+
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.evictions == 1 and cache.status()["size"] == 2
+
+
+def test_otro_modelo_no_comparte_la_entrada(reloj):
+    cache = EmbeddingCache(max_entries=4, ttl_s=60)
+    cache.put(cache_key(b"foto", "Facenet512"), [1.0, 2.0])
+
+    assert cache_key(b"foto", "Facenet512") != cache_key(b"foto", "ArcFace")
+    assert cache.get(cache_key(b"foto", "ArcFace")) is None
+
+
+def test_embedding_devuelto_es_de_solo_lectura(reloj):
+    cache = EmbeddingCache(max_entries=4, ttl_s=60)
+    original = np.float32([1.0, 2.0])
+    llave = cache_key(b"foto", "Facenet512")
+    cache.put(llave, original)
+
+    guardado = cache.get(llave)
+    with pytest.raises(ValueError):
+        guardado[0] = 9.0
+    # La copia no depende del arreglo de quien lo guardó.
+    original[0] = 9.0
+    assert cache.get(llave)[0] == 1.0
+
+
+def test_capacidad_cero_desactiva_la_cache():
+    cache = EmbeddingCache(max_entries=0, ttl_s=60)
+    llave = cache_key(b"foto", "Facenet512")
+    cache.put(llave, [1.0])
+
+    assert not cache.enabled and cache.get(llave) is None
@@ -0,0 +1,32 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_batcher.py
+# PROPÓSITO: El micro-lote facial no admite más imágenes (pendientes +
+#            en inferencia) que su límite: la siguiente recibe 503 en
+#            lugar de dejar otro hilo de la API esperando.
+# ===============================================================
+import threading
+
+import pytest
+
+from app.services.face_batcher import FaceBatcher
+from app.services.face_worker_pool import ColaLlenaError, FaceWorkerPool
+
+
+def test_admision_acotada_entre_pendientes_y_en_inferencia():
+    liberar = threading.Event()
+
+    def lote_lento(imagenes):
+        liberar.wait(5)
+        return [len(imagen) for imagen in imagenes]
+
+    # workers=0: el lote corre en el hilo del batcher, que queda ocupado.
+    batcher = FaceBatcher(FaceWorkerPool(0, 0, 1), lote_lento, max_batch_size=2,
+                          window_ms=1, max_admitted=5, retry_after=1)
+    futuros = [batcher.submit(b"x" * i) for i in range(1, 6)]
+    with pytest.raises(ColaLlenaError):
+        batcher.submit(b"sobra")
+
+    liberar.set()
+    assert [f.result(timeout=5) for f in futuros] == [1, 2, 3, 4, 5]
+    # Con los resultados entregados se liberan los lugares.
+    assert batcher.submit(b"otra").result(timeout=5) == 4
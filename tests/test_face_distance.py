@@ -0,0 +1,71 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_distance.py
+# PROPÓSITO: Umbrales por modelo y métrica, y sus ajustes desde la
+#            variable FACE_THRESHOLDS (incluido un JSON malo).
+# ===============================================================
+import numpy as np
+import pytest
+
+from app.services import face_distance
+
+
+@pytest.fixture
+def umbrales(monkeypatch):
+    """Recarga la tabla de umbrales con el FACE_THRESHOLDS dado."""
+    def cargar(valor: str):
+        monkeypatch.setattr(face_distance, "FACE_THRESHOLDS", valor)
+        monkeypatch.setattr(face_distance, "UMBRALES", face_distance._cargar_umbrales())
+    return cargar
+
+
+@pytest.mark.parametrize("modelo, metrica, esperado", [
+    ("Facenet512", "cosine", 0.30),
+    ("ArcFace", "euclidean_l2", 1.13),
+    ("VGG-Face", "euclidean", 1.17),
+    ("SFace", "cosine", 0.593),
+])
+def test_umbral_de_fabrica_por_modelo_y_metrica(umbrales, modelo, metrica, esperado):
+    umbrales("")
+    assert face_distance.get_threshold(modelo, metrica) == esperado
+
+
+def test_ajuste_reemplaza_solo_lo_indicado_y_agrega_modelos(umbrales):
+    umbrales('{"VGG-Face": {"cosine": 0.60}, "MiModelo": {"cosine": "0.25"}}')
+
+    assert face_distance.get_threshold("VGG-Face", "cosine") == 0.60
+    assert face_distance.get_threshold("VGG-Face", "euclidean") == 1.17
+    assert face_distance.get_threshold("MiModelo", "cosine") == 0.25
+    # La tabla de fábrica no se modifica.
+    assert face_distance.UMBRALES_POR_DEFECTO["VGG-Face"]["cosine"] == 0.68
+
+
+@pytest.mark.parametrize("valor", [
+    "{no es json",
+    '["VGG-Face"]',
+    '{"VGG-Face": 0.6}',
+    '{"VGG-Face": {"cosine": null}}',
+    '{"VGG-Face": {"cosine": 0.60}, "Facenet": {"cosine": "alto"}}',
+])
+def test_json_malo_se_ignora_completo(umbrales, valor, capsys):
+    umbrales(valor)
+
+    assert face_distance.UMBRALES == face_distance.UMBRALES_POR_DEFECTO
+    assert "FACE_THRESHOLDS" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("modelo, metrica", [("ModeloInexistente", "cosine"), ("Facenet512", "manhattan")])
+def test_modelo_o_metrica_desconocidos_dan_value_error(umbrales, modelo, metrica):
+    umbrales("")
+    with pytest.raises(ValueError, match=modelo):
+        face_distance.get_threshold(modelo, metrica)
+
+
+def test_distancias_con_matriz_de_galeria():
+    a = np.float32([1.0, 0.0])
+    galeria = np.float32([[2.0, 0.0], [0.0, 3.0]])
+
+    np.testing.assert_allclose(face_distance.distance(a, galeria, "cosine"), [0.0, 1.0], atol=1e-6)
+    np.testing.assert_allclose(face_distance.distance(a, galeria, "euclidean"), [1.0, np.sqrt(10)], rtol=1e-6)
+    np.testing.assert_allclose(face_distance.distance(a, galeria, "euclidean_l2"), [0.0, np.sqrt(2)], rtol=1e-6)
+    with pytest.raises(ValueError):
+        face_distance.distance(a, galeria, "manhattan")
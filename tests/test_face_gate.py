@@ -0,0 +1,91 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_gate.py
+# PROPÓSITO: Filtro previo de capturas faciales: brillo, nitidez y
+#            cuadros repetidos (por kiosco, dentro de la ventana).
+# ===============================================================
+import numpy as np
+import pytest
+
+from app.services import face_gate
+from app.services.face_gate import DuplicateFilter, dhash
+
+
+def _imagen(seed: int = 0, brillo: float = 120.0) -> np.ndarray:
+    """Textura con detalle (nítida) y brillo medio dado, en BGR."""
+    rng = np.random.default_rng(seed)
+    gris = np.clip(rng.normal(brillo, 30.0, (240, 320)), 0, 255).astype(np.uint8)
+    return np.repeat(gris[:, :, None], 3, axis=2)
+
+
+class _Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = _Reloj()
+    monkeypatch.setattr(face_gate.time, "monotonic", reloj)
+    return reloj
+
+
+@pytest.fixture
+def duplicados(monkeypatch):
+    filtro = DuplicateFilter(window_s=5)
+    monkeypatch.setattr(face_gate, "duplicates", filtro)
+    return filtro
+
+
+# --- Brillo y nitidez ---
+
+def test_imagen_utilizable_pasa(duplicados):
+    resultado = face_gate.evaluate(_imagen(), detector=False)
+    assert resultado["reason"] is None
+    assert resultado["sharpness"] > face_gate.FACE_GATE_MIN_SHARPNESS
+
+
+@pytest.mark.parametrize("imagen, motivo", [
+    (np.full((240, 320, 3), 10, dtype=np.uint8), "oscura"),
+    (np.full((240, 320, 3), 250, dtype=np.uint8), "sobreexpuesta"),
+    (np.full((240, 320, 3), 120, dtype=np.uint8), "borrosa"),
+])
+def test_imagen_mala_se_rechaza_con_su_motivo(imagen, motivo, duplicados):
+    resultado = face_gate.evaluate(imagen, detector=False)
+    assert resultado["reason"] == motivo
+    assert motivo in face_gate.MOTIVOS
+
+
+# --- Cuadros repetidos ---
+
+def test_cuadro_repetido_del_mismo_kiosco_dentro_de_la_ventana(reloj, duplicados):
+    imagen = _imagen(seed=1)
+    assert face_gate.evaluate(imagen, detector=False, origen="kiosco-a")["reason"] is None
+    reloj.ahora += 2
+    assert face_gate.evaluate(imagen, detector=False, origen="kiosco-a")["reason"] == "duplicada"
+    # Otra captura distinta del mismo kiosco sí pasa.
+    assert face_gate.evaluate(_imagen(seed=2), detector=False, origen="kiosco-a")["reason"] is None
+
+
+def test_cuadro_de_otro_kiosco_no_se_bloquea(reloj, duplicados):
+    imagen = _imagen(seed=1)
+    assert face_gate.evaluate(imagen, detector=False, origen="kiosco-a")["reason"] is None
+    assert face_gate.evaluate(imagen, detector=False, origen="kiosco-b")["reason"] is None
+
+
+def test_cuadro_repetido_pasa_al_vencer_la_ventana(reloj, duplicados):
+    h = dhash(_imagen(seed=3)[:, :, 0])
+    assert not duplicados.seen(h, "kiosco-a")
+    reloj.ahora += 6
+    assert not duplicados.seen(h, "kiosco-a")
+    # Los orígenes sin cuadros recientes no se acumulan.
+    reloj.ahora += 6
+    duplicados.seen(h, "kiosco-b")
+    assert list(duplicados._recent) == ["kiosco-b"]
+
+
+def test_ventana_cero_desactiva_el_filtro():
+    filtro = DuplicateFilter(window_s=0)
+    assert not filtro.seen(123) and not filtro.seen(123)
@@ -0,0 +1,46 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_index.py
+# PROPÓSITO: Identificación facial 1:N con el índice en memoria.
+# ===============================================================
+import numpy as np
+
+from app.core.config import FACE_MODEL_NAME
+from app.services import embedding_storage, face_index_service
+from app.services.face_index_service import FaceIndex
+from tests.conftest import crear_usuarios
+
+
+def _enrolar(db, n: int, dim: int = 32, seed: int = 0):
+    usuarios = crear_usuarios(db, n)
+    vectores = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    for usuario, vector in zip(usuarios, vectores):
+        embedding_storage.set_user_embedding(usuario, vector, FACE_MODEL_NAME)
+    db.commit()
+    return usuarios, vectores
+
+
+def test_reordenamiento_int8_omite_usuarios_borrados(db):
+    usuarios, vectores = _enrolar(db, 20)
+    index = FaceIndex(quantized=True, rerank=5)
+    index.build(np.array([u.id_usuario for u in usuarios]), vectores)
+
+    # El mejor candidato se borra después de cargar el índice.
+    db.delete(usuarios[3])
+    db.commit()
+
+    loader = lambda ids: face_index_service.load_exact_embeddings(db, ids)
+    resultado = index.search(vectores[3], k=3, exact_loader=loader)
+    assert resultado
+    assert usuarios[3].id_usuario not in [i for i, _ in resultado]
+
+
+def test_reordenamiento_sin_candidatos_vigentes(db):
+    usuarios, vectores = _enrolar(db, 2)
+    index = FaceIndex(quantized=True, rerank=5)
+    index.build(np.array([u.id_usuario for u in usuarios]), vectores)
+    for usuario in usuarios:
+        db.delete(usuario)
+    db.commit()
+
+    loader = lambda ids: face_index_service.load_exact_embeddings(db, ids)
+    assert index.search(vectores[0], k=1, exact_loader=loader) == []
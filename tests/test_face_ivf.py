@@ -0,0 +1,100 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_ivf.py
+# PROPÓSITO: Identificación con el índice IVF (FACE_IVF_ENABLED): sin
+#            plantillas no hay error, el entrenamiento no ocurre dentro
+#            de la petición y las altas de otros workers (almacén
+#            compartido) llegan al IVF.
+# ===============================================================
+import numpy as np
+import pytest
+
+from app.core.config import FACE_MODEL_NAME
+from app.services import embedding_storage, face_index_service
+from app.services.face_index_service import FaceIndex
+from app.services.face_ivf_index import IVFIndex
+from app.services.face_shared_store import SharedEmbeddingStore
+from tests.conftest import crear_usuarios
+
+DIM = 32
+
+
+@pytest.fixture
+def ivf(tmp_path, monkeypatch):
+    store = SharedEmbeddingStore(str(tmp_path / "store"))
+    monkeypatch.setattr(face_index_service, "shared_store", store)
+    monkeypatch.setattr(face_index_service, "face_index", FaceIndex())
+    monkeypatch.setattr(face_index_service, "ivf_index", IVFIndex(nprobe=4))
+    monkeypatch.setattr(face_index_service, "FACE_IVF_ENABLED", True)
+    monkeypatch.setattr(face_index_service, "FACE_IVF_PATH", str(tmp_path / "ivf.npz"))
+    monkeypatch.setattr(face_index_service, "_ivf_ready", False)
+    monkeypatch.setattr(face_index_service, "_ivf_thread", None)
+    monkeypatch.setattr(face_index_service, "_next_reconcile", 0.0)
+    return store
+
+
+def _enrolar(db, usuarios, seed: int = 0) -> np.ndarray:
+    vectores = np.random.default_rng(seed).standard_normal((len(usuarios), DIM)).astype(np.float32)
+    for usuario, vector in zip(usuarios, vectores):
+        embedding_storage.set_user_embedding(usuario, vector, FACE_MODEL_NAME)
+    db.commit()
+    return vectores
+
+
+def _esperar_ivf():
+    face_index_service._ivf_thread.join(timeout=30)
+    assert face_index_service._ivf_ready
+
+
+def test_galeria_vacia_no_es_error(db, ivf):
+    assert face_index_service.identify(db, np.ones(DIM, dtype=np.float32)) == []
+    assert face_index_service._ivf_thread is None
+
+
+def test_entrena_en_segundo_plano_y_sigue_las_altas_de_otros_workers(db, ivf):
+    usuarios = crear_usuarios(db, 50)
+    vectores = _enrolar(db, usuarios)
+
+    # Primera búsqueda: exacta mientras el IVF se entrena en otro hilo.
+    assert face_index_service.identify(db, vectores[7])[0][0] == usuarios[7].id_usuario
+    _esperar_ivf()
+    assert face_index_service.ivf_index.store_version == face_index_service.face_index.shared_version
+
+    # Otro worker enrola a un empleado: solo publica una versión nueva del almacén.
+    nuevo = crear_usuarios(db, 1, inicio=51)
+    vector_nuevo = _enrolar(db, nuevo, seed=1)[0]
+    otro_worker = SharedEmbeddingStore(ivf.directory)
+    otro_worker.upsert(nuevo[0].id_usuario, vector_nuevo / np.linalg.norm(vector_nuevo), FACE_MODEL_NAME,
+                       lambda: pytest.fail("El almacén ya existe"))
+
+    assert face_index_service.identify(db, vector_nuevo)[0][0] == nuevo[0].id_usuario
+    assert nuevo[0].id_usuario in face_index_service.ivf_index.ids()
+    assert face_index_service.ivf_index.store_version == face_index_service.face_index.shared_version
+
+
+def test_republicacion_completa_se_reparte_en_segundo_plano(db, ivf):
+    usuarios = crear_usuarios(db, 30)
+    vectores = _enrolar(db, usuarios)
+    face_index_service.identify(db, vectores[0])
+    _esperar_ivf()
+
+    db.delete(usuarios[4])
+    db.commit()
+    face_index_service._next_reconcile = 0.0
+    resultado = face_index_service.identify(db, vectores[4], k=3)
+    assert usuarios[4].id_usuario not in [i for i, _ in resultado]
+
+    _esperar_ivf()
+    assert usuarios[4].id_usuario not in face_index_service.ivf_index.ids()
+    assert len(face_index_service.ivf_index) == 29
+
+
+@pytest.mark.parametrize("nprobe", [0, -3, 100])
+def test_nprobe_fuera_de_rango_se_acota(nprobe):
+    vectores = np.random.default_rng(3).standard_normal((50, DIM)).astype(np.float32)
+    indice = IVFIndex(nprobe=nprobe)
+    indice.train(np.arange(1, 51), vectores, FACE_MODEL_NAME, nlist=5)
+
+    assert indice.nprobe >= 1
+    assert 1 <= indice.stats()["nprobe"] <= 5
+    assert indice.search(vectores[7], k=1)[0][0] == 8
+    assert indice.search(vectores[7], k=1, nprobe=-1)[0][0] == 8
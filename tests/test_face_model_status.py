@@ -0,0 +1,56 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_model_status.py
+# PROPÓSITO: Estado del modelo facial para /vision/model-status:
+#            "sin iniciar" se distingue de "cargando" y de "falló".
+# ===============================================================
+from concurrent.futures import Future
+
+from app.services import face_model_service
+from app.services.embedding_backends import create_backend
+from app.services.face_model_service import FaceModelManager
+from app.services.face_worker_pool import FaceWorkerPool
+
+
+def _future(resultado=None, error=None, terminado=True) -> Future:
+    future = Future()
+    if terminado:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(resultado)
+    return future
+
+
+def test_modelo_en_proceso_sin_iniciar_listo_y_fallido(monkeypatch):
+    monkeypatch.setattr(face_model_service, "create_backend", lambda nombre: create_backend(nombre, "fake"))
+    modelo = FaceModelManager("VGG-Face")
+    assert modelo.status()["state"] == "not_started"
+
+    modelo.warmup()
+    assert modelo.status()["state"] == "ready" and modelo.ready
+
+    def _falla(nombre):
+        raise RuntimeError("sin modelo")
+
+    monkeypatch.setattr(face_model_service, "create_backend", _falla)
+    roto = FaceModelManager("VGG-Face")
+    roto.warmup()
+    assert roto.status()["state"] == "failed"
+    assert roto.status()["error"] == "sin modelo"
+
+
+def test_pool_distingue_sin_iniciar_cargando_listo_y_fallido():
+    pool = FaceWorkerPool(workers=2, queue_depth=1, retry_after=1)
+    assert pool.status()["state"] == "not_started"
+
+    pool._warmups = [_future(True), _future(terminado=False)]
+    assert pool.status()["state"] == "loading"
+
+    pool._warmups = [_future(True), _future(True)]
+    assert pool.status()["state"] == "ready" and pool.status()["ready"]
+
+    pool._warmups = [_future(True), _future(False)]
+    assert pool.status()["state"] == "failed"
+
+    pool._warmups = [_future(error=RuntimeError("proceso caído")), _future(terminado=False)]
+    assert pool.status()["state"] == "failed"
@@ -0,0 +1,32 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_service.py
+# PROPÓSITO: Errores de entrada del pipeline facial: el 400 por una
+#            imagen ilegible menciona Base64 solo si llegó en Base64.
+# ===============================================================
+import pytest
+from fastapi import HTTPException
+
+from app.services import face_service
+from app.services.embedding_cache import EmbeddingCache
+
+
+@pytest.fixture(autouse=True)
+def _sin_cache(monkeypatch):
+    monkeypatch.setattr(face_service, "embedding_cache", EmbeddingCache(max_entries=0, ttl_s=0))
+
+
+def test_bytes_que_no_son_imagen_dan_400_sin_mencionar_base64():
+    with pytest.raises(HTTPException) as error:
+        face_service.generate_embedding_from_bytes(b"esto no es una imagen")
+
+    assert error.value.status_code == 400
+    assert error.value.detail == face_service.DETALLE_IMAGEN_INVALIDA
+
+
+def test_imagen_en_base64_ilegible_conserva_el_mensaje_de_base64():
+    image_bytes = face_service.decode_base64_image("data:image/jpeg;base64,aG9sYQ")
+    with pytest.raises(HTTPException) as error:
+        face_service.generate_embedding_from_bytes(image_bytes, face_service.DETALLE_BASE64_INVALIDO)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid base64 image format."
@@ -0,0 +1,91 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_shared_store.py
+# PROPÓSITO: Almacén compartido de embeddings (FACE_SHARED_STORE_DIR):
+#            el primer enrolamiento no debe dejar fuera de la búsqueda
+#            1:N a los empleados ya enrolados, y el almacén se concilia
+#            con la base de datos.
+# ===============================================================
+import numpy as np
+import pytest
+
+from app.core.config import FACE_MODEL_NAME
+from app.services import embedding_storage, face_index_service
+from app.services.face_index_service import FaceIndex
+from app.services.face_shared_store import SharedEmbeddingStore
+from tests.conftest import crear_usuarios
+
+DIM = 32
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    store = SharedEmbeddingStore(str(tmp_path / "store"))
+    monkeypatch.setattr(face_index_service, "shared_store", store)
+    monkeypatch.setattr(face_index_service, "face_index", FaceIndex())
+    monkeypatch.setattr(face_index_service, "FACE_IVF_ENABLED", False)
+    monkeypatch.setattr(face_index_service, "_next_reconcile", 0.0)
+    return store
+
+
+def _enrolar(db, usuarios, seed: int = 0) -> np.ndarray:
+    vectores = np.random.default_rng(seed).standard_normal((len(usuarios), DIM)).astype(np.float32)
+    for usuario, vector in zip(usuarios, vectores):
+        embedding_storage.set_user_embedding(usuario, vector, FACE_MODEL_NAME)
+    db.commit()
+    return vectores
+
+
+def test_primer_enrolamiento_publica_toda_la_galeria(db, almacen):
+    anteriores = crear_usuarios(db, 5)
+    vectores = _enrolar(db, anteriores)
+    nuevo = crear_usuarios(db, 1, inicio=6)
+    vector_nuevo = _enrolar(db, nuevo, seed=1)[0]
+
+    # Nadie ha buscado todavía: no existe current.json.
+    assert almacen.current() is None
+    face_index_service.add_template(db, nuevo[0].id_usuario, vector_nuevo)
+
+    assert almacen.current()["count"] == 6
+    for usuario, vector in zip(anteriores + nuevo, list(vectores) + [vector_nuevo]):
+        assert face_index_service.identify(db, vector, k=1)[0][0] == usuario.id_usuario
+
+
+def test_conciliacion_republica_tras_una_baja(db, almacen):
+    usuarios = crear_usuarios(db, 4)
+    vectores = _enrolar(db, usuarios)
+    face_index_service.identify(db, vectores[0])
+    assert almacen.current()["count"] == 4
+
+    db.delete(usuarios[2])
+    db.commit()
+    face_index_service._next_reconcile = 0.0
+    resultado = face_index_service.identify(db, vectores[2], k=4)
+
+    assert almacen.current()["count"] == 3
+    assert usuarios[2].id_usuario not in [i for i, _ in resultado]
+
+
+def test_conciliacion_detecta_baja_y_alta_en_el_mismo_intervalo(db, almacen):
+    usuarios = crear_usuarios(db, 4)
+    vectores = _enrolar(db, usuarios)
+    face_index_service.identify(db, vectores[0])
+
+    # Otro proceso sin almacén borra a uno y enrola a otro: el número no cambia.
+    db.delete(usuarios[1])
+    nuevo = crear_usuarios(db, 1, inicio=5)
+    vector_nuevo = _enrolar(db, nuevo, seed=1)[0]
+    face_index_service._next_reconcile = 0.0
+
+    assert face_index_service.identify(db, vector_nuevo, k=1)[0][0] == nuevo[0].id_usuario
+    assert almacen.current()["count"] == 4
+    assert usuarios[1].id_usuario not in [i for i, _ in face_index_service.identify(db, vectores[1], k=4)]
+
+
+def test_galeria_vacia_no_consulta_la_bd_en_cada_busqueda(db, almacen, count_queries):
+    consulta = np.ones(DIM, dtype=np.float32)
+    assert face_index_service.identify(db, consulta) == []
+    assert almacen.current()["count"] == 0
+
+    with count_queries as consultas:
+        assert face_index_service.identify(db, consulta) == []
+    assert consultas.total == 0
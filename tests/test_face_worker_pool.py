@@ -0,0 +1,35 @@
+# ===============================================================
+# ARCHIVO: tests/test_face_worker_pool.py
+# PROPÓSITO: Un pool de inferencia roto se reporta como 503
+#            (ColaLlenaError), libera su lugar y se recrea después.
+# ===============================================================
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services.face_worker_pool import ColaLlenaError, FaceWorkerPool
+
+
+class _ExecutorRoto:
+    def __init__(self):
+        self.apagado = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("un proceso murió")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.apagado = True
+
+
+def test_pool_roto_al_encolar_da_cola_llena_y_se_reinicia():
+    pool = FaceWorkerPool(workers=1, queue_depth=0, retry_after=3)
+    roto = _ExecutorRoto()
+    pool._executor = roto
+
+    with pytest.raises(ColaLlenaError) as error:
+        pool.submit(len, b"imagen")
+
+    assert error.value.retry_after == 3
+    assert roto.apagado and pool._executor is None
+    assert pool.status()["in_flight"] == 0
+    # El único lugar quedó libre para la siguiente petición.
+    assert pool._slots.acquire(blocking=False)
@@ -0,0 +1,138 @@
+# ===============================================================
+# ARCHIVO: tests/test_fingerprint_matcher.py
+# PROPÓSITO: Comparador de minucias: lectura FMR/XML, comparación 1:1
+#            (incluida una captura girada y desplazada) y el prefiltro
+#            de llaves de pares del índice 1:N.
+# ===============================================================
+import base64
+
+import numpy as np
+import pytest
+
+from app.scripts.bench_fingerprint_matcher import huella_sintetica, iso_fmr, otra_lectura
+from app.services.fingerprint_matcher import (
+    FingerprintIndex, THETA, TIPO, TIPO_BIFURCACION, TIPO_OTRO, TIPO_TERMINACION, X, Y,
+    is_match, match_templates, parse_template
+)
+
+
+def _girar(minucias: np.ndarray, grados: float, tx: float, ty: float) -> np.ndarray:
+    rot = np.deg2rad(grados)
+    c, s = np.cos(rot), np.sin(rot)
+    girada = minucias.copy()
+    girada[:, X] = c * minucias[:, X] - s * minucias[:, Y] + tx
+    girada[:, Y] = s * minucias[:, X] + c * minucias[:, Y] + ty
+    girada[:, THETA] = (minucias[:, THETA] + rot) % (2 * np.pi)
+    return girada.astype(np.float32)
+
+
+# --- Comparación 1:1 ---
+
+def test_misma_huella_coincide_y_otra_no():
+    rng = np.random.default_rng(1)
+    enrolada, otra = huella_sintetica(rng), huella_sintetica(rng)
+
+    assert is_match(*match_templates(otra_lectura(enrolada, rng), enrolada))
+    assert not is_match(*match_templates(otra, enrolada))
+
+
+def test_captura_girada_y_desplazada_coincide():
+    rng = np.random.default_rng(2)
+    enrolada = huella_sintetica(rng)
+    captura = _girar(enrolada, 25.0, 60.0, -45.0)
+
+    puntaje, pares = match_templates(captura, enrolada)
+    assert pares == len(enrolada)
+    assert is_match(puntaje, pares)
+
+
+# --- Índice 1:N y prefiltro ---
+
+def test_prefiltro_conserva_al_candidato_correcto():
+    rng = np.random.default_rng(3)
+    galeria = [huella_sintetica(rng) for _ in range(300)]
+    indice = FingerprintIndex(prefilter_top=20)
+    indice.build(list(range(1, 301)), galeria)
+
+    aciertos = 0
+    for id_usuario in range(1, 301, 15):
+        captura = otra_lectura(galeria[id_usuario - 1], rng)
+        candidatos = indice._ids[indice._candidatos(captura, indice.prefilter_top)]
+        aciertos += id_usuario in candidatos
+        assert indice.search(captura, k=1)[0][0] == id_usuario
+    assert aciertos == 20
+
+
+def test_indice_reemplaza_la_huella_de_un_usuario():
+    rng = np.random.default_rng(4)
+    vieja, nueva = huella_sintetica(rng), huella_sintetica(rng)
+    indice = FingerprintIndex()
+    indice.build([7], [vieja])
+    indice.add(7, nueva)
+
+    assert len(indice) == 2 and indice.stats()["size"] == 1
+    assert indice.search(otra_lectura(nueva, rng), k=1)[0][0] == 7
+    assert indice.search(vieja, k=2)[0][1] < 0.2
+
+
+# --- Lectura de plantillas ---
+
+def test_fmr_iso_se_lee_en_base64_y_en_bytes():
+    minucias = huella_sintetica(np.random.default_rng(5))
+    texto = iso_fmr(minucias)
+
+    for plantilla in (texto, base64.b64decode(texto)):
+        leidas = parse_template(plantilla)
+        assert leidas.shape == minucias.shape
+        np.testing.assert_array_equal(leidas[:, X], np.floor(minucias[:, X]))
+        np.testing.assert_array_equal(leidas[:, TIPO], minucias[:, TIPO])
+        # Unidad ISO: 1.40625° por paso.
+        assert np.abs(np.angle(np.exp(1j * (leidas[:, THETA] - minucias[:, THETA])))).max() <= np.deg2rad(0.71)
+
+
+def test_fmr_ansi_usa_unidades_de_dos_grados():
+    # Cabecera ANSI 378 de 26 bytes (longitud en 2 bytes) y una vista con 2 minucias.
+    minucias = bytes([0x40 | 0x01, 0x2C, 0x00, 0xC8, 45, 60,  # terminación (300, 200) a 90°
+                      0x80 | 0x00, 0x64, 0x01, 0x90, 0, 60])  # bifurcación (100, 400) a 0°
+    total = 26 + 4 + len(minucias) + 2
+    registro = (b"FMR\x00" + b" 20\x00" + total.to_bytes(2, "big") + bytes(16)
+                + bytes([0, 0, 60, 2]) + minucias + b"\x00\x00")
+
+    leidas = parse_template(registro)
+    np.testing.assert_allclose(leidas[:, [X, Y]], [[300, 200], [100, 400]])
+    np.testing.assert_allclose(leidas[:, THETA], [np.pi / 2, 0], atol=1e-6)
+    np.testing.assert_array_equal(leidas[:, TIPO], [TIPO_TERMINACION, TIPO_BIFURCACION])
+
+
+def test_xml_en_grados_con_tipos_y_minucias_incompletas():
+    xml = """<Template>
+      <Minutia x="10" y="20" angle="180" type="bifurcation"/>
+      <fp:minutia posX='30' posY='40' direction='270' kind='ending'/>
+      <Minutia x="50" y="60" type="1"/>
+      <MINUTIAE X="70" Y="80" ANGLE="90" TYPE="raro"/>
+    </Template>"""
+
+    leidas = parse_template(xml)
+    np.testing.assert_allclose(leidas[:, [X, Y]], [[10, 20], [30, 40], [70, 80]])
+    np.testing.assert_allclose(leidas[:, THETA], np.deg2rad([180, 270, 90]), atol=1e-6)
+    np.testing.assert_array_equal(leidas[:, TIPO], [TIPO_BIFURCACION, TIPO_TERMINACION, TIPO_OTRO])
+
+
+def test_xml_en_radianes_se_respeta():
+    leidas = parse_template('<Minutia x="1" y="2" angle="3.0"/><Minutia x="3" y="4" angle="6.2"/>')
+    np.testing.assert_allclose(leidas[:, THETA], [3.0, 6.2], atol=1e-6)
+
+
+@pytest.mark.parametrize("plantilla", [
+    "",
+    "no es una plantilla",
+    "<Template><Minutia x='1'/></Template>",
+    "<Minutia x='a' y='b' angle='c'",
+    "<Minutia x='a' y='b' angle='c'/>",
+    base64.b64encode(b"FMR\x00" + bytes(10)).decode(),          # truncado
+    base64.b64encode(b"FMR\x00" + bytes(40)).decode(),          # longitud que no cuadra
+    base64.b64encode(b"XYZ\x00" + bytes(40)).decode(),          # otro formato
+    b"FMR\x00" + b" 20\x00" + (30).to_bytes(4, "big") + bytes(18),  # cero minucias
+])
+def test_plantillas_invalidas_devuelven_none(plantilla):
+    assert parse_template(plantilla) is None
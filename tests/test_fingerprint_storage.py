@@ -0,0 +1,61 @@
+# ===============================================================
+# ARCHIVO: tests/test_fingerprint_storage.py
+# PROPÓSITO: Formato compacto de plantillas de huella: ida y vuelta sin
+#            pérdida con cada códec y lectura de las filas heredadas.
+# ===============================================================
+import base64
+import os
+
+import pytest
+
+from app.services import fingerprint_storage as storage
+
+
+def _fmr(cuerpo: bytes) -> str:
+    return base64.b64encode(b"FMR\x00 20\x00" + cuerpo).decode("ascii")
+
+
+@pytest.mark.parametrize("plantilla, codec", [
+    ("ab", storage.CODEC_RAW),
+    ("<Minutiae>" + '<Minutia X="10" Y="20" Angle="90"/>' * 40 + "</Minutiae>", storage.CODEC_ZLIB),
+    (_fmr(os.urandom(300)), storage.CODEC_FMR),
+    (_fmr(bytes(300)), storage.CODEC_FMR_ZLIB),
+])
+def test_ida_y_vuelta_con_cada_codec(plantilla, codec):
+    blob = storage.encode_template(plantilla)
+
+    assert storage.is_compact(blob)
+    assert blob[len(storage.MAGIC)] == storage.FORMAT_VERSION
+    assert blob[len(storage.MAGIC) + 1] == codec
+    assert storage.decode_template(blob) == plantilla
+    assert len(blob) <= len(plantilla.encode("utf-8")) + len(storage.MAGIC) + 2
+
+
+def test_base64_no_canonico_se_guarda_como_texto():
+    # Sin relleno: decodificar y volver a codificar no daría el mismo texto.
+    plantilla = _fmr(os.urandom(300)).rstrip("=")
+    assert len(plantilla) % 4
+    blob = storage.encode_template(plantilla)
+
+    assert blob[len(storage.MAGIC) + 1] in (storage.CODEC_RAW, storage.CODEC_ZLIB)
+    assert storage.decode_template(blob) == plantilla
+
+
+def test_fila_heredada_se_lee_tal_cual_y_se_compacta_al_vuelo():
+    plantilla = _fmr(bytes(200))
+    heredada = plantilla.encode("utf-8")
+
+    assert not storage.is_compact(heredada)
+    assert storage.decode_template(heredada) == plantilla
+    compacta = storage.compact_template(heredada)
+    assert storage.is_compact(compacta) and storage.decode_template(compacta) == plantilla
+    assert storage.compact_template(compacta) is compacta
+
+
+@pytest.mark.parametrize("blob", [
+    storage.MAGIC + bytes([storage.FORMAT_VERSION + 1, storage.CODEC_RAW]) + b"x",
+    storage.MAGIC + bytes([storage.FORMAT_VERSION, 9]) + b"x",
+])
+def test_version_o_codec_desconocido_falla(blob):
+    with pytest.raises(ValueError):
+        storage.decode_template(blob)
@@ -0,0 +1,105 @@
+# ===============================================================
+# ARCHIVO: tests/test_fingerprint_sync.py
+# PROPÓSITO: Versiones de la galería de huellas (contador con bloqueo)
+#            y el lote incremental hacia las terminales, con bajas.
+# ===============================================================
+import json
+import threading
+
+import pytest
+
+from app.models import tablas as models
+from app.services import fingerprint_service, fingerprint_sync_service
+from tests.conftest import crear_usuarios
+
+
+@pytest.fixture(autouse=True)
+def _engine_de_prueba(monkeypatch, engine):
+    monkeypatch.setattr(fingerprint_sync_service, "engine", engine)
+
+
+def _enrolar(session_factory, numero_empleado: str, plantilla: str):
+    with session_factory() as db:
+        usuario = db.query(models.Usuario).filter(models.Usuario.numero_empleado == numero_empleado).one()
+        fingerprint_service.set_user_fingerprint(db, usuario, plantilla)
+        db.commit()
+
+
+def _lote(desde: int, hasta: int) -> list:
+    lineas = b"".join(fingerprint_sync_service.stream_changes(desde, hasta, comprimir=False))
+    return [json.loads(linea) for linea in lineas.splitlines()]
+
+
+def test_enrolamientos_concurrentes_reciben_versiones_distintas_y_consecutivas(db, session_factory):
+    usuarios = crear_usuarios(db, 8)
+    hilos = [
+        threading.Thread(target=_enrolar, args=(session_factory, u.numero_empleado, f"plantilla-{u.numero_empleado}"))
+        for u in usuarios
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    db.expire_all()
+    versiones = sorted(v for (v,) in db.query(models.Usuario.huella_version))
+    assert versiones == list(range(1, 9))
+    assert fingerprint_sync_service.gallery_state(db) == (8, 8)
+
+
+def test_version_sin_confirmar_no_la_salta_la_terminal(db, session_factory):
+    crear_usuarios(db, 2)
+    lento = session_factory()
+    usuario = lento.query(models.Usuario).filter(models.Usuario.numero_empleado == "E0001").one()
+    fingerprint_service.set_user_fingerprint(lento, usuario, "plantilla-lenta")
+    # El segundo enrolamiento espera el bloqueo del contador del primero.
+    rapido = threading.Thread(target=_enrolar, args=(session_factory, "E0002", "plantilla-rapida"))
+    rapido.start()
+    rapido.join(timeout=0.5)
+    assert rapido.is_alive()
+    lento.commit()
+    lento.close()
+    rapido.join()
+
+    # Lo que ya vio la terminal (versión 1) no se repite y la 2 sí llega.
+    primera = _lote(0, 1)
+    assert [l.get("numero_empleado") for l in primera[1:-1]] == ["E0001"]
+    delta = _lote(1, 2)
+    assert [(l["numero_empleado"], l["version"]) for l in delta[1:-1]] == [("E0002", 2)]
+
+
+def test_baja_de_usuario_llega_como_linea_eliminada(db, session_factory):
+    crear_usuarios(db, 2)
+    _enrolar(session_factory, "E0001", "plantilla-1")
+    _enrolar(session_factory, "E0002", "plantilla-2")
+
+    usuario = db.query(models.Usuario).filter(models.Usuario.numero_empleado == "E0001").one()
+    fingerprint_service.remove_user_fingerprint(db, usuario)
+    db.delete(usuario)
+    db.commit()
+
+    version, total = fingerprint_sync_service.gallery_state(db)
+    assert (version, total) == (3, 1)
+    delta = _lote(2, version)
+    assert delta[1:-1] == [{"numero_empleado": "E0001", "eliminada": True, "version": 3}]
+    assert delta[-1] == {"fin": True, "enviadas": 1}
+    # La descarga completa no lleva bajas: reemplaza la galería.
+    completa = _lote(0, version)
+    assert [l["numero_empleado"] for l in completa[1:-1]] == ["E0002"]
+
+
+def test_quitar_plantilla_deja_baja(db, session_factory):
+    crear_usuarios(db, 1)
+    _enrolar(session_factory, "E0001", "plantilla-1")
+
+    usuario = db.query(models.Usuario).one()
+    fingerprint_service.remove_user_fingerprint(db, usuario)
+    db.commit()
+
+    assert [(b.numero_empleado, b.huella_version) for b in db.query(models.HuellaEliminada)] == [("E0001", 2)]
+    assert usuario.plantilla_huella is None and usuario.huella_digest is None
+    assert fingerprint_sync_service.gallery_state(db) == (2, 0)
+    # Sin plantilla no hay nada que dar de baja.
+    fingerprint_service.remove_user_fingerprint(db, usuario)
+    db.commit()
+    assert db.query(models.HuellaEliminada).count() == 1
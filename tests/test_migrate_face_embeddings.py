@@ -0,0 +1,30 @@
+# ===============================================================
+# ARCHIVO: tests/test_migrate_face_embeddings.py
+# PROPÓSITO: La migración JSON -> float32 no se detiene por plantillas
+#            vacías o ilegibles: las cuenta como omitidas y sigue.
+# ===============================================================
+import numpy as np
+
+from app.models import tablas as models
+from app.scripts import migrate_face_embeddings
+from app.services import embedding_storage
+from tests.conftest import crear_usuarios
+
+
+def test_plantillas_vacias_e_ilegibles_se_omiten(monkeypatch, engine, db):
+    monkeypatch.setattr(migrate_face_embeddings, "engine", engine)
+    usuarios = crear_usuarios(db, 5)
+    for usuario, plantilla in zip(usuarios, ["[0.5, 1.5]", "", "   ", "{no es json", "[1.0, 2.0, 3.0]"]):
+        usuario.plantilla_facial = plantilla
+    db.commit()
+
+    convertidas, omitidas = migrate_face_embeddings.convertir_plantillas(borrar_json=False, lote=2)
+
+    assert (convertidas, omitidas) == (2, 3)
+    db.expire_all()
+    por_numero = {u.numero_empleado: u for u in db.query(models.Usuario)}
+    np.testing.assert_array_equal(embedding_storage.load_user_embedding(por_numero["E0001"]), [0.5, 1.5])
+    np.testing.assert_array_equal(embedding_storage.load_user_embedding(por_numero["E0005"]), [1.0, 2.0, 3.0])
+    # Vacías: quedan en NULL. Ilegible: se conserva para revisarla.
+    assert por_numero["E0002"].plantilla_facial is None and por_numero["E0003"].plantilla_facial is None
+    assert por_numero["E0004"].plantilla_facial == "{no es json" and por_numero["E0004"].embedding_facial is None
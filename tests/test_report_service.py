@@ -0,0 +1,98 @@
+# ===============================================================
+# ARCHIVO: tests/test_report_service.py
+# PROPÓSITO: El reporte diario no debe hacer una consulta por usuario:
+#            el número de sentencias queda fijo sin importar la plantilla.
+# ===============================================================
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.models import tablas as models
+from app.services import attendance_summary_service, report_service
+from tests.conftest import crear_usuarios
+
+
+def _dia_con_turnos(db, usuarios, fecha: date):
+    turno = models.TipoHorario(nombre_turno="Matutino", hora_entrada=time(8, 0), hora_salida=time(16, 0))
+    db.add(turno)
+    db.flush()
+    for i, usuario in enumerate(usuarios):
+        db.add(models.AsignacionHorario(fecha=fecha, id_usuario=usuario.id_usuario, id_tipo_horario=turno.id_tipo_horario))
+        if i % 2 == 0:
+            entrada = datetime.combine(fecha, time(8, i % 30))
+            db.add(models.RegistroAsistencia(
+                numero_empleado=usuario.numero_empleado, id_usuario=usuario.id_usuario,
+                fecha=fecha, hora_entrada=entrada, hora_salida=entrada + timedelta(hours=8)
+            ))
+    db.commit()
+
+
+@pytest.mark.parametrize("n_usuarios", [1, 40])
+def test_reporte_del_dia_en_una_consulta(db, count_queries, n_usuarios):
+    hoy = date.today()
+    _dia_con_turnos(db, crear_usuarios(db, n_usuarios), hoy)
+    db.expire_all()
+
+    with count_queries as consultas:
+        reporte = report_service.get_daily_attendance_report(db, hoy)
+
+    assert len(reporte) == n_usuarios
+    assert consultas.total == 1
+    assert reporte[0]["status"] == "Asistencia"
+    assert all(r["status"] == "Ausencia" for r in reporte[1::2])
+
+
+def test_filtro_de_cost_center_no_agrega_consultas(db, count_queries):
+    usuarios = crear_usuarios(db, 10)
+    for i, usuario in enumerate(usuarios):
+        usuario.costCenter = "C001" if i < 4 else "C002"
+    db.commit()
+
+    with count_queries as consultas:
+        reporte = report_service.get_daily_attendance_report(db, date.today(), cost_center="C001")
+
+    assert len(reporte) == 4
+    assert consultas.total == 1
+
+
+def test_dia_cerrado_sin_resumen_se_calcula_de_los_registros(db, count_queries):
+    ayer = date.today() - timedelta(days=1)
+    _dia_con_turnos(db, crear_usuarios(db, 6), ayer)
+
+    with count_queries as consultas:
+        reporte = report_service.get_daily_attendance_report(db, ayer)
+
+    assert [r["status"] for r in reporte] == ["Asistencia", "Ausencia"] * 3
+    assert consultas.total == 2
+
+
+def test_dia_cerrado_con_resumen_se_lee_del_resumen(db, count_queries):
+    ayer = date.today() - timedelta(days=1)
+    usuarios = crear_usuarios(db, 6)
+    _dia_con_turnos(db, usuarios, ayer)
+    attendance_summary_service.rebuild_summaries(db, ayer, ayer)
+    # Si el reporte leyera los registros, este cambio no se vería.
+    db.query(models.ResumenAsistenciaDiaria).filter_by(id_usuario=usuarios[1].id_usuario).update({"estado": "Retardo"})
+    db.commit()
+
+    with count_queries as consultas:
+        reporte = report_service.get_daily_attendance_report(db, ayer)
+
+    assert [r["status"] for r in reporte] == ["Asistencia", "Retardo"] + ["Asistencia", "Ausencia"] * 2
+    assert consultas.total == 2
+
+
+def test_resumen_creado_en_paralelo_se_reutiliza(db, session_factory):
+    hoy = date.today()
+    usuario = crear_usuarios(db, 1)[0]
+    with session_factory() as otra:
+        otra.add(models.ResumenAsistenciaDiaria(id_usuario=usuario.id_usuario, fecha=hoy, estado="Ausencia"))
+        otra.commit()
+
+    # Entre la lectura de refresh_daily_summary y su INSERT, otra petición ya insertó la fila.
+    resumen = attendance_summary_service._nuevo_resumen(db, usuario.id_usuario, hoy)
+    resumen.estado = "Asistencia"
+    db.commit()
+
+    filas = db.query(models.ResumenAsistenciaDiaria).all()
+    assert len(filas) == 1 and filas[0].estado == "Asistencia"
@@ -0,0 +1,91 @@
+# ===============================================================
+# ARCHIVO: tests/test_vision_batcher.py
+# PROPÓSITO: Lotes de Google Vision con el cliente falso: cada imagen
+#            recibe su respuesta y ninguna se queda esperando aunque la
+#            API devuelva menos respuestas que imágenes. Solo se
+#            reintentan los errores transitorios.
+# ===============================================================
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.vision_batcher import VisionBatchClient, es_transitorio
+from app.services.vision_fake import FakeVisionClient, FakeVisionError, SIN_ROSTRO
+
+
+def _lote(client, imagenes, max_retries=0):
+    async def correr():
+        batcher = VisionBatchClient(lambda: client, max_batch_size=8, flush_ms=20, timeout_s=2,
+                                    max_retries=max_retries, backoff_s=0)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.annotate(i) for i in imagenes), return_exceptions=True), 5
+        )
+    return asyncio.run(correr())
+
+
+def test_cada_imagen_recibe_su_respuesta():
+    client = FakeVisionClient(latency_s=0.01, per_image_s=0)
+    respuestas = _lote(client, [b"rostro-1", SIN_ROSTRO + b"-2", b"rostro-3"])
+    assert [len(r.face_annotations) for r in respuestas] == [1, 0, 1]
+    assert client.calls == 1
+
+
+def test_respuestas_incompletas_no_dejan_peticiones_colgadas():
+    class ClienteIncompleto(FakeVisionClient):
+        def batch_annotate_images(self, requests, timeout=None):
+            completo = super().batch_annotate_images(requests, timeout)
+            return SimpleNamespace(responses=completo.responses[:1])
+
+    respuestas = _lote(ClienteIncompleto(latency_s=0.01, per_image_s=0), [b"a", b"b", b"c"])
+    assert len(respuestas[0].face_annotations) == 1
+    for error in respuestas[1:]:
+        assert isinstance(error, RuntimeError)
+
+
+class _ClienteQueFalla(FakeVisionClient):
+    """Falla las primeras `fallas` llamadas con el error dado."""
+
+    def __init__(self, error, fallas):
+        super().__init__(latency_s=0, per_image_s=0)
+        self.error = error
+        self.fallas = fallas
+
+    def batch_annotate_images(self, requests, timeout=None):
+        if self.calls < self.fallas:
+            self.calls += 1
+            raise self.error
+        return super().batch_annotate_images(requests, timeout)
+
+
+class _ErrorGrpc(Exception):
+    def __init__(self, nombre):
+        super().__init__(nombre)
+        self.grpc_status_code = SimpleNamespace(name=nombre)
+
+
+@pytest.mark.parametrize("error", [
+    FakeVisionError("no disponible", code=503),
+    FakeVisionError("demasiadas peticiones", code=429),
+    _ErrorGrpc("UNAVAILABLE"),
+    TimeoutError("deadline"),
+])
+def test_error_transitorio_se_reintenta(error):
+    client = _ClienteQueFalla(error, fallas=1)
+    respuestas = _lote(client, [b"rostro"], max_retries=2)
+    assert len(respuestas[0].face_annotations) == 1
+    assert client.calls == 2
+
+
+@pytest.mark.parametrize("error", [
+    FakeVisionError("petición inválida", code=400),
+    FakeVisionError("sin permiso", code=403),
+    _ErrorGrpc("INVALID_ARGUMENT"),
+    ValueError("respuesta mal formada"),
+])
+def test_error_permanente_no_se_reintenta(error):
+    client = _ClienteQueFalla(error, fallas=1)
+    respuestas = _lote(client, [b"rostro"], max_retries=2)
+    assert respuestas[0] is error
+    assert client.calls == 1
+    assert not es_transitorio(error)